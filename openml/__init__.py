@@ -16,6 +16,7 @@ In particular, this module implements a python interface for the
 """
 
 from . import _api_calls
+from . import cache
 from . import config
 from .datasets import OpenMLDataset, OpenMLDataFeature
 from . import datasets
@@ -23,6 +24,7 @@ from . import evaluations
 from .evaluations import OpenMLEvaluation
 from . import extensions
 from . import exceptions
+from . import metrics
 from . import tasks
 from .tasks import (
     OpenMLTask,
@@ -47,7 +49,7 @@ from .__version__ import __version__
 
 
 def populate_cache(task_ids=None, dataset_ids=None, flow_ids=None,
-                   run_ids=None):
+                   run_ids=None, max_workers=None):
     """
     Populate a cache for offline and parallel usage of the OpenML connector.
 
@@ -61,25 +63,29 @@ def populate_cache(task_ids=None, dataset_ids=None, flow_ids=None,
 
     run_ids : iterable
 
+    max_workers : int, optional (default=None)
+        Number of threads downloading entities of the same type concurrently. If None,
+        all entities are downloaded one after another.
+
     Returns
     -------
     None
     """
     if task_ids is not None:
-        for task_id in task_ids:
-            tasks.functions.get_task(task_id)
+        utils._get_entities(tasks.functions.get_task, task_ids,
+                            max_workers=max_workers)
 
     if dataset_ids is not None:
-        for dataset_id in dataset_ids:
-            datasets.functions.get_dataset(dataset_id)
+        utils._get_entities(datasets.functions.get_dataset, dataset_ids,
+                            max_workers=max_workers)
 
     if flow_ids is not None:
-        for flow_id in flow_ids:
-            flows.functions.get_flow(flow_id)
+        utils._get_entities(flows.functions.get_flow, flow_ids,
+                            max_workers=max_workers)
 
     if run_ids is not None:
-        for run_id in run_ids:
-            runs.functions.get_run(run_id)
+        utils._get_entities(runs.functions.get_run, run_ids,
+                            max_workers=max_workers)
 
 
 __all__ = [
@@ -101,6 +107,8 @@ __all__ = [
     'evaluations',
     'exceptions',
     'extensions',
+    'metrics',
+    'cache',
     'config',
     'runs',
     'flows',
@@ -1,15 +1,172 @@
+from concurrent.futures import Future
+import email.utils
+import json
+import random
+import threading
 import time
+from typing import Dict, Tuple  # noqa: F401
 import requests
+import requests.adapters
 import warnings
 
 import xmltodict
 
 from . import config
+from . import metrics
 from .exceptions import (OpenMLServerError, OpenMLServerException,
                          OpenMLServerNoResult)
 
 
-def _perform_api_call(call, request_method, data=None, file_elements=None):
+# A single HTTP session is shared by all threads of the process so that
+# connections to the server are kept alive between API calls. It is re-created
+# whenever the server or the pool size changes.
+_session = None
+_session_key = None
+_session_lock = threading.Lock()
+
+# The rate limiter is shared by all threads of the process as well. It is
+# re-created whenever ``config.max_requests_per_second`` changes.
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+# Futures of the GET requests currently in flight, by URL and payload. Identical
+# GET requests issued concurrently by several threads share a single request.
+_in_flight = {}  # type: Dict[Tuple, Future]
+_in_flight_lock = threading.Lock()
+
+
+class RetryPolicy(object):
+    """Decides whether and how long to wait before a request is retried.
+
+    Waiting times grow exponentially with the number of attempts and are drawn
+    uniformly at random from ``[0, backoff]`` (full jitter) so that many
+    clients do not retry at the same time. If the server sends a
+    ``Retry-After`` header, it is honored instead. The maximal number of
+    attempts is given by ``config.connection_n_retries``.
+
+    Parameters
+    ----------
+    backoff_factor : float
+        Upper bound of the waiting time after the first attempt, in seconds. It
+        doubles with every further attempt.
+    max_backoff : float
+        Maximal waiting time between two attempts, in seconds.
+    status_codes : iterable of int
+        HTTP status codes upon which idempotent requests (get and delete) are
+        retried.
+    """
+
+    def __init__(self, backoff_factor=0.5, max_backoff=60.0,
+                 status_codes=(429, 502, 503, 504)):
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_codes = set(status_codes)
+
+    def should_retry(self, request_method, response):
+        return (
+            request_method in ('get', 'delete')
+            and response.status_code in self.status_codes
+        )
+
+    def get_wait_time(self, attempt, response=None):
+        """Return the number of seconds to wait after the given attempt.
+
+        Parameters
+        ----------
+        attempt : int
+            Number of the attempt which failed, starting at 1.
+        response : requests.Response, optional
+            Response of the failed attempt, if any.
+
+        Returns
+        -------
+        float
+        """
+        if response is not None:
+            retry_after = _parse_retry_after(
+                response.headers.get('Retry-After'))
+            if retry_after is not None:
+                return min(self.max_backoff, retry_after)
+        backoff = self.backoff_factor * 2 ** (attempt - 1)
+        return random.uniform(0, min(self.max_backoff, backoff))
+
+
+# Retry policy used by ``send_request``. Can be replaced to change the retry
+# behavior of all API calls.
+retry_policy = RetryPolicy()
+
+
+def _parse_retry_after(value):
+    """Parse the value of a ``Retry-After`` header into seconds to wait.
+
+    The value is either a number of seconds or a HTTP date. Returns ``None``
+    if the value is missing or cannot be parsed.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at is None:
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class _TokenBucket(object):
+    """Thread-safe token bucket limiting the number of requests per second.
+
+    Parameters
+    ----------
+    rate : float
+        Number of tokens added per second.
+    capacity : float, optional
+        Maximal number of tokens, i.e. the size of a burst. Defaults to
+        ``max(1, rate)``.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = max(1.0, rate) if capacity is None else capacity
+        self._tokens = self.capacity
+        self._last_update = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token from the bucket, blocking until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._last_update) * self.rate,
+                )
+                self._last_update = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _get_rate_limiter():
+    """Return the process-wide rate limiter, or ``None`` if not configured."""
+    global _rate_limiter
+    rate = config.max_requests_per_second
+    if not rate:
+        return None
+    with _rate_limiter_lock:
+        if _rate_limiter is None or _rate_limiter.rate != rate:
+            _rate_limiter = _TokenBucket(rate)
+        return _rate_limiter
+
+
+def _perform_api_call(call, request_method, data=None, file_elements=None,
+                      response_format='xml'):
     """
     Perform an API call at the OpenML server.
 
@@ -28,6 +185,10 @@ def _perform_api_call(call, request_method, data=None, file_elements=None):
     file_elements : dict
         Mapping of {filename: str} of strings which should be uploaded as
         files to the server.
+    response_format : str
+        Format of the response, either ``xml`` or ``json``. ``config.server``
+        must point to the XML API, the JSON API is expected under the same
+        URL with ``/xml`` replaced by ``/json``.
 
     Returns
     -------
@@ -36,21 +197,90 @@ def _perform_api_call(call, request_method, data=None, file_elements=None):
     return_value : str
         Return value of the OpenML server
     """
-    url = config.server
-    if not url.endswith("/"):
-        url += "/"
-    url += call
-
-    url = url.replace('=', '%3d')
+    url = _get_api_call_url(call, response_format)
 
     if file_elements is not None:
         if request_method != 'post':
             raise ValueError('request method must be post when file elements '
                              'are present')
         return _read_url_files(url, data=data, file_elements=file_elements)
+    if request_method == 'get':
+        return _read_url_coalesced(url, data)
     return _read_url(url, request_method, data)
 
 
+def _perform_conditional_api_call(call, etag=None, last_modified=None):
+    """
+    Perform a GET API call which only returns the content if it changed.
+
+    Parameters
+    ----------
+    call : str
+        The API call. For example data/1
+    etag : str, optional
+        ``ETag`` of the cached response, sent as ``If-None-Match``.
+    last_modified : str, optional
+        ``Last-Modified`` date of the cached response, sent as
+        ``If-Modified-Since``.
+
+    Returns
+    -------
+    return_value : str or None
+        Return value of the OpenML server, or ``None`` if the server answered
+        that the cached response is still up to date (status code 304).
+    etag : str or None
+        ``ETag`` of the current response.
+    last_modified : str or None
+        ``Last-Modified`` date of the current response.
+    """
+    url = _get_api_call_url(call)
+    data = {}
+    if config.apikey is not None:
+        data['api_key'] = config.apikey
+    headers = {}
+    if etag is not None:
+        headers['If-None-Match'] = etag
+    if last_modified is not None:
+        headers['If-Modified-Since'] = last_modified
+
+    response = send_request(request_method='get', url=url, data=data,
+                            headers=headers)
+    if response.status_code == 304:
+        return (
+            None,
+            response.headers.get('ETag', etag),
+            response.headers.get('Last-Modified', last_modified),
+        )
+    if response.status_code != 200:
+        raise _parse_server_exception(response, url=url)
+    return (
+        response.text,
+        response.headers.get('ETag'),
+        response.headers.get('Last-Modified'),
+    )
+
+
+def _get_api_call_url(call, response_format='xml'):
+    url = _get_server_url(response_format)
+    if not url.endswith("/"):
+        url += "/"
+    url += call
+    return url.replace('=', '%3d')
+
+
+def _get_server_url(response_format='xml'):
+    """Return the base URL of the API for the given response format."""
+    if response_format == 'xml':
+        return config.server
+    elif response_format == 'json':
+        url = config.server.rstrip('/')
+        if not url.endswith('/xml'):
+            raise ValueError('Cannot derive the JSON API from server %s.'
+                             % config.server)
+        return url[:-len('/xml')] + '/json'
+    raise ValueError('Unknown response format %s.' % response_format)
+
+
 def _file_id_to_url(file_id, filename=None):
     """
      Presents the URL how to download a given file id
@@ -103,37 +333,159 @@ def _read_url(url, request_method, data=None):
     return response.text
 
 
+def _read_url_coalesced(url, data=None):
+    """Perform a GET request on ``url``, sharing it with identical concurrent calls.
+
+    If another thread is already waiting for the response to the same request, no new
+    request is sent. Instead, the response (or exception) of the request in flight is
+    returned (or raised) to all callers.
+    """
+    data = {} if data is None else data
+    key = (url, config.apikey, tuple(sorted(data.items())))
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _in_flight[key] = future
+    if not is_leader:
+        return future.result()
+
+    try:
+        future.set_result(_read_url(url, 'get', data))
+    except BaseException as e:
+        future.set_exception(e)
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+    return future.result()
+
+
+def _stream_url(url, data=None, headers=None):
+    """Perform a streaming GET request on ``url``.
+
+    The body of the returned response has not been read yet. The caller is
+    responsible for consuming it, for example with ``response.iter_content``,
+    and for closing the response afterwards.
+
+    If ``headers`` contains a ``Range`` header, the server may answer with
+    status code 206 (partial content) as well.
+    """
+    data = {} if data is None else data
+    if config.apikey is not None:
+        data['api_key'] = config.apikey
+
+    response = send_request(request_method='get', url=url, data=data,
+                            stream=True, headers=headers)
+    if response.status_code == 206 and headers is not None \
+            and 'Range' in headers:
+        # Partial content is requested without compression to be able to
+        # append it to the already downloaded content
+        return response
+    if response.status_code != 200:
+        raise _parse_server_exception(response, url=url)
+    if 'Content-Encoding' not in response.headers or \
+            response.headers['Content-Encoding'] != 'gzip':
+        warnings.warn('Received uncompressed content from OpenML for {}.'
+                      .format(url))
+    return response
+
+
+def _get_session():
+    """Return the process-wide HTTP session, creating it if necessary.
+
+    The session keeps up to ``config.connection_pool_size`` connections per
+    host alive. It is replaced by a fresh session if ``config.server`` or
+    ``config.connection_pool_size`` changed since it was created.
+
+    Returns
+    -------
+    requests.Session
+    """
+    global _session
+    global _session_key
+    key = (config.server, config.connection_pool_size)
+    with _session_lock:
+        if _session is None or _session_key != key:
+            if _session is not None:
+                _session.close()
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=config.connection_pool_size,
+                pool_maxsize=config.connection_pool_size,
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+            _session_key = key
+        return _session
+
+
+def _reset_session():
+    """Close the shared HTTP session and all of its pooled connections."""
+    global _session
+    global _session_key
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_key = None
+
+
 def send_request(
     request_method,
     url,
     data,
     files=None,
+    stream=False,
+    headers=None,
 ):
     n_retries = config.connection_n_retries
+    policy = retry_policy
     response = None
-    with requests.Session() as session:
-        # Start at one to have a non-zero multiplier for the sleep
-        for i in range(1, n_retries + 1):
-            try:
-                if request_method == 'get':
-                    response = session.get(url, params=data)
-                elif request_method == 'delete':
-                    response = session.delete(url, params=data)
-                elif request_method == 'post':
-                    response = session.post(url, data=data, files=files)
-                else:
-                    raise NotImplementedError()
-                break
-            except (
-                    requests.exceptions.ConnectionError,
-                    requests.exceptions.SSLError,
-            ) as e:
-                if i == n_retries:
-                    raise e
-                else:
-                    time.sleep(0.1 * i)
+    session = _get_session()
+    rate_limiter = _get_rate_limiter()
+    start = time.perf_counter()
+    # Start at one to count the attempts
+    for i in range(1, n_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            if request_method == 'get':
+                response = session.get(url, params=data, stream=stream,
+                                       headers=headers)
+            elif request_method == 'delete':
+                response = session.delete(url, params=data)
+            elif request_method == 'post':
+                response = session.post(url, data=data, files=files)
+            else:
+                raise NotImplementedError()
+        except (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.SSLError,
+        ) as e:
+            if i == n_retries:
+                metrics._record_request(request_method, url, None,
+                                        time.perf_counter() - start, 0, i - 1)
+                raise e
+            else:
+                time.sleep(policy.get_wait_time(i))
+                continue
+        if i < n_retries and policy.should_retry(request_method, response):
+            wait_time = policy.get_wait_time(i, response)
+            response.close()
+            time.sleep(wait_time)
+            continue
+        break
     if response is None:
         raise ValueError('This should never happen!')
+    if stream:
+        # Do not consume the body of a streamed response
+        response_bytes = int(response.headers.get('Content-Length', 0))
+    else:
+        response_bytes = len(response.content)
+    metrics._record_request(request_method, url, response.status_code,
+                            time.perf_counter() - start, response_bytes, i - 1)
     return response
 
 
@@ -141,13 +493,19 @@ def _parse_server_exception(response, url=None):
     # OpenML has a sophisticated error system
     # where information about failures is provided. try to parse this
     try:
-        server_exception = xmltodict.parse(response.text)
+        server_error = xmltodict.parse(response.text)['oml:error']
     except Exception:
-        raise OpenMLServerError(
-            'Unexpected server error. Please contact the developers!\n'
-            'Status code: {}\n{}'.format(response.status_code, response.text))
+        try:
+            # Errors of the JSON API have the same fields without namespace
+            server_error = {
+                'oml:' + key: value
+                for key, value in json.loads(response.text)['error'].items()
+            }
+        except Exception:
+            raise OpenMLServerError(
+                'Unexpected server error. Please contact the developers!\n'
+                'Status code: {}\n{}'.format(response.status_code, response.text))
 
-    server_error = server_exception['oml:error']
     code = int(server_error['oml:code'])
     message = server_error['oml:message']
     additional_information = server_error.get('oml:additional_information')
@@ -0,0 +1,783 @@
+"""
+Bound the size of the local cache of OpenML entities.
+
+Every dataset, task, flow, run and setup is cached in its own directory below
+:func:`openml.config.get_cache_directory`. The getters of these entities record
+every access in the file ``.access`` of the entity's directory: its modification
+time is the time of the last access and it holds the number of accesses. If the
+cache exceeds ``config.cache_max_size`` megabytes, :func:`gc` evicts whole entities,
+either the least recently (``'lru'``) or the least frequently (``'lfu'``) used ones
+first, see ``config.cache_eviction_policy``. This happens automatically whenever files
+were added to the cache, based on the sizes recorded in the catalog (see below), and
+can also be done by hand.
+
+Entities which are in use can be pinned with :func:`pinned`, which creates a pin file
+in the entity's directory. The getters of datasets, tasks and flows pin the entity
+while reading and downloading its files. Entities with pin files are never evicted,
+except for stale pins: those of processes of this host which no longer exist, and
+those of other hosts which were not refreshed for ``_PIN_MAX_AGE`` seconds. Live pins
+are refreshed every ``_PIN_REFRESH_INTERVAL`` seconds. Since only files are involved,
+this works for caches shared by several hosts, e.g. on NFS, and :func:`gc` can be run
+while other processes use the cache.
+
+The cached entities are recorded in a SQLite catalog in the cache directory, together
+with their files, the size every file takes up in the cache and the key fields of
+their description, see :func:`list_catalog`. This allows listing the cached entities
+without scanning the cache directory. The catalog is built from the cache directory
+when it is first used and updated whenever an entity is accessed. Since files may be
+large, their md5 checksums are only computed by :func:`rebuild_catalog`.
+
+The cache can also be cleaned up from the command line::
+
+    python -m openml.cache gc --max-size 500G
+"""
+import argparse
+from collections import namedtuple, OrderedDict
+import contextlib
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import stat
+import sys
+import threading
+import time
+import uuid
+from typing import Optional, Set, Tuple  # noqa: F401
+from xml.parsers.expat import ExpatError
+
+import xmltodict
+
+from . import config
+from .utils import _get_file_md5, _lock_cache_directory, _write_file_atomically
+
+
+logger = logging.getLogger(__name__)
+
+ENTITY_TYPES = ('datasets', 'tasks', 'flows', 'runs', 'setups')
+EVICTION_POLICIES = ('lru', 'lfu')
+
+_ACCESS_FILE = '.access'
+_PIN_PREFIX = '.pin-'
+# Pins of other hosts which were not refreshed for this many seconds are stale
+_PIN_MAX_AGE = 60 * 60
+_PIN_REFRESH_INTERVAL = 10 * 60
+# Suffix of the directories of evicted entities, which are renamed before removal
+_EVICTED_SUFFIX = '.evicted-'
+_SIZE_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+_access_lock = threading.Lock()
+
+# Pin files of this process with the id of the process which created them, which are
+# refreshed by a daemon thread
+_pin_files = set()  # type: Set[Tuple[int, str]]
+_pin_files_lock = threading.Lock()
+_pin_refresher = None  # type: Optional[threading.Thread]
+
+_CATALOG_FILE = 'catalog.sqlite'
+_CATALOG_VERSION = 2
+# Connections to the catalogs, per thread and cache directory
+_catalog_connections = threading.local()
+
+CacheEntry = namedtuple(
+    'CacheEntry',
+    ['entity_type', 'entity_id', 'path', 'size', 'last_access', 'n_accesses', 'pinned'],
+)
+CacheEntry.__doc__ = """The cache directory of a single entity.
+
+``size`` is given in bytes and ``last_access`` in seconds since the epoch.
+"""
+
+CatalogEntry = namedtuple('CatalogEntry', ['entity_type', 'entity_id', 'fields', 'files'])
+CatalogEntry.__doc__ = """A cached entity as recorded in the catalog.
+
+``fields`` holds the key fields of the description of the entity, e.g. the name and
+version of a dataset. ``files`` maps the name of every file of the entity to its
+size in bytes and md5 checksum, which is ``None`` unless it was computed by
+:func:`rebuild_catalog` and the file has not changed since. Files linked from a shared
+cache have the size of the link.
+"""
+
+
+def _record_access(entity_type, entity_id):
+    """Record an access to a cached entity, used to decide which entities to evict.
+
+    Also updates the entity in the catalog if its files changed.
+    """
+    path = os.path.join(config.get_cache_directory(), entity_type, str(entity_id))
+    if not os.path.isdir(path):
+        return
+    access_file = os.path.join(path, _ACCESS_FILE)
+    with _access_lock:
+        # Concurrent processes may lose an access, which is fine for an estimate
+        try:
+            n_accesses = _read_access_count(access_file) + 1
+            _write_file_atomically(access_file, str(n_accesses))
+        except (OSError, IOError) as e:
+            logger.debug("Cannot record the access to %s: %s", path, e)
+    _update_catalog(entity_type, entity_id)
+
+
+def _read_access_count(access_file):
+    try:
+        with open(access_file) as fh:
+            return int(fh.read().strip() or 0)
+    except (OSError, IOError, ValueError):
+        return 0
+
+
+@contextlib.contextmanager
+def pinned(entity_type, entity_id):
+    """Protect the cache directory of an entity from eviction while in use.
+
+    Parameters
+    ----------
+    entity_type : str
+        One of ``ENTITY_TYPES``.
+    entity_id : int
+        The id of the entity.
+    """
+    if entity_type not in ENTITY_TYPES:
+        raise ValueError('Unknown entity type %s' % entity_type)
+    path = os.path.join(config.get_cache_directory(), entity_type, str(entity_id))
+    pin_file = os.path.join(path, '%s%s-%d-%s' % (
+        _PIN_PREFIX, socket.gethostname(), os.getpid(), uuid.uuid4().hex,
+    ))
+    # gc checks the pins of an entity while holding its lock, so it either sees the
+    # pin or has evicted the entity before the directory is created again
+    with _lock_cache_directory(path):
+        os.makedirs(path, exist_ok=True)
+        with open(pin_file, 'w'):
+            pass
+    pin = (os.getpid(), pin_file)
+    with _pin_files_lock:
+        _pin_files.add(pin)
+    _start_pin_refresher()
+    try:
+        yield path
+    finally:
+        with _pin_files_lock:
+            _pin_files.discard(pin)
+        try:
+            os.remove(pin_file)
+        except OSError:
+            pass
+
+
+def _start_pin_refresher():
+    """Start the thread refreshing the pins of this process, unless it is running."""
+    global _pin_refresher
+    with _pin_files_lock:
+        # Threads do not survive a fork
+        if _pin_refresher is None or not _pin_refresher.is_alive():
+            _pin_refresher = threading.Thread(target=_refresh_pins_periodically,
+                                              name='openml-cache-pins', daemon=True)
+            _pin_refresher.start()
+
+
+def _refresh_pins_periodically():
+    while True:
+        time.sleep(_PIN_REFRESH_INTERVAL)
+        _refresh_pins()
+
+
+def _refresh_pins():
+    """Update the modification time of the pins of this process, see ``_is_pinned``."""
+    pid = os.getpid()
+    with _pin_files_lock:
+        # Pins inherited from the parent process are refreshed by the parent
+        pin_files = [pin_file for pin_pid, pin_file in _pin_files if pin_pid == pid]
+    for pin_file in pin_files:
+        try:
+            os.utime(pin_file, None)
+        except OSError:
+            pass
+
+
+def _is_pinned(path, files):
+    """Whether the entity has pins, removing stale pins."""
+    hostname = socket.gethostname()
+    now = time.time()
+    is_pinned = False
+    for filename in files:
+        if not filename.startswith(_PIN_PREFIX):
+            continue
+        pin_file = os.path.join(path, filename)
+        # The name of a pin file is made of the host name, process id and a random id
+        host, _, pid = filename[len(_PIN_PREFIX):].rpartition('-')[0].rpartition('-')
+        if host == hostname and pid.isdigit():
+            stale = not _process_exists(int(pid))
+        else:
+            # Processes of other hosts cannot be checked, but refresh their pins
+            try:
+                stale = now - os.stat(pin_file).st_mtime > _PIN_MAX_AGE
+            except OSError:
+                # Removed in the meantime
+                continue
+        if stale:
+            logger.info("Removing stale pin %s", pin_file)
+            try:
+                os.remove(pin_file)
+            except OSError:
+                pass
+        else:
+            is_pinned = True
+    return is_pinned
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def list_entries():
+    """List the cached entities.
+
+    Returns
+    -------
+    list of CacheEntry
+    """
+    entries = []
+    for entity_type, entity_id, path in _iter_entity_directories():
+        try:
+            entries.append(_get_entry(entity_type, entity_id, path))
+        except OSError:
+            # The entity was removed concurrently
+            continue
+    return entries
+
+
+def _iter_entity_directories(entity_types=ENTITY_TYPES):
+    """Yield the type, id and directory of every entity in the cache directory."""
+    cache_directory = config.get_cache_directory()
+    for entity_type in entity_types:
+        type_directory = os.path.join(cache_directory, entity_type)
+        if not os.path.isdir(type_directory):
+            continue
+        for name in sorted(os.listdir(type_directory)):
+            path = os.path.join(type_directory, name)
+            try:
+                entity_id = int(name)
+            except ValueError:
+                continue
+            if os.path.isdir(path):
+                yield entity_type, entity_id, path
+
+
+def _get_entry(entity_type, entity_id, path):
+    size = 0
+    for directory, _, files in os.walk(path):
+        for filename in files:
+            try:
+                # Files linked from a shared cache do not take up space in the cache
+                size += os.lstat(os.path.join(directory, filename)).st_size
+            except OSError:
+                pass
+    last_access, n_accesses = _get_access(path)
+    return CacheEntry(entity_type, entity_id, path, size, last_access, n_accesses,
+                      _is_pinned(path, os.listdir(path)))
+
+
+def _get_access(path):
+    """Return the time of the last access to an entity and the number of accesses."""
+    access_file = os.path.join(path, _ACCESS_FILE)
+    try:
+        last_access = os.stat(access_file).st_mtime
+    except FileNotFoundError:
+        return os.stat(path).st_mtime, 0
+    return last_access, _read_access_count(access_file)
+
+
+def gc(max_size=None, policy=None, dry_run=False):
+    """Evict entities from the cache until it is no larger than ``max_size``.
+
+    Parameters
+    ----------
+    max_size : int, optional
+        Budget of the cache in bytes. Defaults to ``config.cache_max_size`` megabytes.
+        Nothing is evicted if neither is given.
+    policy : str, optional
+        ``'lru'`` evicts the least recently used entities first, ``'lfu'`` the least
+        frequently used ones. Defaults to ``config.cache_eviction_policy``.
+    dry_run : bool (default=False)
+        Only return the entities which would be evicted.
+
+    Returns
+    -------
+    list of CacheEntry
+        The evicted entities.
+    """
+    if max_size is None:
+        if config.cache_max_size is None:
+            return []
+        max_size = int(config.cache_max_size * 1024 * 1024)
+    policy = config.cache_eviction_policy if policy is None else policy
+    if policy not in EVICTION_POLICIES:
+        raise ValueError('Unknown eviction policy %s, must be one of %s'
+                         % (policy, ', '.join(EVICTION_POLICIES)))
+    if not dry_run:
+        _remove_evicted_directories()
+    return _evict_entries(list_entries(), max_size, policy, dry_run)
+
+
+def _evict_entries(entries, max_size, policy, dry_run=False):
+    """Evict the least recently or frequently used of ``entries`` to fit ``max_size``.
+
+    Returns the evicted entries.
+    """
+    total_size = sum(entry.size for entry in entries)
+    if policy == 'lru':
+        entries.sort(key=lambda entry: entry.last_access)
+    else:
+        entries.sort(key=lambda entry: (entry.n_accesses, entry.last_access))
+
+    evicted = []
+    for entry in entries:
+        if total_size <= max_size:
+            break
+        if entry.pinned:
+            continue
+        if not dry_run:
+            if not _evict(entry.path):
+                continue
+            _remove_from_catalog(entry.entity_type, entry.entity_id)
+        evicted.append(entry)
+        total_size -= entry.size
+    if total_size > max_size:
+        logger.warning("The cache still holds %d bytes, which exceeds the budget of "
+                       "%d bytes, because of pinned entities", total_size, max_size)
+    return evicted
+
+
+def _evict(path):
+    """Remove the directory of an entity; return whether it was removed by this call.
+
+    Entities which are pinned are not removed.
+    """
+    # Renaming is atomic, such that readers either see the complete directory or
+    # none, and concurrent calls of gc do not remove the same entity twice. Holding
+    # the lock of the entity, no file is being downloaded into the directory and no
+    # pin is being created.
+    evicted_path = '%s%s%s' % (path, _EVICTED_SUFFIX, uuid.uuid4().hex)
+    try:
+        with _lock_cache_directory(path):
+            # The entity may have been pinned since the cache was listed
+            if _is_pinned(path, os.listdir(path)):
+                return False
+            os.rename(path, evicted_path)
+    except OSError:
+        return False
+    shutil.rmtree(evicted_path, ignore_errors=True)
+    return True
+
+
+def _remove_evicted_directories():
+    """Remove the directories of evicted entities left behind by interrupted calls."""
+    cache_directory = config.get_cache_directory()
+    for entity_type in ENTITY_TYPES:
+        type_directory = os.path.join(cache_directory, entity_type)
+        if not os.path.isdir(type_directory):
+            continue
+        for name in os.listdir(type_directory):
+            if _EVICTED_SUFFIX in name:
+                shutil.rmtree(os.path.join(type_directory, name), ignore_errors=True)
+
+
+def list_catalog(entity_type):
+    """List the cached entities of a type as recorded in the catalog.
+
+    Falls back to scanning the cache directory, without checksums, if the catalog
+    cannot be opened, e.g. because the cache directory is read-only. Entities whose
+    directories were removed by other means than this package are skipped, as are
+    their removed files.
+
+    Parameters
+    ----------
+    entity_type : str
+        One of ``ENTITY_TYPES``.
+
+    Returns
+    -------
+    OrderedDict
+        Mapping of the entity ids, in ascending order, to ``CatalogEntry``.
+    """
+    if entity_type not in ENTITY_TYPES:
+        raise ValueError('Unknown entity type %s' % entity_type)
+    entries = OrderedDict()
+    try:
+        connection = _get_catalog()
+        for entity_id, fields in connection.execute(
+            'SELECT entity_id, fields FROM entities WHERE entity_type = ? '
+            'ORDER BY entity_id', (entity_type, ),
+        ):
+            entries[entity_id] = CatalogEntry(entity_type, entity_id, json.loads(fields), {})
+        for entity_id, name, size, md5 in connection.execute(
+            'SELECT entity_id, name, size, md5 FROM files WHERE entity_type = ?',
+            (entity_type, ),
+        ):
+            if entity_id in entries:
+                entries[entity_id].files[name] = (size, md5)
+        entries = _remove_stale_entries(entity_type, entries)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Cannot read the cache catalog, scanning the cache directory "
+                       "instead: %s", e)
+        entries.clear()
+        for _, entity_id, path in _iter_entity_directories([entity_type]):
+            files, fields = _scan_entity(entity_type, path, checksums=False)
+            entries[entity_id] = CatalogEntry(
+                entity_type, entity_id, fields,
+                {name: (size, md5) for name, (size, _, md5) in files.items()},
+            )
+    return entries
+
+
+def _remove_stale_entries(entity_type, entries):
+    """Drop the entities and files of ``entries`` which no longer exist on disk.
+
+    Stale entities are also removed from the catalog.
+    """
+    type_directory = os.path.join(config.get_cache_directory(), entity_type)
+    valid_entries = OrderedDict()
+    for entity_id, entry in entries.items():
+        path = os.path.join(type_directory, str(entity_id))
+        if not os.path.isdir(path):
+            _remove_from_catalog(entity_type, entity_id)
+            continue
+        files = {
+            name: file for name, file in entry.files.items()
+            if os.path.exists(os.path.join(path, name))
+        }
+        valid_entries[entity_id] = entry._replace(files=files)
+    return valid_entries
+
+
+def rebuild_catalog():
+    """Rebuild the catalog from the cache directory, computing the md5 checksum of
+    every file.
+
+    Only necessary if the cache directory was modified by other means than this
+    package, e.g. by hand, or to record checksums.
+    """
+    connection = _get_catalog()
+    entities = _scan_cache_directory(checksums=True)
+    with _transaction(connection):
+        _fill_catalog(connection, entities)
+
+
+def _get_catalog():
+    """Return the connection of this thread to the catalog of the cache directory."""
+    path = os.path.join(config.get_cache_directory(), _CATALOG_FILE)
+    # Connections must neither be shared by threads nor survive a fork
+    if getattr(_catalog_connections, 'pid', None) != os.getpid():
+        _catalog_connections.pid = os.getpid()
+        _catalog_connections.connections = {}
+    connections = _catalog_connections.connections
+    if path not in connections:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Transactions are started explicitly, see _transaction
+        connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        try:
+            if _get_catalog_version(connection) != _CATALOG_VERSION:
+                # Scan the cache before taking the write lock, which blocks all other
+                # processes using the catalog
+                entities = _scan_cache_directory(checksums=False)
+                with _transaction(connection):
+                    if _get_catalog_version(connection) != _CATALOG_VERSION:
+                        _fill_catalog(connection, entities)
+        except BaseException:
+            connection.close()
+            raise
+        connections[path] = connection
+    return connections[path]
+
+
+@contextlib.contextmanager
+def _transaction(connection):
+    """Run the statements of the block atomically, holding the write lock throughout."""
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def _get_catalog_version(connection):
+    return connection.execute('PRAGMA user_version').fetchone()[0]
+
+
+def _scan_cache_directory(checksums):
+    return [
+        (entity_type, entity_id) + _scan_entity(entity_type, path, checksums=checksums)
+        for entity_type, entity_id, path in _iter_entity_directories()
+    ]
+
+
+def _fill_catalog(connection, entities):
+    """Replace the catalog by ``entities``, as returned by ``_scan_cache_directory``."""
+    connection.execute('DROP TABLE IF EXISTS entities')
+    connection.execute('DROP TABLE IF EXISTS files')
+    connection.execute(
+        'CREATE TABLE entities (entity_type TEXT NOT NULL, entity_id INTEGER NOT NULL, '
+        'fields TEXT NOT NULL, updated REAL NOT NULL, '
+        'PRIMARY KEY (entity_type, entity_id))'
+    )
+    connection.execute(
+        'CREATE TABLE files (entity_type TEXT NOT NULL, entity_id INTEGER NOT NULL, '
+        'name TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL, '
+        'md5 TEXT, PRIMARY KEY (entity_type, entity_id, name))'
+    )
+    for entity_type, entity_id, files, fields in entities:
+        _write_catalog_entry(connection, entity_type, entity_id, files, fields)
+    connection.execute('PRAGMA user_version = %d' % _CATALOG_VERSION)
+
+
+def _update_catalog(entity_type, entity_id):
+    """Update the files and fields of an entity in the catalog if they changed.
+
+    If files were added or modified, the cache is also garbage collected (see
+    ``_enforce_max_size``).
+    """
+    path = os.path.join(config.get_cache_directory(), entity_type, str(entity_id))
+    try:
+        connection = _get_catalog()
+        known_files = {
+            name: (size, mtime, md5) for name, size, mtime, md5 in connection.execute(
+                'SELECT name, size, mtime, md5 FROM files '
+                'WHERE entity_type = ? AND entity_id = ?', (entity_type, entity_id),
+            )
+        }
+        # Checksums of unmodified files are kept, others are not computed as the
+        # files may be large
+        files, fields = _scan_entity(entity_type, path, known_files=known_files,
+                                     checksums=False)
+        if files == known_files:
+            return
+        with _transaction(connection):
+            _write_catalog_entry(connection, entity_type, entity_id, files, fields)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Cannot update the cache catalog: %s", e)
+        return
+    if any(known_files.get(name) != file for name, file in files.items()):
+        _enforce_max_size(entity_type, entity_id)
+
+
+def _enforce_max_size(entity_type, entity_id):
+    """Evict entities if the cache exceeds ``config.cache_max_size``.
+
+    As this runs after every download, the size of the cache is taken from the catalog
+    instead of scanning the cache directory, and only if it exceeds the budget, the
+    access files of the cataloged entities are read. The given entity, which was just
+    downloaded, is pinned, such that it is not evicted before it is used.
+    """
+    if config.cache_max_size is None:
+        return
+    max_size = int(config.cache_max_size * 1024 * 1024)
+    try:
+        connection = _get_catalog()
+        total_size, = connection.execute('SELECT SUM(size) FROM files').fetchone()
+        if (total_size or 0) <= max_size:
+            return
+        with pinned(entity_type, entity_id):
+            _evict_entries(_list_cataloged_entries(connection), max_size,
+                           config.cache_eviction_policy)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Cannot garbage collect the cache: %s", e)
+
+
+def _list_cataloged_entries(connection):
+    """List the entities of the catalog, with the total size of their files.
+
+    Pins are not checked, ``_evict`` does so before removing an entity.
+    """
+    cache_directory = config.get_cache_directory()
+    entries = []
+    for entity_type, entity_id, size in connection.execute(
+        'SELECT entity_type, entity_id, SUM(size) FROM files '
+        'GROUP BY entity_type, entity_id'
+    ).fetchall():
+        path = os.path.join(cache_directory, entity_type, str(entity_id))
+        try:
+            last_access, n_accesses = _get_access(path)
+        except OSError:
+            # The entity was removed concurrently
+            continue
+        entries.append(CacheEntry(entity_type, entity_id, path, size, last_access,
+                                  n_accesses, False))
+    return entries
+
+
+def _remove_from_catalog(entity_type, entity_id):
+    try:
+        connection = _get_catalog()
+        with _transaction(connection):
+            for table in ('entities', 'files'):
+                connection.execute(
+                    'DELETE FROM %s WHERE entity_type = ? AND entity_id = ?' % table,
+                    (entity_type, entity_id),
+                )
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Cannot update the cache catalog: %s", e)
+
+
+def _write_catalog_entry(connection, entity_type, entity_id, files, fields):
+    connection.execute('DELETE FROM files WHERE entity_type = ? AND entity_id = ?',
+                       (entity_type, entity_id))
+    connection.executemany(
+        'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)',
+        [(entity_type, entity_id, name, size, mtime, md5)
+         for name, (size, mtime, md5) in files.items()],
+    )
+    connection.execute('INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?)',
+                       (entity_type, entity_id, json.dumps(fields), time.time()))
+
+
+def _scan_entity(entity_type, path, known_files=None, checksums=True):
+    """Return the files of an entity and the key fields of its description.
+
+    Returns
+    -------
+    files : dict
+        Mapping of the file names to their size, modification time and md5 checksum.
+        Checksums are taken from ``known_files`` for files of the same size and
+        modification time, and are ``None`` if ``checksums`` is not set or the file
+        is linked from a shared cache.
+    fields : dict
+    """
+    known_files = {} if known_files is None else known_files
+    files = {}
+    for name in os.listdir(path):
+        # Skip access and pin files, as well as partial downloads and writes
+        if name.startswith('.') or name.endswith(('.tmp', '.part')):
+            continue
+        file_path = os.path.join(path, name)
+        try:
+            file_stat = os.lstat(file_path)
+            is_link = stat.S_ISLNK(file_stat.st_mode)
+            # Files linked from a shared cache only take up the space of the link
+            if is_link and not stat.S_ISREG(os.stat(file_path).st_mode):
+                continue
+        except OSError:
+            continue
+        if not is_link and not stat.S_ISREG(file_stat.st_mode):
+            continue
+        size, mtime = file_stat.st_size, file_stat.st_mtime
+        known = known_files.get(name)
+        if known is not None and known[:2] == (size, mtime):
+            md5 = known[2]
+        elif checksums and not is_link:
+            # Files linked from a shared cache are not read, they may be large
+            md5 = _get_file_md5(file_path)
+        else:
+            md5 = None
+        files[name] = (size, mtime, md5)
+
+    description_file, get_fields = _DESCRIPTIONS[entity_type]
+    fields = {}
+    if description_file in files:
+        try:
+            with open(os.path.join(path, description_file), encoding='utf8') as fh:
+                fields = get_fields(xmltodict.parse(fh.read()))
+        except (OSError, ExpatError, KeyError, TypeError) as e:
+            logger.debug("Cannot parse the description of %s: %s", path, e)
+    return files, fields
+
+
+def _get_fields(node, names):
+    return {name: node.get('oml:' + name) for name in names}
+
+
+def _get_task_fields(description):
+    task = description['oml:task']
+    fields = _get_fields(task, ('task_type_id', ))
+    inputs = task.get('oml:input', [])
+    for input_ in inputs if isinstance(inputs, list) else [inputs]:
+        if input_.get('@name') == 'source_data':
+            fields.update(_get_fields(input_['oml:data_set'],
+                                      ('data_set_id', 'target_feature')))
+    return fields
+
+
+# Description file of every entity type and the function extracting its key fields
+_DESCRIPTIONS = {
+    'datasets': ('description.xml', lambda description: _get_fields(
+        description['oml:data_set_description'], ('name', 'version', 'status', 'format'))),
+    'tasks': ('task.xml', _get_task_fields),
+    'flows': ('flow.xml', lambda description: _get_fields(
+        description['oml:flow'], ('name', 'external_version'))),
+    'runs': ('description.xml', lambda description: _get_fields(
+        description['oml:run'], ('task_id', 'flow_id', 'setup_id'))),
+    'setups': ('description.xml', lambda description: _get_fields(
+        description['oml:setup_parameters'], ('flow_id', ))),
+}
+
+
+def _parse_size(size):
+    """Parse a size in bytes with an optional unit, e.g. ``'500G'``."""
+    size = size.strip().upper().rstrip('B')
+    unit = size[-1:] if size[-1:] in _SIZE_UNITS else ''
+    try:
+        return int(float(size[:len(size) - len(unit)]) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError('invalid size %s' % size)
+
+
+def _format_entry(entry):
+    return '%-8s %8d %12d bytes %6d accesses%s' % (
+        entry.entity_type, entry.entity_id, entry.size, entry.n_accesses,
+        ' (pinned)' if entry.pinned else '',
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m openml.cache', description='Manage the OpenML cache.',
+    )
+    parser.add_argument('--cache-directory',
+                        help='Cache directory, defaults to the one of the config file.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+    subparsers.add_parser('list', help='List the cached entities.')
+    gc_parser = subparsers.add_parser('gc', help='Evict entities from the cache.')
+    gc_parser.add_argument('--max-size', type=_parse_size,
+                           help='Budget of the cache, e.g. 500G. Defaults to '
+                                'cache_max_size of the config file.')
+    gc_parser.add_argument('--policy', choices=EVICTION_POLICIES,
+                           help='Eviction policy, defaults to cache_eviction_policy '
+                                'of the config file.')
+    gc_parser.add_argument('--dry-run', action='store_true',
+                           help='Only print the entities which would be evicted.')
+    subparsers.add_parser('rebuild-catalog',
+                          help='Rebuild the catalog of the cached entities.')
+    args = parser.parse_args(argv)
+
+    if args.cache_directory is not None:
+        config.set_cache_directory(args.cache_directory)
+    if args.command == 'list':
+        entries = list_entries()
+        for entry in entries:
+            print(_format_entry(entry))
+        print('%d entities, %d bytes' % (len(entries), sum(e.size for e in entries)))
+    elif args.command == 'rebuild-catalog':
+        rebuild_catalog()
+    else:
+        evicted = gc(max_size=args.max_size, policy=args.policy, dry_run=args.dry_run)
+        for entry in evicted:
+            print(_format_entry(entry))
+        print('%s %d entities, %d bytes' % (
+            'Would evict' if args.dry_run else 'Evicted', len(evicted),
+            sum(e.size for e in evicted),
+        ))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
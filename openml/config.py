@@ -6,6 +6,7 @@ import os
 
 from io import StringIO
 import configparser
+from typing import List  # noqa: F401
 from urllib.parse import urlparse
 
 
@@ -22,6 +23,20 @@ _defaults = {
     'cachedir': os.path.expanduser(os.path.join('~', '.openml', 'cache')),
     'avoid_duplicate_runs': 'True',
     'connection_n_retries': 2,
+    'connection_pool_size': 10,
+    'max_requests_per_second': None,
+    'listing_format': 'xml',
+    'dataset_description_ttl': None,
+    'dataset_qualities_ttl': None,
+    'stale_while_revalidate': 'False',
+    'dataset_cache_format': 'feather',
+    'memmap_dataset_arrays': 'False',
+    'arff_parse_workers': 1,
+    'dataset_memory_cache_size': 512,
+    'cache_max_size': None,
+    'cache_eviction_policy': 'lru',
+    'cache_fsync': 'False',
+    'shared_cache_directories': '',
 }
 
 config_file = os.path.expanduser(os.path.join('~', '.openml', 'config'))
@@ -37,6 +52,55 @@ avoid_duplicate_runs = True if _defaults['avoid_duplicate_runs'] == 'True' else
 # Number of retries if the connection breaks
 connection_n_retries = _defaults['connection_n_retries']
 
+# Number of keep-alive connections kept open per host by the shared HTTP session
+connection_pool_size = _defaults['connection_pool_size']
+
+# Maximal number of requests per second sent by all threads of the process
+# (no limit if None)
+max_requests_per_second = _defaults['max_requests_per_second']
+
+# Format in which listings are requested from the server, either 'xml' or 'json'
+listing_format = _defaults['listing_format']
+
+# Number of seconds after which cached dataset descriptions and qualities are
+# revalidated with the server (cached forever if None)
+dataset_description_ttl = _defaults['dataset_description_ttl']
+dataset_qualities_ttl = _defaults['dataset_qualities_ttl']
+
+# Whether expired cache entries are returned right away and revalidated in the
+# background instead of waiting for the server
+stale_while_revalidate = _defaults['stale_while_revalidate'] == 'True'
+
+# Format in which parsed datasets are cached, one of 'feather', 'parquet' (both
+# require pyarrow) or 'pickle'
+dataset_cache_format = _defaults['dataset_cache_format']
+
+# Whether dense datasets requested as arrays are cached as .npy files and returned as
+# read-only memory maps, which are shared by all processes reading the same dataset.
+# Off by default, as callers can no longer modify the arrays in place
+memmap_dataset_arrays = _defaults['memmap_dataset_arrays'] == 'True'
+
+# Number of processes parsing large uncompressed ARFF files
+arff_parse_workers = _defaults['arff_parse_workers']
+
+# Budget in megabytes of the in-memory cache of the arrays returned by
+# ``OpenMLSupervisedTask.get_X_and_y``; 0 disables the cache
+dataset_memory_cache_size = _defaults['dataset_memory_cache_size']
+
+# Budget in megabytes of the cache directory and the order in which openml.cache.gc
+# evicts entities ('lru' or 'lfu'); None means the cache is not bounded
+cache_max_size = _defaults['cache_max_size']
+cache_eviction_policy = _defaults['cache_eviction_policy']
+
+# Whether files written to the cache are flushed to disk, which makes them survive
+# a crash of the operating system, but slows down writing
+cache_fsync = _defaults['cache_fsync'] == 'True'
+
+# Read-only cache directories, e.g. on a shared volume, which are searched before
+# anything is downloaded into ``cache_directory``; separated by os.pathsep in the
+# config file
+shared_cache_directories = []  # type: List[str]
+
 
 def _setup():
     """Setup openml package. Called on first import.
@@ -52,6 +116,20 @@ def _setup():
     global cache_directory
     global avoid_duplicate_runs
     global connection_n_retries
+    global connection_pool_size
+    global max_requests_per_second
+    global listing_format
+    global dataset_description_ttl
+    global dataset_qualities_ttl
+    global stale_while_revalidate
+    global dataset_cache_format
+    global memmap_dataset_arrays
+    global arff_parse_workers
+    global dataset_memory_cache_size
+    global cache_max_size
+    global cache_eviction_policy
+    global cache_fsync
+    global shared_cache_directories
     # read config file, create cache directory
     try:
         os.mkdir(os.path.expanduser(os.path.join('~', '.openml')))
@@ -73,6 +151,31 @@ def _setup():
             'A higher number of retries than 20 is not allowed to keep the '
             'server load reasonable'
         )
+    connection_pool_size = config.getint('FAKE_SECTION', 'connection_pool_size')
+    max_requests_per_second = _get_optional_float(config, 'max_requests_per_second')
+    listing_format = config.get('FAKE_SECTION', 'listing_format')
+    dataset_description_ttl = _get_optional_float(config, 'dataset_description_ttl')
+    dataset_qualities_ttl = _get_optional_float(config, 'dataset_qualities_ttl')
+    stale_while_revalidate = config.getboolean('FAKE_SECTION', 'stale_while_revalidate')
+    dataset_cache_format = config.get('FAKE_SECTION', 'dataset_cache_format')
+    memmap_dataset_arrays = config.getboolean('FAKE_SECTION', 'memmap_dataset_arrays')
+    arff_parse_workers = config.getint('FAKE_SECTION', 'arff_parse_workers')
+    dataset_memory_cache_size = config.getint('FAKE_SECTION', 'dataset_memory_cache_size')
+    cache_max_size = _get_optional_float(config, 'cache_max_size')
+    cache_eviction_policy = config.get('FAKE_SECTION', 'cache_eviction_policy')
+    cache_fsync = config.getboolean('FAKE_SECTION', 'cache_fsync')
+    shared_cache_directories = [
+        os.path.abspath(os.path.expanduser(directory))
+        for directory in config.get('FAKE_SECTION', 'shared_cache_directories').split(os.pathsep)
+        if directory
+    ]
+
+
+def _get_optional_float(config, key):
+    value = config.get('FAKE_SECTION', key)
+    if value is None:
+        return None
+    return float(value)
 
 
 def _parse_config():
@@ -111,16 +214,27 @@ def get_cache_directory():
         The current cache directory.
 
     """
-    url_suffix = urlparse(server).netloc
-    reversed_url_suffix = os.sep.join(url_suffix.split('.')[::-1])
     if not cache_directory:
         _cachedir = _defaults(cache_directory)
     else:
         _cachedir = cache_directory
-    _cachedir = os.path.join(_cachedir, reversed_url_suffix)
+    _cachedir = os.path.join(_cachedir, _get_server_subdirectory())
     return _cachedir
 
 
+def _get_shared_cache_directories():
+    """Get the shared cache directories of the current server, in search order."""
+    return [
+        os.path.join(os.path.abspath(directory), _get_server_subdirectory())
+        for directory in shared_cache_directories
+    ]
+
+
+def _get_server_subdirectory():
+    url_suffix = urlparse(server).netloc
+    return os.sep.join(url_suffix.split('.')[::-1])
+
+
 def set_cache_directory(cachedir):
     """Set module-wide cache directory.
 
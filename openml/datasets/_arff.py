@@ -0,0 +1,333 @@
+"""
+Fast readers for ARFF files.
+
+liac-arff decodes every single value of an ARFF file in Python. The readers in this
+module only use liac-arff to decode the header and parse the data section with
+vectorized parsers instead, directly into dataframes or CSR matrices. Files using
+features of the ARFF format which these parsers do not support are decoded with
+liac-arff.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import io
+from itertools import repeat
+import logging
+import os
+import re
+import warnings
+
+import arff
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+
+logger = logging.getLogger(__name__)
+
+_NUMERIC_TYPES = ('NUMERIC', 'REAL', 'INTEGER')
+
+# Minimal size of the chunks of the data section which are parsed in parallel
+_MIN_CHUNK_SIZE = 16 * 1024 * 1024
+
+_RE_COMMENT_LINE = re.compile(r'^[ \t]*%.*$', re.MULTILINE)
+_RE_QUOTED_VALUE = re.compile(r"'[^']*'")
+
+# Data sections containing double quotes, escape sequences, sparse rows or a percent
+# sign outside of comment lines are decoded by liac-arff
+_RE_UNSUPPORTED_DENSE_DATA = re.compile(r'["\\{}%]')
+
+# Quoted values which the CSV parser would mistake for missing values
+_RE_QUOTED_MISSING_VALUE = re.compile(r"'\?'|''")
+
+# Whitespace at the end of values, or quoted values which must be kept as they are
+_RE_TRAILING_WHITESPACE = re.compile(r"[ \t\r]+(?=,|\n|$)")
+_RE_TRAILING_WHITESPACE_OR_QUOTED = re.compile(r"('[^']*')|[ \t\r]+(?=,|\n|$)")
+
+# Sparse data sections containing quotes, escape sequences, missing values or a
+# percent sign outside of comment lines are decoded by liac-arff
+_RE_UNSUPPORTED_SPARSE_DATA = re.compile(r'["\'\\?%]')
+
+
+class _UnsupportedData(Exception):
+    pass
+
+
+def decode_dense_arff(fh):
+    """Decode a dense ARFF file.
+
+    The result is the same as the one of ``arff.ArffDecoder().decode(fh,
+    encode_nominal=True)``, except that ``data`` is a dataframe with one column per
+    attribute instead of a list of rows.
+
+    Parameters
+    ----------
+    fh : file-like
+        ARFF file opened in text mode.
+
+    Returns
+    -------
+    dict
+        Decoded ARFF file.
+    """
+    header, data = _split_header(fh)
+    decoded = arff.ArffDecoder().decode(header, encode_nominal=True)
+    try:
+        decoded['data'] = _parse_dense_data(data, decoded['attributes'])
+    except _UnsupportedData as e:
+        logger.debug("Decoding ARFF data with liac-arff: %s", e)
+        decoded = arff.ArffDecoder().decode(header + data, encode_nominal=True)
+    return decoded
+
+
+def decode_arff_header(fh):
+    """Decode only the header of an ARFF file.
+
+    The file is only read up to the ``@data`` line, which makes this much cheaper than
+    decoding the whole file if only the attributes are needed.
+
+    Parameters
+    ----------
+    fh : file-like
+        ARFF file opened in text mode.
+
+    Returns
+    -------
+    dict
+        Decoded ARFF file with the keys ``relation``, ``description``, ``attributes``
+        and an empty list of ``data``.
+    """
+    return arff.ArffDecoder().decode(_read_header(fh), encode_nominal=True)
+
+
+def _read_header(fh):
+    """Read the header of an ARFF file, including the ``@data`` line."""
+    header = []
+    for line in fh:
+        header.append(line)
+        if line.strip().upper().startswith('@DATA'):
+            break
+    return ''.join(header)
+
+
+def _split_header(fh):
+    """Return the header (including the ``@data`` line) and the data section."""
+    header = _read_header(fh)
+    return header, fh.read()
+
+
+def _parse_dense_data(data, attributes):
+    if '%' in data:
+        data = _RE_COMMENT_LINE.sub('', data)
+    if _RE_UNSUPPORTED_DENSE_DATA.search(data):
+        raise _UnsupportedData('unsupported characters in the data section')
+    if "'" in data:
+        if _RE_QUOTED_MISSING_VALUE.search(data):
+            raise _UnsupportedData('quoted missing values')
+        if _RE_TRAILING_WHITESPACE.search(data):
+            # liac-arff strips unquoted values, the CSV parser only strips leading spaces
+            data = _RE_TRAILING_WHITESPACE_OR_QUOTED.sub(lambda m: m.group(1) or '', data)
+    elif _RE_TRAILING_WHITESPACE.search(data):
+        data = _RE_TRAILING_WHITESPACE.sub('', data)
+
+    names = [name for name, _ in attributes]
+    dtypes = {
+        name: np.float64 if type_ in _NUMERIC_TYPES else str
+        for name, type_ in attributes
+    }
+    try:
+        frame = pd.read_csv(
+            io.StringIO(data), header=None, names=names, dtype=dtypes, index_col=False,
+            quotechar="'", skipinitialspace=True, na_values=['?', ''],
+            keep_default_na=False, engine='c',
+        )
+    except (ValueError, pd.errors.ParserError) as e:
+        raise _UnsupportedData(str(e))
+    # The parser silently fills short rows with missing values
+    unquoted = _RE_QUOTED_VALUE.sub('', data) if "'" in data else data
+    if unquoted.count(',') != len(frame) * (len(names) - 1):
+        raise _UnsupportedData('rows with a wrong number of values')
+
+    columns = {}
+    for name, type_ in attributes:
+        column = frame[name]
+        if isinstance(type_, list):
+            codes = pd.Categorical(column, categories=type_).codes
+            missing = codes == -1
+            if np.any(missing & column.notna().to_numpy()):
+                raise _UnsupportedData('invalid nominal value of attribute %s' % name)
+            if np.any(missing):
+                columns[name] = np.where(missing, np.nan, codes)
+            else:
+                columns[name] = codes.astype(np.int64)
+        elif type_ == 'INTEGER' and not column.isna().any():
+            columns[name] = column.astype(np.int64)
+        elif type_ in _NUMERIC_TYPES:
+            columns[name] = column
+        elif type_ == 'STRING':
+            columns[name] = column.astype(object).where(column.notna(), None)
+        else:
+            raise _UnsupportedData('unsupported type %s of attribute %s' % (type_, name))
+    return pd.DataFrame(columns, columns=names)
+
+
+def decode_sparse_arff(fh):
+    """Decode a sparse ARFF file into a CSR matrix.
+
+    The result is the same as the one of ``arff.ArffDecoder().decode(fh,
+    encode_nominal=True, return_type=arff.COO)``, except that ``data`` is a
+    ``scipy.sparse.csr_matrix`` of type float32 with one column per attribute and one
+    row per instance. If liac-arff has to be used, ``data`` is in the COO format.
+
+    Parameters
+    ----------
+    fh : file-like
+        ARFF file opened in text mode.
+
+    Returns
+    -------
+    dict
+        Decoded ARFF file.
+    """
+    header, data = _split_header(fh)
+    decoded = arff.ArffDecoder().decode(header, encode_nominal=True, return_type=arff.COO)
+    try:
+        decoded['data'] = _parse_sparse_data(data, decoded['attributes'])
+    except _UnsupportedData as e:
+        logger.debug("Decoding ARFF data with liac-arff: %s", e)
+        decoded = arff.ArffDecoder().decode(header + data, encode_nominal=True,
+                                            return_type=arff.COO)
+    return decoded
+
+
+def _parse_sparse_data(data, attributes):
+    if '%' in data:
+        data = _RE_COMMENT_LINE.sub('', data)
+    if _RE_UNSUPPORTED_SPARSE_DATA.search(data):
+        raise _UnsupportedData('unsupported characters in the data section')
+    if any(type_ == 'STRING' for _, type_ in attributes):
+        raise _UnsupportedData('string attributes')
+
+    rows = []
+    for line in data.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] != '{' or line[-1] != '}':
+            raise _UnsupportedData('dense rows')
+        rows.append(line[1:-1].strip())
+
+    # Every row holds the index and value of its non-zero entries, separated by commas
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([row.count(',') + 1 if row else 0 for row in rows], out=indptr[1:])
+    with warnings.catch_warnings():
+        # Parsing stops at the first invalid entry, which is detected below
+        warnings.simplefilter('ignore', DeprecationWarning)
+        entries = np.fromstring(' '.join(rows).replace(',', ' '), dtype=np.float64, sep=' ')
+    if len(entries) != 2 * indptr[-1]:
+        raise _UnsupportedData('entries which are not numbers')
+    entries = entries.reshape(-1, 2)
+    indices = entries[:, 0].astype(np.int64)
+    values = entries[:, 1]
+    if np.any(indices != entries[:, 0]) or np.any(indices < 0) \
+            or np.any(indices >= len(attributes)):
+        raise _UnsupportedData('invalid attribute indices')
+
+    # Nominal values are replaced by the index of their category
+    for idx, (name, type_) in enumerate(attributes):
+        if not isinstance(type_, list):
+            continue
+        mask = indices == idx
+        try:
+            categories = np.array(type_, dtype=np.float64)
+        except ValueError:
+            raise _UnsupportedData('non-numeric categories of attribute %s' % name)
+        order = np.argsort(categories)
+        positions = np.searchsorted(categories, values[mask], sorter=order)
+        positions = np.minimum(positions, len(categories) - 1)
+        codes = order[positions]
+        if np.any(categories[codes] != values[mask]):
+            raise _UnsupportedData('invalid nominal value of attribute %s' % name)
+        values[mask] = codes
+
+    matrix = scipy.sparse.csr_matrix(
+        (values.astype(np.float32), indices.astype(np.int32), indptr),
+        shape=(len(rows), len(attributes)),
+    )
+    # Sorts the indices. liac-arff keeps the last value of an attribute given several
+    # times in a row instead of summing them up
+    matrix.sum_duplicates()
+    if matrix.nnz != len(values):
+        raise _UnsupportedData('duplicate attribute indices')
+    return matrix
+
+
+def decode_arff_in_parallel(path, sparse, n_workers):
+    """Decode an uncompressed ARFF file using several processes.
+
+    The data section is split into chunks of about the same size on line boundaries,
+    but not smaller than ``_MIN_CHUNK_SIZE`` bytes. Every chunk is read from the file
+    and parsed by a separate process, and the results are concatenated. The result is
+    the same as the one of ``decode_dense_arff`` or ``decode_sparse_arff``.
+
+    Parameters
+    ----------
+    path : str
+        Path of the ARFF file.
+    sparse : bool
+        Whether the file contains sparse data.
+    n_workers : int
+        Maximal number of processes.
+
+    Returns
+    -------
+    dict
+        Decoded ARFF file.
+    """
+    return_type = arff.COO if sparse else arff.DENSE
+    with open(path, 'rb') as fh:
+        header = []
+        while True:
+            line = fh.readline()
+            header.append(line)
+            if not line or line.strip().upper().startswith(b'@DATA'):
+                break
+        start = fh.tell()
+        end = os.fstat(fh.fileno()).st_size
+        n_chunks = max(1, min(n_workers, (end - start) // _MIN_CHUNK_SIZE))
+        boundaries = [start]
+        for idx in range(1, n_chunks):
+            fh.seek(start + idx * (end - start) // n_chunks)
+            fh.readline()
+            boundaries.append(max(fh.tell(), boundaries[-1]))
+        boundaries.append(end)
+
+    decoded = arff.ArffDecoder().decode(b''.join(header).decode('utf8'),
+                                        encode_nominal=True, return_type=return_type)
+    starts, ends = boundaries[:-1], boundaries[1:]
+    try:
+        if n_chunks == 1:
+            chunks = [_parse_data_chunk(path, start, end, decoded['attributes'], sparse)]
+        else:
+            with ProcessPoolExecutor(max_workers=n_chunks) as executor:
+                chunks = list(executor.map(
+                    _parse_data_chunk, repeat(path), starts, ends,
+                    repeat(decoded['attributes']), repeat(sparse),
+                ))
+    except _UnsupportedData as e:
+        logger.debug("Decoding ARFF data with liac-arff: %s", e)
+        with io.open(path, encoding='utf8') as fh:
+            return arff.ArffDecoder().decode(fh, encode_nominal=True, return_type=return_type)
+
+    if sparse:
+        decoded['data'] = scipy.sparse.vstack(chunks, format='csr')
+    else:
+        decoded['data'] = pd.concat(chunks, ignore_index=True)
+    return decoded
+
+
+def _parse_data_chunk(path, start, end, attributes, sparse):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        data = fh.read(end - start).decode('utf8')
+    if sparse:
+        return _parse_sparse_data(data, attributes)
+    return _parse_dense_data(data, attributes)
@@ -1,10 +1,13 @@
 from collections import OrderedDict
 import gzip
+import hashlib
 import io
+import json
 import logging
 import os
 import pickle
-from typing import List, Optional, Union
+from typing import List, Optional, Sequence, Union
+import zipfile
 
 import arff
 import numpy as np
@@ -14,6 +17,8 @@ import xmltodict
 from warnings import warn
 
 import openml._api_calls
+from .. import config
+from . import _arff
 from .data_feature import OpenMLDataFeature
 from ..exceptions import PyOpenMLError
 from ..utils import _tag_entity
@@ -21,6 +26,24 @@ from ..utils import _tag_entity
 
 logger = logging.getLogger(__name__)
 
+# File name suffixes of the formats in which the parsed data is cached
+_DATA_CACHE_SUFFIXES = {
+    'pickle': '.pkl.py3',
+    'feather': '.feather',
+    'parquet': '.parquet',
+    'npz': '.npz',
+}
+# Bytes with which complete cache files end; files written by a process which was
+# interrupted, e.g. on a file system without atomic renames, lack them
+_DATA_CACHE_TRAILERS = {
+    'pickle': b'.',
+    'feather': b'ARROW1',
+    'parquet': b'PAR1',
+}
+# Formats which can be chosen with ``config.dataset_cache_format``. Sparse data is
+# stored as npz unless pickle is chosen.
+_DATA_CACHE_FORMATS = ('feather', 'parquet', 'pickle')
+
 
 class OpenMLDataset(object):
     """Dataset object.
@@ -169,24 +192,46 @@ class OpenMLDataset(object):
         self.qualities = _check_qualities(qualities)
 
         if data_file is not None:
-            self.data_pickle_file = self._data_arff_to_pickle(data_file)
+            self.data_cache_file = self._cache_data(data_file)
         else:
-            self.data_pickle_file = None
+            self.data_cache_file = None
 
-    def _data_arff_to_pickle(self, data_file):
-        data_pickle_file = data_file.replace('.arff', '.pkl.py3')
-        if os.path.exists(data_pickle_file):
-            with open(data_pickle_file, "rb") as fh:
-                data, categorical, attribute_names = pickle.load(fh)
+    def _cache_data(self, data_file):
+        """Parse the ARFF file and cache the data in ``config.dataset_cache_format``.
 
+        Returns the path of the cache file. Data already cached as a pickle by an earlier
+        version is converted to the configured format without parsing the ARFF file again.
+        The pickle is left in place, as other processes may still be reading it.
+        """
+        cache_format = _check_data_cache_format(config.dataset_cache_format)
+        if cache_format != 'pickle':
+            # Sparse data is always stored as npz
+            for cache_format_ in (cache_format, 'npz'):
+                data_cache_file = _get_data_cache_file(data_file, cache_format_)
+                if _is_data_cache_file_complete(data_cache_file, cache_format_):
+                    logger.debug("Data cache file already exists.")
+                    return data_cache_file
+
+        data_pickle_file = _get_data_cache_file(data_file, 'pickle')
+        try:
+            pickled = _is_data_cache_file_complete(data_pickle_file, 'pickle')
+            if pickled:
+                with open(data_pickle_file, "rb") as fh:
+                    data, categorical, attribute_names = pickle.load(fh)
+        except FileNotFoundError:
+            # Removed by another process in the meantime
+            pickled = False
+        if pickled:
             # Between v0.8 and v0.9 the format of pickled data changed from
             # np.ndarray to pd.DataFrame. This breaks some backwards compatibility,
             # e.g. for `run_model_on_task`. If a local file still exists with
             # np.ndarray data, we reprocess the data file to store a pickled
             # pd.DataFrame blob. See also #646.
             if isinstance(data, pd.DataFrame) or scipy.sparse.issparse(data):
-                logger.debug("Data pickle file already exists.")
-                return data_pickle_file
+                if _get_data_cache_format(data) == 'pickle':
+                    logger.debug("Data pickle file already exists.")
+                    return data_pickle_file
+                return self._save_data(data_file, data, categorical, attribute_names)
 
         try:
             data = self._get_arff(self.format)
@@ -249,10 +294,12 @@ class OpenMLDataset(object):
 
         if self.format.lower() == 'sparse_arff':
             X = data['data']
-            X_shape = (max(X[1]) + 1, max(X[2]) + 1)
-            X = scipy.sparse.coo_matrix(
-                (X[0], (X[1], X[2])), shape=X_shape, dtype=np.float32)
-            X = X.tocsr()
+            if not scipy.sparse.issparse(X):
+                # The data was decoded by liac-arff
+                X_shape = (max(X[1]) + 1, len(data['attributes']))
+                X = scipy.sparse.coo_matrix(
+                    (X[0], (X[1], X[2])), shape=X_shape, dtype=np.float32)
+                X = X.tocsr()
 
         elif self.format.lower() == 'arff':
             X = pd.DataFrame(data['data'], columns=attribute_names)
@@ -267,15 +314,34 @@ class OpenMLDataset(object):
                     col.append(X[column_name])
             X = pd.concat(col, axis=1)
 
-        # Pickle the dataframe or the sparse matrix.
-        with open(data_pickle_file, "wb") as fh:
-            pickle.dump((X, categorical, attribute_names), fh, -1)
+        return self._save_data(data_file, X, categorical, attribute_names)
+
+    def _save_data(self, data_file, data, categorical, attribute_names):
+        cache_format = _get_data_cache_format(data)
+        if cache_format == 'npz':
+            data_cache_file = _get_data_cache_file(data_file, cache_format)
+            _save_npz(data_cache_file, data, categorical, attribute_names)
+        elif cache_format != 'pickle':
+            try:
+                data_cache_file = _get_data_cache_file(data_file, cache_format)
+                _save_columnar(data_cache_file, cache_format, data, categorical,
+                               attribute_names)
+            except (TypeError, ValueError) as e:
+                # pyarrow cannot convert columns of mixed types
+                logger.warning("Cannot store dataset %s as %s, pickling it instead: %s",
+                               self.name, cache_format, e)
+                cache_format = 'pickle'
+        if cache_format == 'pickle':
+            # Pickle the dataframe or the sparse matrix.
+            data_cache_file = _get_data_cache_file(data_file, cache_format)
+            with openml.utils._atomic_write(data_cache_file, "wb") as fh:
+                pickle.dump((data, categorical, attribute_names), fh, -1)
         logger.debug("Saved dataset {did}: {name} to file {path}"
                      .format(did=int(self.dataset_id or -1),
                              name=self.name,
-                             path=data_pickle_file)
+                             path=data_cache_file)
                      )
-        return data_pickle_file
+        return data_cache_file
 
     def push_tag(self, tag):
         """Annotates this data set with a tag on the server.
@@ -324,7 +390,10 @@ class OpenMLDataset(object):
     def _get_arff(self, format):
         """Read ARFF file and return decoded arff.
 
-        Reads the file referenced in self.data_file.
+        Reads the file referenced in self.data_file. The data is parsed with the
+        vectorized readers in ``openml.datasets._arff``, which return dense data as a
+        dataframe and sparse data as a CSR matrix. Uncompressed files are parsed by
+        ``config.arff_parse_workers`` processes.
 
         Returns
         -------
@@ -333,8 +402,6 @@ class OpenMLDataset(object):
 
         """
 
-        # TODO: add a partial read method which only returns the attribute
-        # headers of the corresponding .arff file!
         import struct
 
         filename = self.data_file
@@ -352,17 +419,37 @@ class OpenMLDataset(object):
         else:
             raise ValueError('Unknown data format %s' % format)
 
+        if config.arff_parse_workers > 1 and filename[-3:] != ".gz":
+            return _arff.decode_arff_in_parallel(
+                filename, return_type == arff.COO, config.arff_parse_workers,
+            )
+
         def decode_arff(fh):
-            decoder = arff.ArffDecoder()
-            return decoder.decode(fh, encode_nominal=True,
-                                  return_type=return_type)
+            if return_type == arff.DENSE:
+                return _arff.decode_dense_arff(fh)
+            return _arff.decode_sparse_arff(fh)
 
-        if filename[-3:] == ".gz":
-            with gzip.open(filename) as fh:
-                return decode_arff(fh)
-        else:
-            with io.open(filename, encoding='utf8') as fh:
-                return decode_arff(fh)
+        with self._open_arff() as fh:
+            return decode_arff(fh)
+
+    def _get_arff_header(self):
+        """Read the header of the ARFF file referenced in self.data_file.
+
+        Only reads the file up to the ``@data`` line, use this instead of
+        ``_get_arff`` if only the attributes are needed.
+
+        Returns
+        -------
+        dict
+            Decoded arff with an empty list of data.
+        """
+        with self._open_arff() as fh:
+            return _arff.decode_arff_header(fh)
+
+    def _open_arff(self):
+        if self.data_file[-3:] == ".gz":
+            return gzip.open(self.data_file, 'rt', encoding='utf8')
+        return io.open(self.data_file, encoding='utf8')
 
     @staticmethod
     def _convert_array_format(data, array_format, attribute_names):
@@ -402,15 +489,14 @@ class OpenMLDataset(object):
 
     @staticmethod
     def _unpack_categories(series, categories):
-        col = []
-        for x in series:
-            try:
-                col.append(categories[int(x)])
-            except (TypeError, ValueError):
-                col.append(np.nan)
+        # The ARFF decoder encodes nominal values as integer codes and missing values
+        # as None, which become NaN here
+        codes = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64)
+        missing = np.isnan(codes)
+        codes = np.where(missing, -1, codes).astype(np.int64)
         # We require two lines to create a series of categories as detailed here:
         # https://pandas.pydata.org/pandas-docs/version/0.24/user_guide/categorical.html#series-creation  # noqa E501
-        raw_cat = pd.Categorical(col, ordered=True, categories=categories)
+        raw_cat = pd.Categorical.from_codes(codes, categories=categories, ordered=True)
         return pd.Series(raw_cat, index=series.index, name=series.name)
 
     def _download_data(self) -> None:
@@ -424,7 +510,9 @@ class OpenMLDataset(object):
                  include_ignore_attributes: bool = False,
                  return_categorical_indicator: bool = False,
                  return_attribute_names: bool = False,
-                 dataset_format: str = None):
+                 dataset_format: str = None,
+                 columns: Optional[List[str]] = None,
+                 rows: Optional[Sequence[int]] = None):
         """ Returns dataset content as dataframes or sparse matrices.
 
         Parameters
@@ -445,6 +533,21 @@ class OpenMLDataset(object):
             The format of returned dataset.
             If ``array``, the returned dataset will be a NumPy array or a SciPy sparse matrix.
             If ``dataframe``, the returned dataset will be a Pandas DataFrame or SparseDataFrame.
+            Dense arrays are cached as ``.npy`` files and returned as read-only memory maps
+            if ``config.memmap_dataset_arrays`` is set (off by default), such that all
+            processes working on the same dataset share its memory. Every selection of
+            the target and columns is cached in separate files.
+        columns : list of strings, optional
+            Names of the attributes to return, in this order. Only these columns (and the
+            target) are read from the cache, see ``config.dataset_cache_format``. The row
+            id and ignore attributes are still removed unless ``include_row_id`` or
+            ``include_ignore_attributes`` is set. All attributes are returned if ``None``.
+        rows : sequence of int, optional
+            Indices of the rows to return, in this order. Only these rows are converted
+            to a dataframe or array. Feather and Parquet files are still read a whole
+            column at a time, so the memory footprint of e.g. a single fold is only
+            proportional to its size for memory-mapped arrays (see
+            ``config.memmap_dataset_arrays``). All rows are returned if ``None``.
 
         Returns
         -------
@@ -464,20 +567,72 @@ class OpenMLDataset(object):
                  ' "dataframe" in 0.9', FutureWarning)
             dataset_format = 'array'
 
-        rval = []
-
-        if self.data_pickle_file is None:
+        if self.data_cache_file is None:
             if self.data_file is None:
                 self._download_data()
-            self.data_pickle_file = self._data_arff_to_pickle(self.data_file)
+            self.data_cache_file = self._cache_data(self.data_file)
+
+        arrays = None
+        memmap_file = None
+        if dataset_format == 'array' and config.memmap_dataset_arrays:
+            memmap_file = self._get_memmap_file(target, include_row_id,
+                                                include_ignore_attributes, columns)
+            arrays = _load_memmapped_arrays(memmap_file)
+        if arrays is None:
+            # The memory-mapped arrays are cached for all rows
+            arrays = self._select_data(target, include_row_id,
+                                       include_ignore_attributes, dataset_format,
+                                       columns, None if memmap_file is not None else rows)
+            if memmap_file is not None and isinstance(arrays[0], np.ndarray):
+                arrays = _save_memmapped_arrays(memmap_file, *arrays)
+        x, y, categorical, attribute_names = arrays
+        if memmap_file is not None and rows is not None:
+            # Only the pages holding the requested rows are read from the memory map
+            x = x[rows]
+            y = y[rows] if y is not None else None
+
+        rval = [x] if target is None else [x, y]
+        if return_categorical_indicator:
+            rval.append(categorical)
+        if return_attribute_names:
+            rval.append(attribute_names)
 
-        path = self.data_pickle_file
+        if len(rval) == 1:
+            return rval[0]
+        else:
+            return rval
+
+    def _get_memmap_file(self, target, include_row_id, include_ignore_attributes,
+                         columns):
+        """Return the path prefix of the arrays cached for the given column selection."""
+        selection = json.dumps([
+            target, include_row_id, include_ignore_attributes,
+            self.row_id_attribute, self.ignore_attributes, columns,
+        ])
+        key = hashlib.md5(selection.encode('utf8')).hexdigest()[:16]
+        return self.data_file.replace('.arff', '.{}'.format(key))
+
+    def _select_data(self, target, include_row_id, include_ignore_attributes,
+                     dataset_format, columns=None, rows=None):
+        """Load the cached data and split it according to the arguments of ``get_data``.
+
+        Returns
+        -------
+        tuple
+            The data without the target column, the target column (``None`` if
+            ``target`` is ``None``), the categorical indicator and the attribute names.
+        """
+        if columns is not None and target is not None:
+            # The target is loaded in addition to the requested columns
+            targets = target.split(',') if isinstance(target, str) else target
+            columns = list(columns) + [column for column in targets if column not in columns]
+
+        path = self.data_cache_file
         if not os.path.exists(path):
-            raise ValueError("Cannot find a pickle file for dataset %s at "
+            raise ValueError("Cannot find a cache file for dataset %s at "
                              "location %s " % (self.name, path))
         else:
-            with open(path, "rb") as fh:
-                data, categorical, attribute_names = pickle.load(fh)
+            data, categorical, attribute_names = _load_data(path, columns, rows)
 
         to_exclude = []
         if include_row_id is False:
@@ -512,9 +667,9 @@ class OpenMLDataset(object):
                                zip(attribute_names, keep) if k]
 
         if target is None:
-            data = self._convert_array_format(data, dataset_format,
-                                              attribute_names)
-            rval.append(data)
+            x = self._convert_array_format(data, dataset_format,
+                                           attribute_names)
+            y = None
         else:
             if isinstance(target, str):
                 if ',' in target:
@@ -549,22 +704,13 @@ class OpenMLDataset(object):
             x = self._convert_array_format(x, dataset_format, attribute_names)
             if scipy.sparse.issparse(y):
                 y = np.asarray(y.todense()).astype(target_dtype).flatten()
-            y = y.squeeze()
+            else:
+                # Only squeeze the target column, a single row must remain a vector
+                y = y.squeeze(axis=1)
             y = self._convert_array_format(y, dataset_format, attribute_names)
             y = y.astype(target_dtype) if dataset_format == 'array' else y
 
-            rval.append(x)
-            rval.append(y)
-
-        if return_categorical_indicator:
-            rval.append(categorical)
-        if return_attribute_names:
-            rval.append(attribute_names)
-
-        if len(rval) == 1:
-            return rval[0]
-        else:
-            return rval
+        return x, y, categorical, attribute_names
 
     def retrieve_class_labels(self, target_name: str = 'class') -> Union[None, List[str]]:
         """Reads the datasets arff to determine the class-labels.
@@ -583,6 +729,15 @@ class OpenMLDataset(object):
         -------
         list
         """
+        if self.features is None:
+            # Without feature descriptions, the nominal values are read from the
+            # header of the ARFF file
+            if self.data_file is None:
+                self._download_data()
+            for name, type_ in self._get_arff_header()['attributes']:
+                if name == target_name and isinstance(type_, list):
+                    return type_
+            return None
         for feature in self.features.values():
             if (feature.name == target_name) and (feature.data_type == 'nominal'):
                 return feature.nominal_values
@@ -739,3 +894,230 @@ def _check_qualities(qualities):
         return qualities_
     else:
         return None
+
+
+def _check_data_cache_format(cache_format):
+    if cache_format not in _DATA_CACHE_FORMATS:
+        raise ValueError('Unknown dataset cache format %s, must be one of %s.'
+                         % (cache_format, sorted(_DATA_CACHE_FORMATS)))
+    return cache_format
+
+
+def _get_data_cache_format(data):
+    """Return the format in which ``data`` is cached.
+
+    Unless ``config.dataset_cache_format`` is pickle, sparse matrices are stored as npz.
+    If pyarrow is not installed, dataframes are pickled.
+    """
+    cache_format = _check_data_cache_format(config.dataset_cache_format)
+    if cache_format == 'pickle':
+        return 'pickle'
+    if scipy.sparse.issparse(data):
+        return 'npz'
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logger.debug("pyarrow is not installed, pickling the data instead of "
+                     "storing it as %s.", cache_format)
+        return 'pickle'
+    return cache_format
+
+
+def _get_data_cache_file(data_file, cache_format):
+    return data_file.replace('.arff', _DATA_CACHE_SUFFIXES[cache_format])
+
+
+def _is_data_cache_file_complete(path, cache_format):
+    """Check whether ``path`` exists and is a complete cache file.
+
+    Incomplete files are removed so that the data is cached again. A file which is only
+    cached in a shared cache is linked into the cache.
+    """
+    if not os.path.exists(path) and not openml.utils._link_from_shared_cache(path):
+        return False
+    if cache_format == 'npz':
+        complete = zipfile.is_zipfile(path)
+    else:
+        trailer = _DATA_CACHE_TRAILERS[cache_format]
+        with open(path, 'rb') as fh:
+            fh.seek(0, os.SEEK_END)
+            fh.seek(max(fh.tell() - len(trailer), 0))
+            complete = fh.read() == trailer
+    if not complete:
+        logger.warning("Removing the incomplete data cache file %s.", path)
+        os.remove(path)
+    return complete
+
+
+def _save_columnar(path, cache_format, data, categorical, attribute_names):
+    """Store a dataframe in a Feather or Parquet file, one column at a time.
+
+    The categorical indicator, attribute names and the categories of all categorical
+    columns are stored in the schema metadata of the file.
+    """
+    import pyarrow
+
+    categories = {
+        name: data[name].cat.categories.tolist()
+        for name, is_categorical in zip(attribute_names, categorical)
+        if is_categorical and data[name].dtype.name == 'category'
+    }
+    table = pyarrow.Table.from_pandas(data, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'openml'] = json.dumps({
+        'categorical': categorical,
+        'attribute_names': attribute_names,
+        'categories': categories,
+    }).encode('utf8')
+    table = table.replace_schema_metadata(metadata)
+    with openml.utils._atomic_write(path, 'wb') as fh:
+        if cache_format == 'feather':
+            import pyarrow.feather
+            pyarrow.feather.write_feather(table, fh)
+        else:
+            import pyarrow.parquet
+            pyarrow.parquet.write_table(table, fh)
+
+
+def _save_npz(path, data, categorical, attribute_names):
+    """Store a sparse matrix as npz file, which can be loaded without pickle."""
+    data = data.tocsr()
+    with openml.utils._atomic_write(path, 'wb') as fh:
+        np.savez(
+            fh,
+            data=data.data, indices=data.indices, indptr=data.indptr,
+            shape=np.array(data.shape),
+            categorical=np.array(categorical, dtype=bool),
+            attribute_names=np.array(attribute_names, dtype=str),
+        )
+
+
+def _load_npz(path):
+    with np.load(path, allow_pickle=False) as npz:
+        data = scipy.sparse.csr_matrix(
+            (npz['data'], npz['indices'], npz['indptr']), shape=tuple(npz['shape']),
+        )
+        return data, npz['categorical'].tolist(), npz['attribute_names'].tolist()
+
+
+def _load_data(path, columns=None, rows=None):
+    """Load the data cached at ``path``.
+
+    Parameters
+    ----------
+    path : str
+        Path of the cache file.
+    columns : list of str, optional
+        Names of the attributes to load, in this order. Feather and Parquet files only
+        read these columns from disk. All attributes are loaded if ``None``.
+    rows : sequence of int, optional
+        Indices of the rows to load, in this order. All rows are loaded if ``None``.
+        Feather and Parquet files are read whole columns at a time, of which only these
+        rows are converted to pandas.
+
+    Returns
+    -------
+    tuple
+        The data (a dataframe or a sparse matrix), the categorical indicator and the
+        attribute names.
+    """
+    is_npz = path.endswith(_DATA_CACHE_SUFFIXES['npz'])
+    if is_npz or path.endswith(_DATA_CACHE_SUFFIXES['pickle']):
+        if is_npz:
+            data, categorical, attribute_names = _load_npz(path)
+        else:
+            with open(path, "rb") as fh:
+                data, categorical, attribute_names = pickle.load(fh)
+        if columns is not None:
+            indices = _get_column_indices(attribute_names, columns)
+            if hasattr(data, 'iloc'):
+                data = data.iloc[:, indices]
+            else:
+                data = data[:, indices]
+            categorical = [categorical[idx] for idx in indices]
+            attribute_names = list(columns)
+        if rows is not None:
+            data = data.iloc[rows] if hasattr(data, 'iloc') else data[rows]
+        return data, categorical, attribute_names
+
+    if path.endswith(_DATA_CACHE_SUFFIXES['feather']):
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.ipc
+        with pyarrow.memory_map(path) as source:
+            schema = pyarrow.ipc.open_file(source).schema
+        read_table = pyarrow.feather.read_table
+    else:
+        import pyarrow.parquet
+        schema = pyarrow.parquet.read_schema(path)
+        read_table = pyarrow.parquet.read_table
+
+    metadata = json.loads(schema.metadata[b'openml'].decode('utf8'))
+    categorical = metadata['categorical']
+    attribute_names = metadata['attribute_names']
+    if columns is not None:
+        indices = _get_column_indices(attribute_names, columns)
+        categorical = [categorical[idx] for idx in indices]
+        attribute_names = list(columns)
+
+    table = read_table(path, columns=attribute_names)
+    if rows is None:
+        data = table.to_pandas()
+    else:
+        # Only convert the requested rows to pandas, keeping their original labels
+        rows = np.asarray(rows)
+        data = table.take(rows).to_pandas()
+        data.index = pd.Index(rows)
+    # Not all categories survive the round trip, e.g. Parquet does not support
+    # dictionary encoded booleans
+    for name, categories in metadata['categories'].items():
+        if name in data and data[name].dtype.name != 'category':
+            data[name] = pd.Series(
+                pd.Categorical(data[name], categories=categories, ordered=True),
+                index=data.index, name=name,
+            )
+    return data, categorical, attribute_names
+
+
+def _get_column_indices(attribute_names, columns):
+    indices = {name: idx for idx, name in enumerate(attribute_names)}
+    unknown = [column for column in columns if column not in indices]
+    if len(unknown) > 0:
+        raise ValueError('Unknown attributes %s.' % unknown)
+    return [indices[column] for column in columns]
+
+
+def _load_memmapped_arrays(memmap_file):
+    """Load the arrays cached by ``_save_memmapped_arrays`` as read-only memory maps.
+
+    Returns ``None`` if the arrays are not cached.
+    """
+    if not os.path.exists(memmap_file + '.json'):
+        # The metadata is linked last, as it marks the arrays as complete
+        for suffix in ('.X.npy', '.y.npy', '.json'):
+            openml.utils._link_from_shared_cache(memmap_file + suffix)
+    try:
+        with open(memmap_file + '.json', encoding='utf8') as fh:
+            metadata = json.load(fh)
+    except FileNotFoundError:
+        return None
+    x = np.load(memmap_file + '.X.npy', mmap_mode='r')
+    y = np.load(memmap_file + '.y.npy', mmap_mode='r') if metadata['has_target'] else None
+    return x, y, metadata['categorical'], metadata['attribute_names']
+
+
+def _save_memmapped_arrays(memmap_file, x, y, categorical, attribute_names):
+    """Store the data and target arrays as ``.npy`` files and return memory maps of them.
+
+    The metadata file is written last, so that incomplete arrays are never loaded.
+    """
+    arrays = [('.X.npy', x)] + ([('.y.npy', y)] if y is not None else [])
+    for suffix, array in arrays:
+        with openml.utils._atomic_write(memmap_file + suffix, 'wb') as fh:
+            np.save(fh, np.asarray(array))
+    openml.utils._write_file_atomically(memmap_file + '.json', json.dumps({
+        'has_target': y is not None,
+        'categorical': categorical,
+        'attribute_names': attribute_names,
+    }))
+    return _load_memmapped_arrays(memmap_file)
@@ -1,7 +1,6 @@
 import io
 import os
-import re
-from typing import List, Dict, Union
+from typing import List, Dict, Optional, Union
 
 import numpy as np
 import arff
@@ -11,6 +10,7 @@ import xmltodict
 from scipy.sparse import coo_matrix
 from collections import OrderedDict
 
+import openml.cache
 import openml.utils
 import openml._api_calls
 from .dataset import OpenMLDataset
@@ -21,7 +21,6 @@ from ..exceptions import (
     OpenMLPrivateDatasetError,
 )
 from ..utils import (
-    _create_cache_directory,
     _remove_cache_dir_for_id,
     _create_cache_directory_for_id
 )
@@ -41,32 +40,13 @@ def _list_cached_datasets():
     list
         List with IDs of all cached datasets.
     """
-    datasets = []
-
-    dataset_cache_dir = _create_cache_directory(DATASETS_CACHE_DIR_NAME)
-    directory_content = os.listdir(dataset_cache_dir)
-    directory_content.sort()
-
     # Find all dataset ids for which we have downloaded the dataset
-    # description
-    for directory_name in directory_content:
-        # First check if the directory name could be an OpenML dataset id
-        if not re.match(r"[0-9]*", directory_name):
-            continue
-
-        dataset_id = int(directory_name)
-
-        directory_name = os.path.join(dataset_cache_dir,
-                                      directory_name)
-        dataset_directory_content = os.listdir(directory_name)
-
-        if ("dataset.arff" in dataset_directory_content
-           and "description.xml" in dataset_directory_content):
-            if dataset_id not in datasets:
-                datasets.append(dataset_id)
-
-    datasets.sort()
-    return datasets
+    # description and data
+    return [
+        dataset_id
+        for dataset_id, entry in openml.cache.list_catalog(DATASETS_CACHE_DIR_NAME).items()
+        if "dataset.arff" in entry.files and "description.xml" in entry.files
+    ]
 
 
 def _get_cached_datasets():
@@ -236,17 +216,12 @@ def _list_datasets(**kwargs):
 
 def __list_datasets(api_call):
 
-    xml_string = openml._api_calls._perform_api_call(api_call, 'get')
-    datasets_dict = xmltodict.parse(xml_string, force_list=('oml:dataset',))
-
-    # Minimalistic check if the XML is useful
-    assert type(datasets_dict['oml:data']['oml:dataset']) == list, \
-        type(datasets_dict['oml:data'])
-    assert datasets_dict['oml:data']['@xmlns:oml'] == \
-        'http://openml.org/openml', datasets_dict['oml:data']['@xmlns:oml']
+    datasets_ = openml.utils._perform_listing_call(
+        api_call, 'oml:data', 'oml:dataset', force_list=('oml:quality',),
+    )
 
     datasets = dict()
-    for dataset_ in datasets_dict['oml:data']['oml:dataset']:
+    for dataset_ in datasets_:
         did = int(dataset_['oml:did'])
         dataset = {'did': did,
                    'name': dataset_['oml:name'],
@@ -265,11 +240,16 @@ def __list_datasets(api_call):
 
 
 def _load_features_from_file(features_file: str) -> Dict:
-    with io.open(features_file, encoding='utf8') as fh:
-        features_xml = fh.read()
-        xml_dict = xmltodict.parse(features_xml,
-                                   force_list=('oml:feature', 'oml:nominal_value'))
-        return xml_dict["oml:data_features"]
+    features_xml = openml.utils._read_cached_xml(features_file)
+    if features_xml is None:
+        raise FileNotFoundError(features_file)
+    return _parse_features_xml(features_xml)
+
+
+def _parse_features_xml(features_xml: str) -> Dict:
+    xml_dict = xmltodict.parse(features_xml,
+                               force_list=('oml:feature', 'oml:nominal_value'))
+    return xml_dict["oml:data_features"]
 
 
 def check_datasets_active(dataset_ids: List[int]) -> Dict[int, bool]:
@@ -301,10 +281,12 @@ def check_datasets_active(dataset_ids: List[int]) -> Dict[int, bool]:
 def get_datasets(
         dataset_ids: List[Union[str, int]],
         download_data: bool = True,
+        max_workers: Optional[int] = None,
 ) -> List[OpenMLDataset]:
     """Download datasets.
 
-    This function iterates :meth:`openml.datasets.get_dataset`.
+    This function iterates :meth:`openml.datasets.get_dataset`, optionally using several
+    threads.
 
     Parameters
     ----------
@@ -315,19 +297,21 @@ def get_datasets(
         make the operation noticeably slower. Metadata is also still retrieved.
         If False, create the OpenMLDataset and only populate it with the metadata.
         The data may later be retrieved through the `OpenMLDataset.get_data` method.
+    max_workers : int, optional (default=None)
+        Number of threads downloading datasets concurrently. If None, the datasets are
+        downloaded one after another. Otherwise, errors are collected and raised as an
+        :class:`openml.exceptions.OpenMLBatchError` after all datasets were processed.
 
     Returns
     -------
     datasets : list of datasets
-        A list of dataset objects.
+        A list of dataset objects, in the order of ``dataset_ids``.
     """
-    datasets = []
-    for dataset_id in dataset_ids:
-        datasets.append(get_dataset(dataset_id, download_data))
-    return datasets
+    return openml.utils._get_entities(
+        get_dataset, dataset_ids, download_data, max_workers=max_workers,
+    )
 
 
-@openml.utils.thread_safe_if_oslo_installed
 def get_dataset(dataset_id: Union[int, str], download_data: bool = True) -> OpenMLDataset:
     """ Download the OpenML dataset representation, optionally also download actual data file.
 
@@ -359,30 +343,33 @@ def get_dataset(dataset_id: Union[int, str], download_data: bool = True) -> Open
         DATASETS_CACHE_DIR_NAME, dataset_id,
     )
 
-    try:
-        remove_dataset_cache = True
-        description = _get_dataset_description(did_cache_dir, dataset_id)
-        features = _get_dataset_features(did_cache_dir, dataset_id)
-        qualities = _get_dataset_qualities(did_cache_dir, dataset_id)
-
-        arff_file = _get_dataset_arff(description) if download_data else None
-
-        remove_dataset_cache = False
-    except OpenMLServerException as e:
-        # if there was an exception,
-        # check if the user had access to the dataset
-        if e.code == 112:
-            raise OpenMLPrivateDatasetError(e.message) from None
-        else:
-            raise e
-    finally:
-        if remove_dataset_cache:
-            _remove_cache_dir_for_id(DATASETS_CACHE_DIR_NAME,
-                                     did_cache_dir)
-
-    dataset = _create_dataset_from_description(
-        description, features, qualities, arff_file
-    )
+    # The cache directory must not be evicted while its files are read and downloaded
+    with openml.cache.pinned(DATASETS_CACHE_DIR_NAME, dataset_id):
+        try:
+            remove_dataset_cache = True
+            description = _get_dataset_description(did_cache_dir, dataset_id)
+            features = _get_dataset_features(did_cache_dir, dataset_id)
+            qualities = _get_dataset_qualities(did_cache_dir, dataset_id)
+
+            arff_file = _get_dataset_arff(description) if download_data else None
+
+            remove_dataset_cache = False
+        except OpenMLServerException as e:
+            # if there was an exception,
+            # check if the user had access to the dataset
+            if e.code == 112:
+                raise OpenMLPrivateDatasetError(e.message) from None
+            else:
+                raise e
+        finally:
+            if remove_dataset_cache:
+                _remove_cache_dir_for_id(DATASETS_CACHE_DIR_NAME,
+                                         did_cache_dir)
+
+        dataset = _create_dataset_from_description(
+            description, features, qualities, arff_file
+        )
+        openml.cache._record_access(DATASETS_CACHE_DIR_NAME, dataset_id)
     return dataset
 
 
@@ -659,8 +646,6 @@ def status_update(data_id, status):
 def _get_dataset_description(did_cache_dir, dataset_id):
     """Get the dataset description as xml dictionary.
 
-    This function is NOT thread/multiprocessing safe.
-
     Parameters
     ----------
     did_cache_dir : str
@@ -676,18 +661,13 @@ def _get_dataset_description(did_cache_dir, dataset_id):
 
     """
 
-    # TODO implement a cache for this that invalidates itself after some time
-    # This can be saved on disk, but cannot be cached properly, because
-    # it contains the information on whether a dataset is active.
+    # The description contains the status of the dataset, which may change. It is
+    # therefore revalidated with the server once it is older than the configured TTL.
     description_file = os.path.join(did_cache_dir, "description.xml")
-
-    try:
-        return _get_cached_dataset_description(dataset_id)
-    except OpenMLCacheException:
-        url_extension = "data/{}".format(dataset_id)
-        dataset_xml = openml._api_calls._perform_api_call(url_extension, 'get')
-        with io.open(description_file, "w", encoding='utf8') as fh:
-            fh.write(dataset_xml)
+    url_extension = "data/{}".format(dataset_id)
+    dataset_xml = openml.utils._get_cached_api_call(
+        url_extension, description_file, openml.config.dataset_description_ttl,
+    )
 
     description = xmltodict.parse(dataset_xml)[
         "oml:data_set_description"]
@@ -703,8 +683,6 @@ def _get_dataset_arff(description: Union[Dict, OpenMLDataset],
     If not, downloads the file and caches it, then returns the file path.
     The cache directory is generated based on dataset information, but can also be specified.
 
-    This function is NOT thread/multiprocessing safe.
-
     Parameters
     ----------
     description : dictionary or OpenMLDataset
@@ -730,7 +708,8 @@ def _get_dataset_arff(description: Union[Dict, OpenMLDataset],
     else:
         raise TypeError("`description` should be either OpenMLDataset or Dict.")
 
-    if cache_directory is None:
+    in_cache = cache_directory is None
+    if in_cache:
         cache_directory = _create_cache_directory_for_id(DATASETS_CACHE_DIR_NAME, did)
     output_file_path = os.path.join(cache_directory, "dataset.arff")
 
@@ -745,6 +724,9 @@ def _get_dataset_arff(description: Union[Dict, OpenMLDataset],
         e.args = (e.args[0] + additional_info,)
         raise
 
+    if in_cache and did is not None:
+        # The data may be downloaded long after the description, see OpenMLDataset.get_data
+        openml.cache._update_catalog(DATASETS_CACHE_DIR_NAME, int(did))
     return output_file_path
 
 
@@ -754,8 +736,6 @@ def _get_dataset_features(did_cache_dir, dataset_id):
     Features are feature descriptions for each column.
     (name, index, categorical, ...)
 
-    This function is NOT thread/multiprocessing safe.
-
     Parameters
     ----------
     did_cache_dir : str
@@ -770,15 +750,22 @@ def _get_dataset_features(did_cache_dir, dataset_id):
         Dictionary containing dataset feature descriptions, parsed from XML.
     """
     features_file = os.path.join(did_cache_dir, "features.xml")
+    url_extension = "data/features/{}".format(dataset_id)
 
     # Dataset features aren't subject to change...
-    if not os.path.isfile(features_file):
-        url_extension = "data/features/{}".format(dataset_id)
-        features_xml = openml._api_calls._perform_api_call(url_extension, 'get')
-        with io.open(features_file, "w", encoding='utf8') as fh:
-            fh.write(features_xml)
+    features_xml = openml.utils._read_cached_xml(features_file)
+    if features_xml is None:
+        with openml.utils._lock_cache_directory(did_cache_dir):
+            # The features may have been downloaded while waiting for the lock
+            features_xml = openml.utils._read_cached_xml(features_file)
+            if features_xml is None:
+                openml.metrics._record_cache_access(url_extension, hit=False)
+                features_xml = openml._api_calls._perform_api_call(url_extension, 'get')
+                openml.utils._write_file_atomically(features_file, features_xml)
+                return _parse_features_xml(features_xml)
 
-    return _load_features_from_file(features_file)
+    openml.metrics._record_cache_access(url_extension, hit=True)
+    return _parse_features_xml(features_xml)
 
 
 def _get_dataset_qualities(did_cache_dir, dataset_id):
@@ -786,8 +773,6 @@ def _get_dataset_qualities(did_cache_dir, dataset_id):
 
     Features are metafeatures (number of features, number of classes, ...)
 
-    This function is NOT thread/multiprocessing safe.
-
     Parameters
     ----------
     did_cache_dir : str
@@ -801,17 +786,13 @@ def _get_dataset_qualities(did_cache_dir, dataset_id):
     qualities : dict
         Dictionary containing dataset qualities, parsed from XML.
     """
-    # Dataset qualities are subject to change and must be fetched every time
+    # Dataset qualities are subject to change and are revalidated with the server once
+    # they are older than the configured TTL
     qualities_file = os.path.join(did_cache_dir, "qualities.xml")
-    try:
-        with io.open(qualities_file, encoding='utf8') as fh:
-            qualities_xml = fh.read()
-    except (OSError, IOError):
-        url_extension = "data/qualities/{}".format(dataset_id)
-        qualities_xml = openml._api_calls._perform_api_call(url_extension, 'get')
-
-        with io.open(qualities_file, "w", encoding='utf8') as fh:
-            fh.write(qualities_xml)
+    url_extension = "data/qualities/{}".format(dataset_id)
+    qualities_xml = openml.utils._get_cached_api_call(
+        url_extension, qualities_file, openml.config.dataset_qualities_ttl,
+    )
 
     xml_as_dict = xmltodict.parse(qualities_xml, force_list=('oml:quality',))
     qualities = xml_as_dict['oml:data_qualities']['oml:quality']
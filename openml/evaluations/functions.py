@@ -1,5 +1,4 @@
 import json
-import xmltodict
 
 import openml.utils
 import openml._api_calls
@@ -100,18 +99,12 @@ def _list_evaluations(function, id=None, task=None,
 
 def __list_evaluations(api_call):
     """Helper function to parse API calls which are lists of runs"""
-    xml_string = openml._api_calls._perform_api_call(api_call, 'get')
-    evals_dict = xmltodict.parse(xml_string, force_list=('oml:evaluation',))
-    # Minimalistic check if the XML is useful
-    if 'oml:evaluations' not in evals_dict:
-        raise ValueError('Error in return XML, does not contain '
-                         '"oml:evaluations": %s' % str(evals_dict))
-
-    assert type(evals_dict['oml:evaluations']['oml:evaluation']) == list, \
-        type(evals_dict['oml:evaluations'])
+    evals_ = openml.utils._perform_listing_call(
+        api_call, 'oml:evaluations', 'oml:evaluation',
+    )
 
     evals = dict()
-    for eval_ in evals_dict['oml:evaluations']['oml:evaluation']:
+    for eval_ in evals_:
         run_id = int(eval_['oml:run_id'])
         value = None
         values = None
@@ -119,7 +112,10 @@ def __list_evaluations(api_call):
         if 'oml:value' in eval_:
             value = float(eval_['oml:value'])
         if 'oml:values' in eval_:
-            values = json.loads(eval_['oml:values'])
+            values = eval_['oml:values']
+            # The JSON API may already return the values decoded
+            if isinstance(values, str):
+                values = json.loads(values)
         if 'oml:array_data' in eval_:
             array_data = eval_['oml:array_data']
 
@@ -60,3 +60,19 @@ class OpenMLRunsExistError(PyOpenMLError):
             raise ValueError("Set of run ids must be non-empty.")
         self.run_ids = run_ids
         super().__init__(message)
+
+
+class OpenMLBatchError(PyOpenMLError):
+    """ Indicates that some entities of a concurrent bulk download could not be retrieved.
+
+    ``errors`` maps each failed id to the exception it raised and ``results`` holds the
+    retrieved entities in input order, with ``None`` at the position of a failed id.
+    """
+    def __init__(self, errors: dict, results: list):
+        self.errors = errors
+        self.results = results
+        message = 'Failed to retrieve {} of {} entities: {}'.format(
+            len(errors), len(results),
+            ', '.join('{} ({!r})'.format(id_, e) for id_, e in errors.items()),
+        )
+        super().__init__(message)
@@ -1194,11 +1194,9 @@ class SklearnExtension(Extension):
         train_indices, test_indices = task.get_train_test_split_indices(
             repeat=rep_no, fold=fold_no, sample=sample_no)
         if isinstance(task, OpenMLSupervisedTask):
-            x, y = task.get_X_and_y()
-            train_x = x[train_indices]
-            train_y = y[train_indices]
-            test_x = x[test_indices]
-            test_y = y[test_indices]
+            # Only materialize the rows of this fold
+            train_x, train_y = task.get_X_and_y(rows=train_indices)
+            test_x, test_y = task.get_X_and_y(rows=test_indices)
         elif isinstance(task, OpenMLClusteringTask):
             train_x = train_indices
             test_x = test_indices
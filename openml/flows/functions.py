@@ -1,14 +1,13 @@
 import dateutil.parser
 from collections import OrderedDict
 import os
-import io
-import re
 import xmltodict
 from typing import Union, Dict
 
 from ..exceptions import OpenMLCacheException
 import openml._api_calls
 from . import OpenMLFlow
+import openml.cache
 import openml.utils
 
 
@@ -25,18 +24,11 @@ def _get_cached_flows() -> OrderedDict:
     """
     flows = OrderedDict()  # type: 'OrderedDict[int, OpenMLFlow]'
 
-    flow_cache_dir = openml.utils._create_cache_directory(FLOWS_CACHE_DIR_NAME)
-    directory_content = os.listdir(flow_cache_dir)
-    directory_content.sort()
     # Find all flow ids for which we have downloaded
     # the flow description
-
-    for filename in directory_content:
-        if not re.match(r"[0-9]*", filename):
-            continue
-
-        fid = int(filename)
-        flows[fid] = _get_cached_flow(fid)
+    for fid, entry in openml.cache.list_catalog(FLOWS_CACHE_DIR_NAME).items():
+        if "flow.xml" in entry.files:
+            flows[fid] = _get_cached_flow(fid)
 
     return flows
 
@@ -61,15 +53,15 @@ def _get_cached_flow(fid: int) -> OpenMLFlow:
     flow_file = os.path.join(fid_cache_dir, "flow.xml")
 
     try:
-        with io.open(flow_file, encoding='utf8') as fh:
-            return _create_flow_from_xml(fh.read())
+        flow_xml = openml.utils._read_cached_xml(flow_file)
+        if flow_xml is None:
+            raise FileNotFoundError
+        return _create_flow_from_xml(flow_xml)
     except (OSError, IOError):
-        openml.utils._remove_cache_dir_for_id(FLOWS_CACHE_DIR_NAME, fid_cache_dir)
         raise OpenMLCacheException("Flow file for fid %d not "
                                    "cached" % fid)
 
 
-@openml.utils.thread_safe_if_oslo_installed
 def get_flow(flow_id: int, reinstantiate: bool = False) -> OpenMLFlow:
     """Download the OpenML flow for a given flow ID.
 
@@ -87,7 +79,9 @@ def get_flow(flow_id: int, reinstantiate: bool = False) -> OpenMLFlow:
         the flow
     """
     flow_id = int(flow_id)
-    flow = _get_flow_description(flow_id)
+    # The cache directory must not be evicted while the flow is read and downloaded
+    with openml.cache.pinned(FLOWS_CACHE_DIR_NAME, flow_id):
+        flow = _get_flow_description(flow_id)
 
     if reinstantiate:
         flow.model = flow.extension.flow_to_model(flow)
@@ -112,19 +106,30 @@ def _get_flow_description(flow_id: int) -> OpenMLFlow:
     OpenMLFlow
     """
     try:
-        return _get_cached_flow(flow_id)
+        flow = _get_cached_flow(flow_id)
+        openml.metrics._record_cache_access("flow/%d" % flow_id, hit=True)
+        openml.cache._record_access(FLOWS_CACHE_DIR_NAME, flow_id)
+        return flow
     except OpenMLCacheException:
-
-        xml_file = os.path.join(
-            openml.utils._create_cache_directory_for_id(FLOWS_CACHE_DIR_NAME, flow_id),
-            "flow.xml",
-        )
-
-        flow_xml = openml._api_calls._perform_api_call("flow/%d" % flow_id, request_method='get')
-        with io.open(xml_file, "w", encoding='utf8') as fh:
-            fh.write(flow_xml)
-
-        return _create_flow_from_xml(flow_xml)
+        pass
+
+    fid_cache_dir = openml.utils._create_cache_directory_for_id(FLOWS_CACHE_DIR_NAME, flow_id)
+    with openml.utils._lock_cache_directory(fid_cache_dir):
+        # The flow may have been downloaded while waiting for the lock
+        try:
+            flow = _get_cached_flow(flow_id)
+            openml.metrics._record_cache_access("flow/%d" % flow_id, hit=True)
+        except OpenMLCacheException:
+            openml.metrics._record_cache_access("flow/%d" % flow_id, hit=False)
+
+            xml_file = os.path.join(fid_cache_dir, "flow.xml")
+            flow_xml = openml._api_calls._perform_api_call("flow/%d" % flow_id,
+                                                           request_method='get')
+            openml.utils._write_file_atomically(xml_file, flow_xml)
+            flow = _create_flow_from_xml(flow_xml)
+
+    openml.cache._record_access(FLOWS_CACHE_DIR_NAME, flow_id)
+    return flow
 
 
 def list_flows(offset: int = None, size: int = None, tag: str = None, **kwargs) \
@@ -231,17 +236,10 @@ def flow_exists(name: str, external_version: str) -> Union[int, bool]:
 
 def __list_flows(api_call: str) -> Dict[int, Dict]:
 
-    xml_string = openml._api_calls._perform_api_call(api_call, 'get')
-    flows_dict = xmltodict.parse(xml_string, force_list=('oml:flow',))
-
-    # Minimalistic check if the XML is useful
-    assert type(flows_dict['oml:flows']['oml:flow']) == list, \
-        type(flows_dict['oml:flows'])
-    assert flows_dict['oml:flows']['@xmlns:oml'] == \
-        'http://openml.org/openml', flows_dict['oml:flows']['@xmlns:oml']
+    flows_ = openml.utils._perform_listing_call(api_call, 'oml:flows', 'oml:flow')
 
     flows = dict()
-    for flow_ in flows_dict['oml:flows']['oml:flow']:
+    for flow_ in flows_:
         fid = int(flow_['oml:id'])
         flow = {'id': fid,
                 'full_name': flow_['oml:full_name'],
@@ -0,0 +1,192 @@
+"""
+Collect statistics about the requests sent to the OpenML server and the
+accesses to the local cache.
+
+Every API call is recorded with its endpoint template (for example
+``data/{id}`` or ``evaluation/list``), latency, response size, number of
+retries and HTTP status code. Aggregates can be obtained with
+:func:`snapshot`. In addition, callbacks registered with
+:func:`register_callback` receive every single record, for example to export
+them to a monitoring system.
+"""
+from collections import namedtuple
+import copy
+import logging
+import threading
+from typing import Any, Callable, Dict, List  # noqa: F401
+from urllib.parse import urlparse
+
+from . import config
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (in seconds) of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+APICallRecord = namedtuple(
+    'APICallRecord',
+    ['endpoint', 'method', 'status_code', 'latency', 'response_bytes', 'retries',
+     'cache_hit'],
+)
+APICallRecord.__doc__ = """A single request to the server or access to the cache.
+
+For requests to the server, ``cache_hit`` is ``None``. For cache accesses,
+``cache_hit`` tells whether the entity was found in the cache, and
+``method`` is ``'cache'``.
+"""
+
+_lock = threading.Lock()
+_stats = {}  # type: Dict[str, Dict[str, Any]]
+_callbacks = []  # type: List[Callable[[APICallRecord], None]]
+
+
+def _new_endpoint_stats():
+    return {
+        'calls': 0,
+        'errors': 0,
+        'retries': 0,
+        'response_bytes': 0,
+        'status_codes': {},
+        'cache_hits': 0,
+        'cache_misses': 0,
+        'latency': {
+            'sum': 0.0,
+            'buckets': list(LATENCY_BUCKETS),
+            'counts': [0] * len(LATENCY_BUCKETS),
+        },
+    }
+
+
+def _get_endpoint_template(url):
+    """Map a URL or API call to its endpoint template.
+
+    Numeric path segments are replaced by ``{id}`` and any segment following
+    an id by ``{name}``. Filters of listing calls and arguments of existence
+    checks are dropped, e.g. ``evaluation/list/function/area_under_roc_curve``
+    becomes ``evaluation/list``.
+    """
+    server_path = urlparse(config.server).path.strip('/')
+    path = urlparse(url).path.strip('/')
+    if server_path and path.startswith(server_path):
+        path = path[len(server_path):].strip('/')
+
+    template = []
+    for segment in path.split('/'):
+        if segment.replace(',', '').isdigit():
+            template.append('{id}')
+        elif len(template) > 0 and template[-1] in ('{id}', '{name}'):
+            template.append('{name}')
+        else:
+            template.append(segment)
+            if segment in ('list', 'exists'):
+                break
+    return '/'.join(template)
+
+
+def _record(record):
+    with _lock:
+        stats = _stats.setdefault(record.endpoint, _new_endpoint_stats())
+        if record.cache_hit is None:
+            stats['calls'] += 1
+            stats['retries'] += record.retries
+            stats['response_bytes'] += record.response_bytes
+            if record.status_code is None or record.status_code >= 400:
+                stats['errors'] += 1
+            status_codes = stats['status_codes']
+            status_codes[record.status_code] = status_codes.get(record.status_code, 0) + 1
+            latency = stats['latency']
+            latency['sum'] += record.latency
+            for idx, upper_bound in enumerate(LATENCY_BUCKETS):
+                if record.latency <= upper_bound:
+                    latency['counts'][idx] += 1
+                    break
+        elif record.cache_hit:
+            stats['cache_hits'] += 1
+        else:
+            stats['cache_misses'] += 1
+        callbacks = list(_callbacks)
+
+    for callback in callbacks:
+        try:
+            callback(record)
+        except Exception:
+            # Monitoring must never break an API call
+            logger.exception('Metrics callback %r failed.', callback)
+
+
+def _record_request(request_method, url, status_code, latency, response_bytes, retries):
+    _record(APICallRecord(
+        endpoint=_get_endpoint_template(url),
+        method=request_method,
+        status_code=status_code,
+        latency=latency,
+        response_bytes=response_bytes,
+        retries=retries,
+        cache_hit=None,
+    ))
+
+
+def _record_cache_access(call, hit):
+    """Record whether the entity behind the API call ``call`` was found in the cache."""
+    _record(APICallRecord(
+        endpoint=_get_endpoint_template(call),
+        method='cache',
+        status_code=None,
+        latency=0.0,
+        response_bytes=0,
+        retries=0,
+        cache_hit=hit,
+    ))
+
+
+def snapshot():
+    """Return the statistics collected so far.
+
+    Returns
+    -------
+    dict
+        Mapping from endpoint template to a dictionary with the number of
+        ``calls``, ``errors`` and ``retries``, the total ``response_bytes``,
+        the number of calls per HTTP status code (``status_codes``), the
+        number of ``cache_hits`` and ``cache_misses`` and a ``latency``
+        histogram with the keys ``sum``, ``buckets`` (upper bounds in seconds)
+        and ``counts``.
+    """
+    with _lock:
+        return copy.deepcopy(_stats)
+
+
+def reset():
+    """Discard all statistics collected so far."""
+    with _lock:
+        _stats.clear()
+
+
+def register_callback(callback):
+    """Register a function which is called with every :class:`APICallRecord`.
+
+    Parameters
+    ----------
+    callback : callable
+        Called with a single argument, the record. Exceptions raised by the
+        callback are logged and otherwise ignored.
+    """
+    with _lock:
+        _callbacks.append(callback)
+
+
+def unregister_callback(callback):
+    """Remove a function registered with :func:`register_callback`.
+
+    Parameters
+    ----------
+    callback : callable
+    """
+    with _lock:
+        _callbacks.remove(callback)
+
+
+__all__ = [
+    'APICallRecord', 'snapshot', 'reset', 'register_callback', 'unregister_callback',
+]
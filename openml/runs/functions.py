@@ -1,5 +1,4 @@
 from collections import OrderedDict
-import io
 import os
 from typing import Any, List, Optional, Set, Tuple, Union, TYPE_CHECKING  # noqa F401
 import warnings
@@ -7,6 +6,7 @@ import warnings
 import xmltodict
 
 import openml
+import openml.cache
 import openml.utils
 import openml._api_calls
 from openml.exceptions import PyOpenMLError
@@ -204,13 +204,15 @@ def run_flow_on_task(
     run_environment = flow.extension.get_version_information()
     tags = ['openml-python', run_environment[1]]
 
-    # execute the run
-    res = _run_task_get_arffcontent(
-        model=flow.model,
-        task=task,
-        extension=flow.extension,
-        add_local_measures=add_local_measures,
-    )
+    # execute the run, protecting the cached task and dataset from eviction
+    with openml.cache.pinned('tasks', task.task_id), \
+            openml.cache.pinned('datasets', dataset.dataset_id):
+        res = _run_task_get_arffcontent(
+            model=flow.model,
+            task=task,
+            extension=flow.extension,
+            add_local_measures=add_local_measures,
+        )
 
     data_content, trace, fold_evaluations, sample_evaluations = res
 
@@ -447,26 +449,27 @@ def _run_task_get_arffcontent(
     )
 
 
-def get_runs(run_ids):
+def get_runs(run_ids, max_workers=None):
     """Gets all runs in run_ids list.
 
     Parameters
     ----------
     run_ids : list of ints
 
+    max_workers : int, optional (default=None)
+        Number of threads downloading runs concurrently. If None, the runs are
+        downloaded one after another. Otherwise, errors are collected and raised as an
+        :class:`openml.exceptions.OpenMLBatchError` after all runs were processed.
+
     Returns
     -------
     runs : list of OpenMLRun
         List of runs corresponding to IDs, fetched from the server.
     """
 
-    runs = []
-    for run_id in run_ids:
-        runs.append(get_run(run_id))
-    return runs
+    return openml.utils._get_entities(get_run, run_ids, max_workers=max_workers)
 
 
-@openml.utils.thread_safe_if_oslo_installed
 def get_run(run_id):
     """Gets run corresponding to run_id.
 
@@ -485,15 +488,29 @@ def get_run(run_id):
 
     if not os.path.exists(run_dir):
         os.makedirs(run_dir)
+    openml.cache._record_access(RUNS_CACHE_DIR_NAME, run_id)
 
     try:
-        return _get_cached_run(run_id)
+        run = _get_cached_run(run_id)
+        openml.metrics._record_cache_access("run/%d" % run_id, hit=True)
+        return run
 
     except (OpenMLCacheException):
-        run_xml = openml._api_calls._perform_api_call("run/%d" % run_id,
-                                                      'get')
-        with io.open(run_file, "w", encoding='utf8') as fh:
-            fh.write(run_xml)
+        pass
+
+    with openml.utils._lock_cache_directory(run_dir):
+        # The run may have been downloaded while waiting for the lock
+        try:
+            run = _get_cached_run(run_id)
+            openml.metrics._record_cache_access("run/%d" % run_id, hit=True)
+            return run
+        except (OpenMLCacheException):
+            openml.metrics._record_cache_access("run/%d" % run_id, hit=False)
+            run_xml = openml._api_calls._perform_api_call("run/%d" % run_id,
+                                                          'get')
+            # The cache directory may have been evicted in the meantime
+            os.makedirs(run_dir, exist_ok=True)
+            openml.utils._write_file_atomically(run_file, run_xml)
 
     run = _create_run_from_xml(run_xml)
 
@@ -666,9 +683,10 @@ def _get_cached_run(run_id):
     )
     try:
         run_file = os.path.join(run_cache_dir, "description.xml")
-        with io.open(run_file, encoding='utf8') as fh:
-            run = _create_run_from_xml(xml=fh.read())
-        return run
+        run_xml = openml.utils._read_cached_xml(run_file)
+        if run_xml is None:
+            raise FileNotFoundError
+        return _create_run_from_xml(xml=run_xml)
 
     except (OSError, IOError):
         raise OpenMLCacheException("Run file for run id %d not "
@@ -788,27 +806,10 @@ def _list_runs(id=None, task=None, setup=None,
 
 def __list_runs(api_call):
     """Helper function to parse API calls which are lists of runs"""
-    xml_string = openml._api_calls._perform_api_call(api_call, 'get')
-    runs_dict = xmltodict.parse(xml_string, force_list=('oml:run',))
-    # Minimalistic check if the XML is useful
-    if 'oml:runs' not in runs_dict:
-        raise ValueError('Error in return XML, does not contain "oml:runs": %s'
-                         % str(runs_dict))
-    elif '@xmlns:oml' not in runs_dict['oml:runs']:
-        raise ValueError('Error in return XML, does not contain '
-                         '"oml:runs"/@xmlns:oml: %s'
-                         % str(runs_dict))
-    elif runs_dict['oml:runs']['@xmlns:oml'] != 'http://openml.org/openml':
-        raise ValueError('Error in return XML, value of  '
-                         '"oml:runs"/@xmlns:oml is not '
-                         '"http://openml.org/openml": %s'
-                         % str(runs_dict))
-
-    assert type(runs_dict['oml:runs']['oml:run']) == list, \
-        type(runs_dict['oml:runs'])
+    runs_ = openml.utils._perform_listing_call(api_call, 'oml:runs', 'oml:run')
 
     runs = OrderedDict()
-    for run_ in runs_dict['oml:runs']['oml:run']:
+    for run_ in runs_:
         run_id = int(run_['oml:run_id'])
         run = {'run_id': run_id,
                'task_id': int(run_['oml:task_id']),
@@ -1,11 +1,11 @@
 from collections import OrderedDict
-import io
 import os
 from typing import Any
 
 import xmltodict
 
 import openml
+import openml.cache
 from .. import config
 from .setup import OpenMLSetup, OpenMLParameter
 from openml.flows import flow_exists
@@ -63,10 +63,10 @@ def _get_cached_setup(setup_id):
     setup_cache_dir = os.path.join(cache_dir, "setups", str(setup_id))
     try:
         setup_file = os.path.join(setup_cache_dir, "description.xml")
-        with io.open(setup_file, encoding='utf8') as fh:
-            setup_xml = xmltodict.parse(fh.read())
-            setup = _create_setup_from_xml(setup_xml)
-        return setup
+        setup_xml = openml.utils._read_cached_xml(setup_file)
+        if setup_xml is None:
+            raise FileNotFoundError
+        return _create_setup_from_xml(xmltodict.parse(setup_xml))
 
     except (OSError, IOError):
         raise openml.exceptions.OpenMLCacheException(
@@ -95,14 +95,28 @@ def get_setup(setup_id):
 
     if not os.path.exists(setup_dir):
         os.makedirs(setup_dir)
+    openml.cache._record_access('setups', setup_id)
 
     try:
-        return _get_cached_setup(setup_id)
+        setup = _get_cached_setup(setup_id)
+        openml.metrics._record_cache_access('setup/%d' % setup_id, hit=True)
+        return setup
     except (openml.exceptions.OpenMLCacheException):
-        url_suffix = '/setup/%d' % setup_id
-        setup_xml = openml._api_calls._perform_api_call(url_suffix, 'get')
-        with io.open(setup_file, "w", encoding='utf8') as fh:
-            fh.write(setup_xml)
+        pass
+
+    with openml.utils._lock_cache_directory(setup_dir):
+        # The setup may have been downloaded while waiting for the lock
+        try:
+            setup = _get_cached_setup(setup_id)
+            openml.metrics._record_cache_access('setup/%d' % setup_id, hit=True)
+            return setup
+        except (openml.exceptions.OpenMLCacheException):
+            openml.metrics._record_cache_access('setup/%d' % setup_id, hit=False)
+            url_suffix = '/setup/%d' % setup_id
+            setup_xml = openml._api_calls._perform_api_call(url_suffix, 'get')
+            # The cache directory may have been evicted in the meantime
+            os.makedirs(setup_dir, exist_ok=True)
+            openml.utils._write_file_atomically(setup_file, setup_xml)
 
     result_dict = xmltodict.parse(setup_xml)
     return _create_setup_from_xml(result_dict)
@@ -161,28 +175,10 @@ def _list_setups(setup=None, **kwargs):
 
 def __list_setups(api_call):
     """Helper function to parse API calls which are lists of setups"""
-    xml_string = openml._api_calls._perform_api_call(api_call, 'get')
-    setups_dict = xmltodict.parse(xml_string, force_list=('oml:setup',))
-    openml_uri = 'http://openml.org/openml'
-    # Minimalistic check if the XML is useful
-    if 'oml:setups' not in setups_dict:
-        raise ValueError('Error in return XML, does not contain "oml:setups":'
-                         ' %s' % str(setups_dict))
-    elif '@xmlns:oml' not in setups_dict['oml:setups']:
-        raise ValueError('Error in return XML, does not contain '
-                         '"oml:setups"/@xmlns:oml: %s'
-                         % str(setups_dict))
-    elif setups_dict['oml:setups']['@xmlns:oml'] != openml_uri:
-        raise ValueError('Error in return XML, value of  '
-                         '"oml:seyups"/@xmlns:oml is not '
-                         '"%s": %s'
-                         % (openml_uri, str(setups_dict)))
-
-    assert type(setups_dict['oml:setups']['oml:setup']) == list, \
-        type(setups_dict['oml:setups'])
+    setups_ = openml.utils._perform_listing_call(api_call, 'oml:setups', 'oml:setup')
 
     setups = dict()
-    for setup_ in setups_dict['oml:setups']['oml:setup']:
+    for setup_ in setups_:
         # making it a dict to give it the right format
         current = _create_setup_from_xml({'oml:setup_parameters': setup_})
         setups[current.setup_id] = current
@@ -1,6 +1,4 @@
 from collections import OrderedDict
-import io
-import re
 import os
 import xmltodict
 
@@ -15,6 +13,7 @@ from .task import (
     OpenMLSupervisedTask,
     OpenMLTask
 )
+import openml.cache
 import openml.utils
 import openml._api_calls
 
@@ -32,18 +31,10 @@ def _get_cached_tasks():
     """
     tasks = OrderedDict()
 
-    task_cache_dir = openml.utils._create_cache_directory(TASKS_CACHE_DIR_NAME)
-    directory_content = os.listdir(task_cache_dir)
-    directory_content.sort()
-    # Find all dataset ids for which we have downloaded the dataset
-    # description
-
-    for filename in directory_content:
-        if not re.match(r"[0-9]*", filename):
-            continue
-
-        tid = int(filename)
-        tasks[tid] = _get_cached_task(tid)
+    # Find all task ids for which we have downloaded the task description
+    for tid, entry in openml.cache.list_catalog(TASKS_CACHE_DIR_NAME).items():
+        if "task.xml" in entry.files:
+            tasks[tid] = _get_cached_task(tid)
 
     return tasks
 
@@ -66,12 +57,11 @@ def _get_cached_task(tid: int) -> OpenMLTask:
     )
 
     try:
-        with io.open(os.path.join(tid_cache_dir, "task.xml"), encoding='utf8')\
-                as fh:
-            return _create_task_from_xml(fh.read())
+        task_xml = openml.utils._read_cached_xml(os.path.join(tid_cache_dir, "task.xml"))
+        if task_xml is None:
+            raise FileNotFoundError
+        return _create_task_from_xml(task_xml)
     except (OSError, IOError):
-        openml.utils._remove_cache_dir_for_id(TASKS_CACHE_DIR_NAME,
-                                              tid_cache_dir)
         raise OpenMLCacheException("Task file for tid %d not "
                                    "cached" % tid)
 
@@ -202,31 +192,16 @@ def _list_tasks(task_type_id=None, **kwargs):
 
 
 def __list_tasks(api_call):
-    xml_string = openml._api_calls._perform_api_call(api_call, 'get')
-    tasks_dict = xmltodict.parse(xml_string, force_list=('oml:task',
-                                                         'oml:input'))
-    # Minimalistic check if the XML is useful
-    if 'oml:tasks' not in tasks_dict:
-        raise ValueError('Error in return XML, does not contain "oml:runs": %s'
-                         % str(tasks_dict))
-    elif '@xmlns:oml' not in tasks_dict['oml:tasks']:
-        raise ValueError('Error in return XML, does not contain '
-                         '"oml:runs"/@xmlns:oml: %s'
-                         % str(tasks_dict))
-    elif tasks_dict['oml:tasks']['@xmlns:oml'] != 'http://openml.org/openml':
-        raise ValueError('Error in return XML, value of  '
-                         '"oml:runs"/@xmlns:oml is not '
-                         '"http://openml.org/openml": %s'
-                         % str(tasks_dict))
-
-    assert type(tasks_dict['oml:tasks']['oml:task']) == list, \
-        type(tasks_dict['oml:tasks'])
+    tasks_ = openml.utils._perform_listing_call(
+        api_call, 'oml:tasks', 'oml:task',
+        force_list=('oml:input', 'oml:quality'),
+    )
 
     tasks = dict()
     procs = _get_estimation_procedure_list()
     proc_dict = dict((x['id'], x) for x in procs)
 
-    for task_ in tasks_dict['oml:tasks']['oml:task']:
+    for task_ in tasks_:
         tid = None
         try:
             tid = int(task_['oml:task_id'])
@@ -271,10 +246,11 @@ def __list_tasks(api_call):
     return tasks
 
 
-def get_tasks(task_ids, download_data=True):
+def get_tasks(task_ids, download_data=True, max_workers=None):
     """Download tasks.
 
-    This function iterates :meth:`openml.tasks.get_task`.
+    This function iterates :meth:`openml.tasks.get_task`, optionally using several
+    threads.
 
     Parameters
     ----------
@@ -282,18 +258,21 @@ def get_tasks(task_ids, download_data=True):
         Integers/Strings representing task ids.
     download_data : bool
         Option to trigger download of data along with the meta data.
+    max_workers : int, optional (default=None)
+        Number of threads downloading tasks concurrently. If None, the tasks are
+        downloaded one after another. Otherwise, errors are collected and raised as an
+        :class:`openml.exceptions.OpenMLBatchError` after all tasks were processed.
 
     Returns
     -------
     list
+        The tasks in the order of ``task_ids``.
     """
-    tasks = []
-    for task_id in task_ids:
-        tasks.append(get_task(task_id, download_data))
-    return tasks
+    return openml.utils._get_entities(
+        get_task, task_ids, download_data, max_workers=max_workers,
+    )
 
 
-@openml.utils.thread_safe_if_oslo_installed
 def get_task(task_id: int, download_data: bool = True) -> OpenMLTask:
     """Download OpenML task for a given task ID.
 
@@ -322,47 +301,60 @@ def get_task(task_id: int, download_data: bool = True) -> OpenMLTask:
         TASKS_CACHE_DIR_NAME, task_id,
     )
 
-    try:
-        task = _get_task_description(task_id)
-        dataset = get_dataset(task.dataset_id, download_data)
-        # List of class labels availaible in dataset description
-        # Including class labels as part of task meta data handles
-        #   the case where data download was initially disabled
-        if isinstance(task, OpenMLClassificationTask):
-            task.class_labels = \
-                dataset.retrieve_class_labels(task.target_name)
-        # Clustering tasks do not have class labels
-        # and do not offer download_split
-        if download_data:
-            if isinstance(task, OpenMLSupervisedTask):
-                task.download_split()
-    except Exception as e:
-        openml.utils._remove_cache_dir_for_id(
-            TASKS_CACHE_DIR_NAME,
-            tid_cache_dir,
-        )
-        raise e
+    # The cache directory must not be evicted while its files are read and downloaded
+    with openml.cache.pinned(TASKS_CACHE_DIR_NAME, task_id):
+        try:
+            task = _get_task_description(task_id)
+            dataset = get_dataset(task.dataset_id, download_data)
+            # List of class labels availaible in dataset description
+            # Including class labels as part of task meta data handles
+            #   the case where data download was initially disabled
+            if isinstance(task, OpenMLClassificationTask):
+                task.class_labels = \
+                    dataset.retrieve_class_labels(task.target_name)
+            # Clustering tasks do not have class labels
+            # and do not offer download_split
+            if download_data:
+                if isinstance(task, OpenMLSupervisedTask):
+                    task.download_split()
+        except Exception as e:
+            openml.utils._remove_cache_dir_for_id(
+                TASKS_CACHE_DIR_NAME,
+                tid_cache_dir,
+            )
+            raise e
 
+        openml.cache._record_access(TASKS_CACHE_DIR_NAME, task_id)
     return task
 
 
 def _get_task_description(task_id):
 
     try:
-        return _get_cached_task(task_id)
+        task = _get_cached_task(task_id)
+        openml.metrics._record_cache_access("task/%d" % task_id, hit=True)
+        return task
     except OpenMLCacheException:
-        xml_file = os.path.join(
-            openml.utils._create_cache_directory_for_id(
-                TASKS_CACHE_DIR_NAME,
-                task_id,
-            ),
-            "task.xml",
-        )
+        pass
+
+    tid_cache_dir = openml.utils._create_cache_directory_for_id(
+        TASKS_CACHE_DIR_NAME,
+        task_id,
+    )
+    with openml.utils._lock_cache_directory(tid_cache_dir):
+        # The task may have been downloaded while waiting for the lock
+        try:
+            task = _get_cached_task(task_id)
+            openml.metrics._record_cache_access("task/%d" % task_id, hit=True)
+            return task
+        except OpenMLCacheException:
+            openml.metrics._record_cache_access("task/%d" % task_id, hit=False)
+
+        xml_file = os.path.join(tid_cache_dir, "task.xml")
         task_xml = openml._api_calls._perform_api_call("task/%d" % task_id,
                                                        'get')
 
-        with io.open(xml_file, "w", encoding='utf8') as fh:
-            fh.write(task_xml)
+        openml.utils._write_file_atomically(xml_file, task_xml)
         return _create_task_from_xml(task_xml)
 
 
@@ -1,10 +1,15 @@
 from collections import namedtuple, OrderedDict
+import logging
 import os
 import pickle
 
 import numpy as np
 import scipy.io.arff
 
+import openml.utils
+
+
+logger = logging.getLogger(__name__)
 
 Split = namedtuple("Split", ["train", "test"])
 
@@ -64,11 +69,15 @@ class OpenMLSplit(object):
 
         pkl_filename = filename.replace(".arff", ".pkl.py3")
 
-        if os.path.exists(pkl_filename):
-            with open(pkl_filename, "rb") as fh:
-                _ = pickle.load(fh)
-            repetitions = _["repetitions"]
-            name = _["name"]
+        if os.path.exists(pkl_filename) or openml.utils._link_from_shared_cache(pkl_filename):
+            try:
+                with open(pkl_filename, "rb") as fh:
+                    _ = pickle.load(fh)
+                repetitions = _["repetitions"]
+                name = _["name"]
+            except (EOFError, pickle.UnpicklingError) as e:
+                # Parse the arff file again
+                logger.warning("Cannot load the cached split %s: %s", pkl_filename, e)
 
         # Cache miss
         if repetitions is None:
@@ -125,7 +134,7 @@ class OpenMLSplit(object):
                             np.array(repetitions[repetition][fold][sample][1],
                                      dtype=np.int32))
 
-            with open(pkl_filename, "wb") as fh:
+            with openml.utils._atomic_write(pkl_filename, "wb") as fh:
                 pickle.dump({"name": name, "repetitions": repetitions}, fh,
                             protocol=2)
 
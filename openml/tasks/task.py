@@ -1,10 +1,20 @@
-import io
 import os
+import threading
 
+import numpy as np
+import scipy.sparse
+
+from .. import config
 from .. import datasets
 from .split import OpenMLSplit
-import openml._api_calls
-from ..utils import _create_cache_directory_for_id, _tag_entity
+import openml.utils
+from ..utils import _create_cache_directory_for_id, _tag_entity, _LRUCache
+
+
+# Arrays returned by ``OpenMLSupervisedTask.get_X_and_y``, shared by all tasks of the
+# process. Re-created whenever ``config.dataset_memory_cache_size`` changes.
+_payload_cache = None
+_payload_cache_lock = threading.Lock()
 
 
 class OpenMLTask(object):
@@ -33,17 +43,9 @@ class OpenMLTask(object):
         return train_indices, test_indices
 
     def _download_split(self, cache_file):
-        try:
-            with io.open(cache_file, encoding='utf8'):
-                pass
-        except (OSError, IOError):
-            split_url = self.estimation_procedure["data_splits_url"]
-            split_arff = openml._api_calls._read_url(split_url,
-                                                     request_method='get')
-
-            with io.open(cache_file, "w", encoding='utf8') as fh:
-                fh.write(split_arff)
-            del split_arff
+        split_url = self.estimation_procedure["data_splits_url"]
+        openml.utils._download_text_file(source=split_url,
+                                         output_path=cache_file)
 
     def download_split(self):
         """Download the OpenML split for a given task.
@@ -108,21 +110,55 @@ class OpenMLSupervisedTask(OpenMLTask):
         self.target_name = target_name
         self.split = None
 
-    def get_X_and_y(self):
+    def get_X_and_y(self, rows=None):
         """Get data associated with the current task.
 
+        Parameters
+        ----------
+        rows : sequence of int, optional
+            Indices of the rows to return, e.g. the training indices of a fold.
+            All rows are returned if ``None``.
+
         Returns
         -------
         tuple - X and y
 
+        Notes
+        -----
+        The arrays of the dataset are kept in an in-memory LRU cache with a budget of
+        ``config.dataset_memory_cache_size`` megabytes, such that the folds of a task
+        do not load the dataset again. The cached arrays are read-only, callers receive
+        copies of them which they are free to modify. Hence, the whole dataset is held
+        in memory even if only the rows of a fold are requested, unless the cache is
+        disabled or ``config.memmap_dataset_arrays`` is set, in which case the cache
+        holds memory maps and only the pages of the requested rows are read.
         """
-        dataset = self.get_dataset()
         if self.task_type_id not in (1, 2, 3):
             raise NotImplementedError(self.task_type)
-        X_and_y = dataset.get_data(
-            dataset_format='array', target=self.target_name
-        )
-        return X_and_y
+        cache = _get_payload_cache()
+        if cache is None:
+            return self.get_dataset().get_data(
+                dataset_format='array', target=self.target_name, rows=rows
+            )
+
+        key = (config.get_cache_directory(), self.dataset_id, self.target_name)
+        X_and_y = cache.get(key)
+        if X_and_y is None:
+            X_and_y = self.get_dataset().get_data(
+                dataset_format='array', target=self.target_name
+            )
+            if not cache.put(key, X_and_y):
+                # Too large to be cached, the arrays are not shared
+                X, y = X_and_y
+                return (X, y) if rows is None else (X[rows], y[rows])
+            for array in X_and_y:
+                if isinstance(array, np.ndarray):
+                    array.setflags(write=False)
+        X, y = X_and_y
+        if rows is None:
+            return X.copy(), y.copy()
+        # Indexing with a sequence of rows copies the arrays
+        return X[rows], y[rows]
 
 
 class OpenMLClassificationTask(OpenMLSupervisedTask):
@@ -215,3 +251,31 @@ class TaskTypeEnum(object):
     MACHINE_LEARNING_CHALLENGE = 6
     SURVIVAL_ANALYSIS = 7
     SUBGROUP_DISCOVERY = 8
+
+
+def _get_payload_cache():
+    """Return the process-wide cache of dataset arrays, or ``None`` if disabled."""
+    global _payload_cache
+    max_size = config.dataset_memory_cache_size * 1024 * 1024
+    if max_size <= 0:
+        return None
+    with _payload_cache_lock:
+        if _payload_cache is None or _payload_cache.max_size != max_size:
+            _payload_cache = _LRUCache(max_size, _get_payload_size)
+        return _payload_cache
+
+
+def _get_payload_size(arrays):
+    """Return the number of bytes the arrays hold in memory."""
+    size = 0
+    for array in arrays:
+        if isinstance(array, np.memmap):
+            # Memory-mapped arrays are held by the page cache of the operating system
+            continue
+        if scipy.sparse.issparse(array):
+            size += sum(getattr(array, name).nbytes
+                        for name in ('data', 'indices', 'indptr', 'row', 'col')
+                        if hasattr(array, name))
+        elif isinstance(array, np.ndarray):
+            size += array.nbytes
+    return size
@@ -6,13 +6,6 @@ import sys
 import time
 from typing import Dict
 import unittest
-import warnings
-
-# Currently, importing oslo raises a lot of warning that it will stop working
-# under python3.8; remove this once they disappear
-with warnings.catch_warnings():
-    warnings.simplefilter("ignore")
-    from oslo_concurrency import lockutils
 
 import openml
 from openml.tasks import TaskTypeEnum
@@ -82,7 +75,7 @@ class TestBase(unittest.TestCase):
         # If we're on travis, we save the api key in the config file to allow
         # the notebook tests to read them.
         if os.environ.get('TRAVIS') or os.environ.get('APPVEYOR'):
-            with lockutils.external_lock('config', lock_path=self.workdir):
+            with openml.utils._file_lock(os.path.join(self.workdir, 'config.lock')):
                 with open(openml.config.config_file, 'w') as fh:
                     fh.write('apikey = %s' % openml.config.apikey)
 
@@ -1,23 +1,49 @@
+import codecs
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import json
+import logging
 import os
 import hashlib
+import re
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, Set, Tuple  # noqa: F401
 import xmltodict
 import shutil
-import warnings
 
 import openml._api_calls
 import openml.exceptions
+import openml.metrics
 from . import config
 
-oslo_installed = False
+logger = logging.getLogger(__name__)
+
 try:
-    # Currently, importing oslo raises a lot of warning that it will stop working
-    # under python3.8; remove this once they disappear
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        from oslo_concurrency import lockutils
-        oslo_installed = True
+    import fcntl
 except ImportError:
-    pass
+    # Windows; processes rely on atomic renames only and may download a file twice
+    fcntl = None  # type: ignore
+
+# Size of the chunks in which files are downloaded and written to the cache
+_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Root element of an XML document, optionally preceded by the XML declaration
+_RE_XML_ROOT = re.compile(r'\s*(?:<\?[^>]*\?>\s*)?<([^\s/>]+)[^>]*?(/?)>')
+
+# In-process locks complementing the (inter-process) file locks, which do not
+# exclude threads of the same process from each other, together with the number of
+# threads using them, and the paths of the file locks held by the current thread
+_thread_locks = {}  # type: Dict[str, Tuple[threading.Lock, int]]
+_thread_locks_lock = threading.Lock()
+_held_file_locks = threading.local()
+
+# Expired cache entries which are being revalidated in the background
+_revalidation_executor = None
+_revalidations = set()  # type: Set[str]
+_revalidations_lock = threading.Lock()
 
 
 def extract_xml_tags(xml_tag_name, node, allow_none=True):
@@ -59,6 +85,187 @@ def extract_xml_tags(xml_tag_name, node, allow_none=True):
                              (xml_tag_name, str(node)))
 
 
+# Number of characters fed to the XML parser at once when parsing listings
+_XML_PARSE_CHUNK_SIZE = 64 * 1024
+
+# Tags of listings which carry their name as an XML attribute and their value as text,
+# e.g. <oml:quality name="NumberOfClasses">2</oml:quality>. The JSON API represents them
+# as {"name": "NumberOfClasses", "value": "2"}.
+_LISTING_ATTRIBUTE_TAGS = ('oml:quality', 'oml:input')
+
+
+def _perform_listing_call(api_call, root_tag, record_tag, force_list=()):
+    """Perform a listing call and iterate over the records of the response.
+
+    Depending on ``config.listing_format``, the listing is requested from the XML or from
+    the JSON API of the server. In both cases, the records have the layout produced by
+    ``xmltodict`` for the XML response.
+
+    Parameters
+    ----------
+    api_call : str
+        The listing call, e.g. ``data/list/tag/study_14``.
+    root_tag : str
+        Name of the root element of the XML response, e.g. ``oml:data``.
+    record_tag : str
+        Name of the elements holding the records, e.g. ``oml:dataset``.
+    force_list : iterable of str
+        Names of tags whose values are always returned as a list.
+
+    Returns
+    -------
+    iterable of dict
+    """
+    if config.listing_format == 'json':
+        json_string = openml._api_calls._perform_api_call(api_call, 'get',
+                                                          response_format='json')
+        return _json_listing_records(json_string, root_tag, record_tag, force_list)
+    elif config.listing_format == 'xml':
+        xml_string = openml._api_calls._perform_api_call(api_call, 'get')
+        return _iterparse_xml_listing(xml_string, root_tag, record_tag, force_list)
+    raise ValueError('Unknown listing format %s.' % config.listing_format)
+
+
+def _json_listing_records(json_string, root_tag, record_tag, force_list=()):
+    """Convert the records of a listing returned by the JSON API to the XML layout.
+
+    See :func:`_iterparse_xml_listing` for the parameters.
+    """
+    listing = json.loads(json_string)
+    root_name = root_tag.split(':', 1)[1]
+    if not isinstance(listing, dict) or root_name not in listing:
+        raise ValueError('Error in return JSON, does not contain "%s": %s'
+                         % (root_name, json_string[:1000]))
+    records = listing[root_name].get(record_tag.split(':', 1)[1], [])
+    if isinstance(records, dict):
+        records = [records]
+    force_list = set(force_list)
+    return [_json_to_xml_layout(record, force_list) for record in records]
+
+
+def _json_to_xml_layout(value, force_list):
+    if isinstance(value, dict):
+        result = {}
+        for key, child in value.items():
+            tag = 'oml:' + key
+            if tag in _LISTING_ATTRIBUTE_TAGS:
+                children = child if isinstance(child, list) else [child]
+                child = [_json_attribute_element_to_xml_layout(element)
+                         for element in children]
+                if len(child) == 1 and tag not in force_list:
+                    child = child[0]
+            else:
+                child = _json_to_xml_layout(child, force_list)
+                if tag in force_list and not isinstance(child, list):
+                    child = [child]
+            result[tag] = child
+        return result
+    elif isinstance(value, list):
+        return [_json_to_xml_layout(element, force_list) for element in value]
+    elif value is None or isinstance(value, str):
+        return value
+    # xmltodict only produces strings, e.g. 'true' for a boolean
+    return json.dumps(value)
+
+
+def _json_attribute_element_to_xml_layout(element):
+    result = {'@name': element['name']}
+    if element.get('value') is not None:
+        result['#text'] = _json_to_xml_layout(element['value'], set())
+    return result
+
+
+def _iterparse_xml_listing(xml_string, root_tag, record_tag, force_list=()):
+    """Incrementally parse the records of a listing returned by the server.
+
+    Contrary to parsing the complete document with ``xmltodict``, the records
+    are converted one by one and discarded from the element tree afterwards,
+    so that the document is never held as a tree of dictionaries in memory.
+    The records have the same structure as the output of ``xmltodict`` for
+    the corresponding element (using plain dicts instead of ordered dicts).
+
+    Parameters
+    ----------
+    xml_string : str
+        The XML document, e.g. ``<oml:data>...</oml:data>``.
+    root_tag : str
+        Expected name of the root element, e.g. ``oml:data``.
+    record_tag : str
+        Name of the elements holding the records, e.g. ``oml:dataset``. These
+        must be children of the root element.
+    force_list : iterable of str
+        Names of tags whose values are always returned as a list, even if a
+        record contains them only once.
+
+    Yields
+    ------
+    dict
+    """
+    parser = ElementTree.XMLPullParser(events=('start-ns', 'start', 'end'))
+    prefixes = {}
+    force_list = set(force_list)
+    root = None
+    for start in range(0, len(xml_string), _XML_PARSE_CHUNK_SIZE):
+        parser.feed(xml_string[start: start + _XML_PARSE_CHUNK_SIZE])
+        for event, elem in parser.read_events():
+            if event == 'start-ns':
+                prefix, uri = elem
+                prefixes[uri] = prefix
+            elif event == 'start' and root is None:
+                root = elem
+                tag = _prefix_xml_name(root.tag, prefixes)
+                if tag != root_tag:
+                    raise ValueError('Error in return XML, does not contain "%s": %s'
+                                     % (root_tag, xml_string[:1000]))
+                if prefixes.get('http://openml.org/openml') != root_tag.split(':')[0]:
+                    raise ValueError('Error in return XML, namespace of "%s" is not '
+                                     '"http://openml.org/openml": %s'
+                                     % (root_tag, xml_string[:1000]))
+            elif event == 'end' and elem is not root \
+                    and _prefix_xml_name(elem.tag, prefixes) == record_tag:
+                yield _xml_element_to_dict(elem, prefixes, force_list)
+                # Records are children of the root element, this frees their memory
+                root.clear()
+    parser.close()
+
+
+def _prefix_xml_name(name, prefixes):
+    """Turn an ``{uri}name`` from ElementTree into ``prefix:name`` as used by xmltodict."""
+    if name[0] == '{':
+        uri, local_name = name[1:].split('}', 1)
+        prefix = prefixes.get(uri)
+        if prefix:
+            return '%s:%s' % (prefix, local_name)
+        return local_name
+    return name
+
+
+def _xml_element_to_dict(elem, prefixes, force_list):
+    result = {}
+    for key, value in elem.attrib.items():
+        result['@' + _prefix_xml_name(key, prefixes)] = value
+    list_tags = set()
+    for child in elem:
+        tag = _prefix_xml_name(child.tag, prefixes)
+        value = _xml_element_to_dict(child, prefixes, force_list)
+        if tag in list_tags:
+            result[tag].append(value)
+        elif tag in result:
+            result[tag] = [result[tag], value]
+            list_tags.add(tag)
+        elif tag in force_list:
+            result[tag] = [value]
+            list_tags.add(tag)
+        else:
+            result[tag] = value
+    text = elem.text.strip() if elem.text is not None else ''
+    if len(result) == 0:
+        return text if text else None
+    if text:
+        result['#text'] = text
+    return result
+
+
 def _tag_entity(entity_type, entity_id, tag, untag=False):
     """
     Function that tags or untags a given entity on OpenML. As the OpenML
@@ -248,8 +455,6 @@ def _create_cache_directory_for_id(key, id_):
     is a directory for each task witch the task ID being the directory
     name. This function creates this cache directory.
 
-    This function is NOT thread/multiprocessing safe.
-
     Parameters
     ----------
     key : str
@@ -264,19 +469,19 @@ def _create_cache_directory_for_id(key, id_):
     cache_dir = os.path.join(
         _create_cache_directory(key), str(id_)
     )
-    if os.path.exists(cache_dir) and os.path.isdir(cache_dir):
-        pass
-    elif os.path.exists(cache_dir) and not os.path.isdir(cache_dir):
+    if os.path.exists(cache_dir) and not os.path.isdir(cache_dir):
         raise ValueError('%s cache dir exists but is not a directory!' % key)
-    else:
-        os.makedirs(cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
     return cache_dir
 
 
 def _remove_cache_dir_for_id(key, cache_dir):
     """Remove the task cache directory
 
-    This function is NOT thread/multiprocessing safe.
+    The directory is locked (see ``_lock_cache_directory``) so that no files are
+    downloaded into it meanwhile, and the entity is removed from the catalog of the
+    cache. Partial downloads (``*.part`` files) are kept, such that an interrupted
+    download is resumed by the next call (see ``_download_text_file``).
 
     Parameters
     ----------
@@ -284,33 +489,224 @@ def _remove_cache_dir_for_id(key, cache_dir):
 
     cache_dir : str
     """
+    # Imported here, openml.cache depends on this module
+    import openml.cache
+
     try:
-        shutil.rmtree(cache_dir)
+        with _lock_cache_directory(cache_dir):
+            try:
+                names = os.listdir(cache_dir)
+            except FileNotFoundError:
+                # Already evicted from the cache
+                names = None
+            if names is not None and not any(name.endswith('.part') for name in names):
+                shutil.rmtree(cache_dir)
+            for name in names or []:
+                path = os.path.join(cache_dir, name)
+                if name.endswith('.part') or not os.path.lexists(path):
+                    continue
+                elif os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
     except (OSError, IOError):
         raise ValueError('Cannot remove faulty %s cache directory %s.'
                          'Please do this manually!' % (key, cache_dir))
+    try:
+        entity_id = int(os.path.basename(os.path.normpath(cache_dir)))
+    except ValueError:
+        return
+    openml.cache._remove_from_catalog(key, entity_id)
+
 
+@contextlib.contextmanager
+def _thread_lock(name):
+    """Lock ``name`` for the threads of this process.
 
-def thread_safe_if_oslo_installed(func):
-    if oslo_installed:
-        def safe_func(*args, **kwargs):
-            # Lock directories use the id that is passed as either positional or keyword argument.
-            id_parameters = [parameter_name for parameter_name in kwargs if '_id' in parameter_name]
-            if len(id_parameters) == 1:
-                id_ = kwargs[id_parameters[0]]
-            elif len(args) > 0:
-                id_ = args[0]
+    Locks are removed once no thread uses them anymore.
+    """
+    with _thread_locks_lock:
+        lock, n_users = _thread_locks.get(name, (threading.Lock(), 0))
+        _thread_locks[name] = (lock, n_users + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _thread_locks_lock:
+            lock, n_users = _thread_locks[name]
+            if n_users == 1:
+                del _thread_locks[name]
             else:
-                raise RuntimeError("An id must be specified for {}, was passed: ({}, {}).".format(
-                    func.__name__, args, kwargs
-                ))
-            # The [7:] gets rid of the 'openml.' prefix
-            lock_name = "{}.{}:{}".format(func.__module__[7:], func.__name__, id_)
-            with lockutils.external_lock(name=lock_name, lock_path=_create_lockfiles_dir()):
-                return func(*args, **kwargs)
-        return safe_func
+                _thread_locks[name] = (lock, n_users - 1)
+
+
+@contextlib.contextmanager
+def _lock_cache_directory(cache_dir):
+    """Exclusively lock the cache directory of an entity, e.g. to download a file into it.
+
+    Only cache misses need to take the lock: files are moved into the cache atomically
+    (see ``_atomic_write``), so cached files can always be read without locking. Code
+    holding the lock must check again whether the file was downloaded by another
+    thread or process while it was waiting for the lock.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The cache directory of an entity, e.g. ``<cache>/datasets/1``.
+    """
+    cache_root = os.path.abspath(config.get_cache_directory())
+    cache_dir = os.path.abspath(cache_dir)
+    if os.path.commonpath([cache_root, cache_dir]) == cache_root:
+        lock_name = os.path.relpath(cache_dir, cache_root).replace(os.sep, '-')
     else:
-        return func
+        lock_name = hashlib.md5(cache_dir.encode('utf8')).hexdigest()
+    with _file_lock(os.path.join(_create_lockfiles_dir(), lock_name + '.lock')):
+        yield
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    """Exclusively lock ``path`` for the threads of this process and other processes.
+
+    The lock is reentrant and uses ``fcntl.flock``, which is released by the operating
+    system if the process dies. The lock file is removed when the lock is released.
+    """
+    held_locks = _held_file_locks.__dict__.setdefault('paths', set())
+    if path in held_locks:
+        yield
+        return
+    with _thread_lock(path):
+        fd = _acquire_file_lock(path)
+        held_locks.add(path)
+        try:
+            yield
+        finally:
+            held_locks.discard(path)
+            if fd is not None:
+                # Remove the file before it is unlocked, so that processes waiting for
+                # the lock notice that they locked a stale file
+                _remove_file_if_exists(path)
+                os.close(fd)
+
+
+def _acquire_file_lock(path):
+    if fcntl is None:
+        return None
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.path.samestat(os.fstat(fd), os.stat(path)):
+                return fd
+        except FileNotFoundError:
+            # The previous holder of the lock removed the file
+            pass
+        except BaseException:
+            os.close(fd)
+            raise
+        os.close(fd)
+
+
+def _get_entities(getter, entity_ids, *args, max_workers=None):
+    """Call ``getter`` for every id in ``entity_ids``, optionally in parallel.
+
+    Parameters
+    ----------
+    getter : callable
+        Function retrieving a single entity, e.g. ``get_dataset``. It is called as
+        ``getter(entity_id, *args)``.
+    entity_ids : iterable
+        Ids of the entities to retrieve.
+    *args : Variable length argument list
+        Further positional arguments passed on to ``getter``.
+    max_workers : int, optional (default=None)
+        Number of threads used to retrieve the entities. If ``None`` or 1, the entities
+        are retrieved one after another and the first error is raised immediately.
+        Otherwise, all entities are retrieved and errors are collected in an
+        ``OpenMLBatchError``, which is raised once all entities have been processed.
+        Every distinct id is then retrieved only once.
+
+    Returns
+    -------
+    list
+        The retrieved entities in the order of ``entity_ids``.
+    """
+    entity_ids = list(entity_ids)
+    if max_workers is None or max_workers <= 1:
+        return [getter(entity_id, *args) for entity_id in entity_ids]
+
+    # Duplicate ids are retrieved once, such that errors can be keyed by id
+    retrieved = {}
+    errors = OrderedDict()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = OrderedDict(
+            (entity_id, executor.submit(getter, entity_id, *args))
+            for entity_id in OrderedDict.fromkeys(entity_ids)
+        )
+        for entity_id, future in futures.items():
+            try:
+                retrieved[entity_id] = future.result()
+            except Exception as e:
+                errors[entity_id] = e
+    results = [retrieved.get(entity_id) for entity_id in entity_ids]
+    if len(errors) > 0:
+        raise openml.exceptions.OpenMLBatchError(errors, results)
+    return results
+
+
+class _LRUCache(object):
+    """Thread-safe least-recently-used cache with a budget in bytes.
+
+    Parameters
+    ----------
+    max_size : int
+        Maximal total size of the cached values, in bytes. Values larger than
+        this are not cached.
+    get_size : callable
+        Returns the size of a value in bytes.
+    """
+
+    def __init__(self, max_size, get_size):
+        self.max_size = max_size
+        self.size = 0
+        self._get_size = get_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value cached for ``key`` or ``None``."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        """Cache ``value``, evicting the least recently used values if necessary.
+
+        Returns whether ``value`` was cached, which is not the case if it is larger
+        than ``max_size``.
+        """
+        size = self._get_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size > self.max_size:
+                return False
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
 
 
 def _create_lockfiles_dir():
@@ -322,6 +718,38 @@ def _create_lockfiles_dir():
     return dir
 
 
+def _needs_transcoding(response, encoding):
+    """ Whether the body of `response` has to be re-encoded to be stored in `encoding`. """
+    return (
+        response.encoding is not None
+        and codecs.lookup(response.encoding).name != codecs.lookup(encoding).name
+    )
+
+
+def _request_resumed_download(source, offset, encoding):
+    """ Request the content of `source` starting at byte `offset`.
+
+    Returns ``None`` if the server does not support resuming the download, in which case
+    it has to be started from scratch.
+    """
+    headers = {'Range': 'bytes={}-'.format(offset), 'Accept-Encoding': 'identity'}
+    try:
+        response = openml._api_calls._stream_url(source, headers=headers)
+    except openml.exceptions.OpenMLServerError:
+        # For example, 416 if the partial download is larger than the file on the server
+        return None
+    content_range = response.headers.get('Content-Range', '')
+    if (
+        response.status_code != 206
+        or response.headers.get('Content-Encoding', 'identity') != 'identity'
+        or not content_range.startswith('bytes {}-'.format(offset))
+        or _needs_transcoding(response, encoding)
+    ):
+        response.close()
+        return None
+    return response
+
+
 def _download_text_file(source: str,
                         output_path: str,
                         md5_checksum: str = None,
@@ -333,6 +761,16 @@ def _download_text_file(source: str,
     By default, do nothing if a file already exists in `output_path`.
     The downloaded file can be checked against an expected md5 checksum.
 
+    The file is streamed in chunks of ``_DOWNLOAD_CHUNK_SIZE`` bytes to a partial file
+    ``<output_path>.part`` while the md5 checksum is computed on the fly, and is renamed to
+    `output_path` once it is complete. If a download is interrupted, the partial file is
+    kept and the next call requests only the missing bytes from the server (using a HTTP
+    ``Range`` request), provided that the server supports this.
+
+    Reading a file which is already downloaded takes no lock. Otherwise, the file is
+    downloaded while holding the lock of its directory (see ``_lock_cache_directory``),
+    such that concurrent threads and processes download it only once.
+
     Parameters
     ----------
     source : str
@@ -346,27 +784,396 @@ def _download_text_file(source: str,
     encoding : str, optional (default='utf8')
         The encoding with which the file should be stored.
     """
+    if _is_file_downloaded(output_path, md5_checksum, exists_ok, encoding):
+        openml.metrics._record_cache_access(source, hit=True)
+        return
+    with _lock_cache_directory(os.path.dirname(output_path)):
+        # Another thread or process may have downloaded the file in the meantime
+        if _is_file_downloaded(output_path, md5_checksum, exists_ok, encoding):
+            openml.metrics._record_cache_access(source, hit=True)
+            return
+        openml.metrics._record_cache_access(source, hit=False)
+        _download_to_file(source, output_path, md5_checksum, encoding)
+
+
+def _is_file_downloaded(output_path, md5_checksum, exists_ok, encoding):
+    """Whether ``output_path`` exists and has the checksum ``md5_checksum``.
+
+    A file with a wrong checksum is removed. A file which is only cached in a shared
+    cache is linked into the cache.
+    """
+    if not os.path.exists(output_path):
+        _link_from_shared_cache(output_path)
     try:
         with open(output_path, encoding=encoding):
-            if exists_ok:
-                return
-            else:
+            if not exists_ok:
                 raise FileExistsError
     except FileNotFoundError:
-        pass
+        return False
+    if md5_checksum is None or _has_checksum(output_path, md5_checksum):
+        return True
+    logger.warning('The checksum of the cached file %s is wrong, downloading it again.',
+                   output_path)
+    _remove_file_if_exists(output_path)
+    return False
 
-    downloaded_file = openml._api_calls._read_url(source, request_method='get')
+
+def _download_to_file(source, output_path, md5_checksum, encoding):
+    part_path = output_path + '.part'
+    try:
+        offset = os.path.getsize(part_path)
+    except OSError:
+        offset = 0
+
+    response = None
+    if offset > 0:
+        response = _request_resumed_download(source, offset, encoding)
+    if response is None:
+        offset = 0
+        response = openml._api_calls._stream_url(source)
+
+    md5 = hashlib.md5()
+    if offset > 0:
+        with open(part_path, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(_DOWNLOAD_CHUNK_SIZE), b''):
+                md5.update(chunk)
+
+    # Only transcode if the server announces a different encoding than the requested one
+    transcode = _needs_transcoding(response, encoding)
+    if transcode:
+        decoder = codecs.getincrementaldecoder(response.encoding)()
+        encoder = codecs.getincrementalencoder(encoding)()
+
+    try:
+        with response, open(part_path, 'ab' if offset > 0 else 'wb') as fh:
+            for chunk in response.iter_content(chunk_size=_DOWNLOAD_CHUNK_SIZE):
+                if transcode:
+                    chunk = encoder.encode(decoder.decode(chunk))
+                md5.update(chunk)
+                fh.write(chunk)
+            if transcode:
+                chunk = encoder.encode(decoder.decode(b'', final=True), final=True)
+                md5.update(chunk)
+                fh.write(chunk)
+            if config.cache_fsync:
+                fh.flush()
+                os.fsync(fh.fileno())
+    except BaseException:
+        # The offsets of transcoded content do not match the offsets on the server
+        if transcode:
+            _remove_file_if_exists(part_path)
+        raise
 
     if md5_checksum is not None:
-        md5 = hashlib.md5()
-        md5.update(downloaded_file.encode('utf-8'))
         md5_checksum_download = md5.hexdigest()
         if md5_checksum != md5_checksum_download:
+            _remove_file_if_exists(part_path)
             raise openml.exceptions.OpenMLHashException(
                 'Checksum {} of downloaded file is unequal to the expected checksum {}.'
                 .format(md5_checksum_download, md5_checksum))
 
-    with open(output_path, "w", encoding=encoding) as fh:
-        fh.write(downloaded_file)
+    os.replace(part_path, output_path)
+    if config.cache_fsync:
+        _fsync_directory(os.path.dirname(output_path))
+    if md5_checksum is not None:
+        _remember_checksum(output_path, md5_checksum)
+
+
+def _get_checksum_file(path):
+    return os.path.join(os.path.dirname(path), '.{}.md5'.format(os.path.basename(path)))
+
+
+def _get_checksum_stamp(path, md5_checksum):
+    stat = os.stat(path)
+    return '{} {} {}'.format(md5_checksum, stat.st_size, stat.st_mtime_ns)
+
+
+def _has_checksum(path, md5_checksum):
+    """Whether the file at ``path`` has the md5 checksum ``md5_checksum``.
+
+    A verified checksum is remembered in a hidden file next to ``path`` together with
+    the size and modification time of the file, such that files are only hashed again
+    once they are modified.
+    """
+    try:
+        with open(_get_checksum_file(path), encoding='utf8') as fh:
+            if fh.read() == _get_checksum_stamp(path, md5_checksum):
+                return True
+    except FileNotFoundError:
+        pass
+    if _get_file_md5(path) != md5_checksum:
+        return False
+    _remember_checksum(path, md5_checksum)
+    return True
+
+
+def _remember_checksum(path, md5_checksum):
+    try:
+        _write_file_atomically(_get_checksum_file(path),
+                               _get_checksum_stamp(path, md5_checksum))
+    except OSError as e:
+        # For example in a read-only cache
+        logger.debug('Cannot remember the checksum of %s: %s', path, e)
+
+
+def _get_file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(_DOWNLOAD_CHUNK_SIZE), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _remove_file_if_exists(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _get_cached_api_call(api_call, cache_file, ttl):
+    """Return the response to ``api_call``, cached in ``cache_file``.
+
+    Cached responses younger than ``ttl`` seconds are returned without contacting the
+    server. Older responses are revalidated with a conditional request, using the ``ETag``
+    and ``Last-Modified`` headers of the cached response which are stored in
+    ``<cache_file>.meta``, so that the response is only downloaded again if it changed.
+    If ``config.stale_while_revalidate`` is set, expired responses are returned right
+    away and revalidated in a background thread.
+
+    Parameters
+    ----------
+    api_call : str
+        The API call, for example ``data/1``.
+    cache_file : str
+        Path of the file in which the response is cached.
+    ttl : float or None
+        Number of seconds after which the cached response expires. It never expires if
+        ``None``.
+
+    Returns
+    -------
+    str
+        The (possibly cached) response.
+    """
+    content = _read_cached_xml(cache_file)
+    if content is not None:
+        meta = _read_cache_meta(cache_file)
+        if ttl is None or time.time() - meta['fetched'] < ttl:
+            openml.metrics._record_cache_access(api_call, hit=True)
+            return content
+        if config.stale_while_revalidate:
+            openml.metrics._record_cache_access(api_call, hit=True)
+            _schedule_revalidation(api_call, cache_file, meta)
+            return content
+
+    with _lock_cache_directory(os.path.dirname(cache_file)):
+        # Another thread or process may have fetched the response in the meantime
+        content = _read_cached_xml(cache_file)
+        if content is None:
+            openml.metrics._record_cache_access(api_call, hit=False)
+            return _revalidate_cached_api_call(api_call, cache_file, {})
+        meta = _read_cache_meta(cache_file)
+        if ttl is None or time.time() - meta['fetched'] < ttl:
+            openml.metrics._record_cache_access(api_call, hit=True)
+            return content
+        new_content = _revalidate_cached_api_call(api_call, cache_file, meta)
+    openml.metrics._record_cache_access(api_call, hit=new_content is None)
+    return content if new_content is None else new_content
+
+
+def _read_cache_meta(cache_file):
+    try:
+        with open(cache_file + '.meta', encoding='utf8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        # Entries cached by earlier versions have no meta data
+        return {'fetched': os.path.getmtime(cache_file)}
+
+
+def _revalidate_cached_api_call(api_call, cache_file, meta):
+    """Refresh ``cache_file`` if the response to ``api_call`` changed.
+
+    Returns the new response, or ``None`` if the cached response is up to date.
+    """
+    content, etag, last_modified = openml._api_calls._perform_conditional_api_call(
+        api_call, etag=meta.get('etag'), last_modified=meta.get('last_modified'),
+    )
+    if content is not None:
+        _write_file_atomically(cache_file, content)
+    meta = {'etag': etag, 'last_modified': last_modified, 'fetched': time.time()}
+    _write_file_atomically(cache_file + '.meta', json.dumps(meta))
+    return content
+
+
+def _schedule_revalidation(api_call, cache_file, meta):
+    global _revalidation_executor
+    with _revalidations_lock:
+        if cache_file in _revalidations:
+            return
+        _revalidations.add(cache_file)
+        if _revalidation_executor is None:
+            _revalidation_executor = ThreadPoolExecutor(max_workers=2)
+        _revalidation_executor.submit(_revalidate_in_background, api_call, cache_file, meta)
+
+
+def _revalidate_in_background(api_call, cache_file, meta):
+    try:
+        with _lock_cache_directory(os.path.dirname(cache_file)):
+            _revalidate_cached_api_call(api_call, cache_file, meta)
+    except Exception:
+        logger.warning('Could not revalidate the cached response to %s.', api_call,
+                       exc_info=True)
+    finally:
+        with _revalidations_lock:
+            _revalidations.discard(cache_file)
+
+
+@contextlib.contextmanager
+def _atomic_write(path, mode='w'):
+    """Open a temporary file which replaces ``path`` once the block completes.
+
+    Readers never see a partially written file at ``path``, not even if the process
+    crashes. If ``config.cache_fsync`` is set, the file is also flushed to disk before
+    it replaces ``path``, and the directory afterwards.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file to write.
+    mode : str
+        ``'w'`` to write text (encoded as utf8) or ``'wb'`` to write bytes.
+    """
+    tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else 'utf8') as fh:
+            yield fh
+            if config.cache_fsync:
+                fh.flush()
+                os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        _remove_file_if_exists(tmp_path)
+        raise
+    if config.cache_fsync:
+        _fsync_directory(os.path.dirname(path))
+
+
+def _fsync_directory(path):
+    """Flush the entries of a directory, e.g. a renamed file, to disk."""
+    try:
+        fd = os.open(path or '.', os.O_RDONLY)
+    except OSError:
+        # Directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _write_file_atomically(path, content):
+    """Write ``content`` (text or bytes) to ``path`` using ``_atomic_write``."""
+    with _atomic_write(path, 'wb' if isinstance(content, bytes) else 'w') as fh:
+        fh.write(content)
+
+
+def _read_cached_xml(path):
+    """Read a cached XML file, returning ``None`` if it is missing or incomplete.
+
+    Incomplete files, e.g. left behind by a crash of an earlier version of this package,
+    are removed so that they are downloaded again. Files which are only cached in a
+    shared cache are linked into the cache first (see ``_link_from_shared_cache``).
+    """
+    content = _read_text_file(path)
+    if content is None:
+        if not _link_from_shared_cache(path):
+            return None
+        content = _read_text_file(path)
+        if content is None:
+            return None
+    if _is_complete_xml(content):
+        return content
+    logger.warning('Removing the incomplete cache file %s.', path)
+    _remove_file_if_exists(path)
+    return None
+
+
+def _read_text_file(path):
+    try:
+        with open(path, encoding='utf8') as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def _link_from_shared_cache(path):
+    """Link ``path`` to the same file in the first shared cache which has it.
+
+    The shared caches (``config.shared_cache_directories``) are read-only and are
+    searched in order. A file found there is not copied but symbolically linked into the
+    cache directory, together with the files storing its HTTP meta data and verified
+    checksum. Files written to the cache later replace the link and never modify the
+    shared cache.
+
+    Parameters
+    ----------
+    path : str
+        Path of a file in ``config.get_cache_directory()`` which does not exist.
 
-    del downloaded_file
+    Returns
+    -------
+    bool
+        Whether the file was linked from a shared cache. A dangling link at ``path``,
+        e.g. to a shared cache which is not mounted anymore, is left to be replaced by
+        a download.
+    """
+    cache_directory = os.path.abspath(config.get_cache_directory())
+    path = os.path.abspath(path)
+    if (
+        os.path.lexists(path)
+        or os.path.commonpath([cache_directory, path]) != cache_directory
+    ):
+        return False
+    relative_path = os.path.relpath(path, cache_directory)
+    for shared_cache_directory in config._get_shared_cache_directories():
+        shared_path = os.path.join(shared_cache_directory, relative_path)
+        if not os.path.isfile(shared_path):
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for companion_path in (path + '.meta', _get_checksum_file(path)):
+            shared_companion_path = os.path.join(
+                shared_cache_directory, os.path.relpath(companion_path, cache_directory),
+            )
+            if os.path.isfile(shared_companion_path):
+                _link_file(shared_companion_path, companion_path)
+        _link_file(shared_path, path)
+        logger.debug('Linked %s from the shared cache %s.', relative_path,
+                     shared_cache_directory)
+        return True
+    return False
+
+
+def _link_file(source, path):
+    try:
+        os.symlink(source, path)
+    except FileExistsError:
+        # Linked by another thread or process
+        pass
+    except OSError:
+        # Creating symbolic links may require privileges (on Windows)
+        with open(source, 'rb') as src, _atomic_write(path, 'wb') as fh:
+            shutil.copyfileobj(src, fh)
+
+
+def _is_complete_xml(content):
+    """Cheaply check that the XML document ends with the end tag of its root element."""
+    match = _RE_XML_ROOT.match(content)
+    if match is None:
+        return False
+    if match.group(2):
+        # Empty root element
+        return match.end() == len(content.rstrip())
+    return content.rstrip().endswith('</{}>'.format(match.group(1)))
@@ -54,7 +54,7 @@ setuptools.setup(name="openml",
                          'pytest-xdist',
                          'pytest-timeout',
                          'nbformat',
-                         'oslo.concurrency'
+                         'pyarrow'
                      ],
                      'examples': [
                          'matplotlib',
@@ -1,12 +1,19 @@
+import gzip
+import io
+import os
+import shutil
 from time import time
+from unittest import mock
 from warnings import filterwarnings, catch_warnings
 
+import arff
 import numpy as np
 import pandas as pd
 import pytest
 from scipy import sparse
 
 import openml
+from openml.datasets import OpenMLDataset
 from openml.testing import TestBase
 from openml.exceptions import PyOpenMLError
 
@@ -348,6 +355,449 @@ class OpenMLDatasetTestSparse(TestBase):
         self.assertEqual(y.shape, (600, ))
 
 
+class OpenMLDatasetCacheFormatTest(TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.data_file = os.path.join(self.workdir, 'dataset.arff')
+        shutil.copy(
+            os.path.join(self.static_cache_dir, 'org', 'openml', 'test', 'datasets', '2',
+                         'dataset.arff'),
+            self.data_file,
+        )
+
+    def tearDown(self):
+        openml.config.dataset_cache_format = openml.config._defaults['dataset_cache_format']
+        openml.config.memmap_dataset_arrays = \
+            openml.config._defaults['memmap_dataset_arrays'] == 'True'
+        super().tearDown()
+
+    def _load_dataset(self, cache_format):
+        openml.config.dataset_cache_format = cache_format
+        return openml.datasets.OpenMLDataset('anneal', 'test', data_file=self.data_file)
+
+    def _get_data(self, dataset):
+        return dataset.get_data(dataset_format='dataframe',
+                                return_categorical_indicator=True,
+                                return_attribute_names=True)
+
+    def _assert_data_equal(self, data, expected):
+        pd.testing.assert_frame_equal(data[0], expected[0])
+        self.assertEqual(data[1:], expected[1:])
+
+    def test_columnar_formats(self):
+        expected = self._get_data(self._load_dataset('pickle'))
+        os.remove(os.path.join(self.workdir, 'dataset.pkl.py3'))
+        for cache_format in ['feather', 'parquet']:
+            dataset = self._load_dataset(cache_format)
+            self.assertEqual(dataset.data_cache_file,
+                             os.path.join(self.workdir, 'dataset.' + cache_format))
+            self._assert_data_equal(self._get_data(dataset), expected)
+
+    def test_migrate_pickle(self):
+        expected = self._get_data(self._load_dataset('pickle'))
+        pickle_file = os.path.join(self.workdir, 'dataset.pkl.py3')
+        self.assertTrue(os.path.exists(pickle_file))
+
+        # The pickle is converted without parsing the ARFF file again
+        os.remove(self.data_file)
+        dataset = self._load_dataset('feather')
+        self.assertEqual(dataset.data_cache_file,
+                         os.path.join(self.workdir, 'dataset.feather'))
+        self._assert_data_equal(self._get_data(dataset), expected)
+        # The pickle may still be read by other processes
+        self.assertTrue(os.path.exists(pickle_file))
+
+    def test_missing_pickle_is_a_cache_miss(self):
+        expected = self._get_data(self._load_dataset('feather'))
+        os.remove(os.path.join(self.workdir, 'dataset.feather'))
+
+        # The pickle is removed by another process after it was found
+        def is_complete(path, cache_format):
+            return cache_format == 'pickle'
+
+        with mock.patch('openml.datasets.dataset._is_data_cache_file_complete',
+                        side_effect=is_complete):
+            dataset = self._load_dataset('feather')
+        self.assertEqual(dataset.data_cache_file,
+                         os.path.join(self.workdir, 'dataset.feather'))
+        self._assert_data_equal(self._get_data(dataset), expected)
+
+    def test_arrays_writeable_by_default(self):
+        dataset = self._load_dataset('feather')
+        X, y = dataset.get_data(target='class', dataset_format='array')
+        self.assertNotIsInstance(X, np.memmap)
+        X[0, 0] = -1
+        y[0] = -1
+        self.assertEqual([name for name in os.listdir(self.workdir)
+                          if name.endswith('.npy')], [])
+
+    def test_memmap_arrays(self):
+        dataset = self._load_dataset('feather')
+        openml.config.memmap_dataset_arrays = False
+        X_expected, y_expected, categorical_expected = dataset.get_data(
+            target='class', dataset_format='array', return_categorical_indicator=True,
+        )
+        self.assertNotIsInstance(X_expected, np.memmap)
+
+        openml.config.memmap_dataset_arrays = True
+        X, y = dataset.get_data(target='class', dataset_format='array')
+        self.assertIsInstance(X, np.memmap)
+        self.assertIsInstance(y, np.memmap)
+        self.assertFalse(X.flags.writeable)
+
+        # A different selection of columns is cached separately
+        X_all = dataset.get_data(dataset_format='array')
+        self.assertIsInstance(X_all, np.memmap)
+        self.assertEqual(X_all.shape, (X_expected.shape[0], X_expected.shape[1] + 1))
+
+        # Once cached, the arrays are served without loading the data
+        os.remove(dataset.data_cache_file)
+        X, y, categorical = dataset.get_data(
+            target='class', dataset_format='array', return_categorical_indicator=True,
+        )
+        np.testing.assert_array_equal(X, X_expected)
+        np.testing.assert_array_equal(y, y_expected)
+        self.assertEqual(X.dtype, np.float32)
+        self.assertEqual(y.dtype, y_expected.dtype)
+        self.assertEqual(categorical, categorical_expected)
+
+    def test_columns(self):
+        for cache_format in ['pickle', 'feather', 'parquet']:
+            dataset = self._load_dataset(cache_format)
+            data, categorical, attribute_names = self._get_data(dataset)
+            columns = ['surface-quality', 'len', 'family']
+            X, y, X_categorical, X_attribute_names = dataset.get_data(
+                target='class', columns=columns, dataset_format='dataframe',
+                return_categorical_indicator=True, return_attribute_names=True,
+            )
+            pd.testing.assert_frame_equal(X, data[columns])
+            pd.testing.assert_series_equal(y, data['class'])
+            self.assertEqual(X_attribute_names, columns)
+            self.assertEqual(
+                X_categorical,
+                [categorical[attribute_names.index(column)] for column in columns],
+            )
+            self.assertRaisesRegex(ValueError, 'Unknown attributes', dataset.get_data,
+                                   columns=['len', 'unknown'], dataset_format='array')
+
+    def test_rows(self):
+        rows = [5, 0, 17, 3]
+        for cache_format in ['pickle', 'feather', 'parquet']:
+            dataset = self._load_dataset(cache_format)
+            data, _, _ = self._get_data(dataset)
+            X, y = dataset.get_data(target='class', rows=rows, dataset_format='dataframe')
+            pd.testing.assert_frame_equal(X, data.drop(columns='class').iloc[rows])
+            pd.testing.assert_series_equal(y, data['class'].iloc[rows])
+
+            for memmap in [False, True]:
+                openml.config.memmap_dataset_arrays = memmap
+                X_all, y_all = dataset.get_data(target='class', dataset_format='array')
+                X, y = dataset.get_data(target='class', rows=rows, dataset_format='array')
+                self.assertNotIsInstance(X, np.memmap)
+                np.testing.assert_array_equal(X, X_all[rows])
+                np.testing.assert_array_equal(y, y_all[rows])
+
+    def test_single_row(self):
+        for cache_format in ['pickle', 'feather']:
+            dataset = self._load_dataset(cache_format)
+            data, _, _ = self._get_data(dataset)
+            X, y = dataset.get_data(target='class', rows=[3], dataset_format='dataframe')
+            pd.testing.assert_frame_equal(X, data.drop(columns='class').iloc[[3]])
+            pd.testing.assert_series_equal(y, data['class'].iloc[[3]])
+
+            for memmap in [False, True]:
+                openml.config.memmap_dataset_arrays = memmap
+                X_all, y_all = dataset.get_data(target='class', dataset_format='array')
+                X, y = dataset.get_data(target='class', rows=[3], dataset_format='array')
+                np.testing.assert_array_equal(X, X_all[[3]])
+                np.testing.assert_array_equal(y, y_all[[3]])
+                self.assertEqual(y.shape, (1, ))
+
+    def test_incomplete_cache_file_is_rebuilt(self):
+        for cache_format in ['pickle', 'feather', 'parquet']:
+            expected = self._get_data(self._load_dataset(cache_format))
+            cache_file = os.path.join(self.workdir, 'dataset.' + cache_format)
+            if cache_format == 'pickle':
+                cache_file = os.path.join(self.workdir, 'dataset.pkl.py3')
+            with open(cache_file, 'rb') as fh:
+                content = fh.read()
+            with open(cache_file, 'wb') as fh:
+                fh.write(content[:len(content) // 2])
+
+            dataset = self._load_dataset(cache_format)
+            self._assert_data_equal(self._get_data(dataset), expected)
+            with open(cache_file, 'rb') as fh:
+                self.assertEqual(len(fh.read()), len(content))
+
+    def test_unknown_format(self):
+        self.assertRaisesRegex(ValueError, 'Unknown dataset cache format',
+                               self._load_dataset, 'csv')
+
+
+class OpenMLDatasetCategoriesTest(TestBase):
+    def test__unpack_categories(self):
+        categories = ['a', 'b', 'c']
+        for values in [
+            [0, 2, 1, 2, 0],
+            [0, None, 2, None],
+            [None, None],
+            [2.0, np.nan, 1.0],
+        ]:
+            series = pd.DataFrame({'x': values, 'y': 0}, index=range(10, 10 + len(values)))['x']
+            unpacked = OpenMLDataset._unpack_categories(series, categories)
+            expected = pd.Series(
+                pd.Categorical(
+                    [np.nan if value is None or value != value else categories[int(value)]
+                     for value in values],
+                    categories=categories, ordered=True,
+                ),
+                index=series.index, name='x',
+            )
+            pd.testing.assert_series_equal(unpacked, expected)
+
+        boolean = OpenMLDataset._unpack_categories(pd.Series([1, 0, None]), [True, False])
+        self.assertEqual(boolean.tolist()[:2], [False, True])
+        self.assertTrue(pd.isnull(boolean.iloc[2]))
+
+
+class OpenMLArffReaderTest(TestBase):
+    _arff = (
+        "@relation test\n"
+        "@attribute num real\n"
+        "@attribute int integer\n"
+        "@attribute nom {a, b, 'c d'}\n"
+        "@attribute str string\n"
+        "@data\n"
+        "% a comment\n"
+        "1.5,1,a,'x, y'\n"
+        "?,2,'c d',?\n"
+        "-3,3,?,z\n"
+    )
+
+    def _decode_with_liac_arff(self, arff_string):
+        decoded = arff.ArffDecoder().decode(arff_string, encode_nominal=True)
+        return pd.DataFrame(decoded['data'], columns=[name for name, _ in decoded['attributes']])
+
+    def test_decode_dense_arff(self):
+        decoded = openml.datasets._arff.decode_dense_arff(io.StringIO(self._arff))
+        self.assertIsInstance(decoded['data'], pd.DataFrame)
+        self.assertEqual(decoded['relation'], 'test')
+        self.assertEqual(decoded['attributes'][2], ('nom', ['a', 'b', 'c d']))
+        pd.testing.assert_frame_equal(decoded['data'], self._decode_with_liac_arff(self._arff),
+                                      check_dtype=False)
+        self.assertEqual(decoded['data']['int'].dtype, np.int64)
+        self.assertIsNone(decoded['data']['str'][1])
+
+    def test_decode_dense_arff_strips_values(self):
+        arff_string = self._arff.replace('-3,3,?,z', "-3 ,3\t,b  ,z ") \
+            .replace("'x, y'", "'x, y ' ")
+        decoded = openml.datasets._arff.decode_dense_arff(io.StringIO(arff_string))
+        self.assertIsInstance(decoded['data'], pd.DataFrame)
+        pd.testing.assert_frame_equal(decoded['data'],
+                                      self._decode_with_liac_arff(arff_string),
+                                      check_dtype=False)
+        self.assertEqual(list(decoded['data']['str']), ['x, y ', None, 'z'])
+
+    def test_decode_dense_arff_quoted_missing_values(self):
+        for arff_string in [
+            self._arff.replace('-3,3,?,z', "-3,3,?,'?'"),
+            self._arff.replace('-3,3,?,z', "-3,3,?,''"),
+        ]:
+            decoded = openml.datasets._arff.decode_dense_arff(io.StringIO(arff_string))
+            liac_decoded = self._decode_with_liac_arff(arff_string)
+            self.assertEqual(decoded['data'][2][3], liac_decoded['str'][2])
+            self.assertIsNotNone(decoded['data'][2][3])
+
+    def test_decode_dense_arff_falls_back_to_liac_arff(self):
+        for arff_string in [
+            self._arff.replace("'x, y'", '"x, y"'),
+            self._arff.replace('-3,3,?,z', '-3,3,?'),
+            self._arff.replace('-3,3,?,z', "-3,3,?,'?'"),
+        ]:
+            with mock.patch('arff.ArffDecoder.decode', autospec=True,
+                            side_effect=arff.ArffDecoder.decode) as decode_mock:
+                try:
+                    decoded = openml.datasets._arff.decode_dense_arff(
+                        io.StringIO(arff_string))
+                except arff.BadDataFormat:
+                    decoded = None
+            # The header and the whole file are decoded by liac-arff
+            self.assertEqual(decode_mock.call_count, 2)
+            if decoded is not None:
+                self.assertIsInstance(decoded['data'], list)
+
+    _sparse_arff = (
+        "@relation test\n"
+        "@attribute a numeric\n"
+        "@attribute b numeric\n"
+        "@attribute c {1, 0, 5}\n"
+        "@attribute d numeric\n"
+        "@data\n"
+        "% a comment\n"
+        "{0 1.5, 2 5}\n"
+        "{}\n"
+        "{1 -2,2 0, 3 1e3}\n"
+        "{}\n"
+    )
+
+    def _decode_sparse_with_liac_arff(self, arff_string):
+        decoded = arff.ArffDecoder().decode(arff_string, encode_nominal=True,
+                                            return_type=arff.COO)
+        values, rows, columns = decoded['data']
+        return sparse.coo_matrix((values, (rows, columns)), dtype=np.float32).tocsr()
+
+    def test_decode_sparse_arff(self):
+        decoded = openml.datasets._arff.decode_sparse_arff(io.StringIO(self._sparse_arff))
+        X = decoded['data']
+        self.assertIsInstance(X, sparse.csr_matrix)
+        self.assertEqual(X.dtype, np.float32)
+        # Trailing empty rows are kept
+        self.assertEqual(X.shape, (4, 4))
+        expected = self._decode_sparse_with_liac_arff(self._sparse_arff)
+        np.testing.assert_array_equal(X[:3].toarray(), expected.toarray())
+        # Nominal values are encoded as the index of their category
+        self.assertEqual(X[0, 2], 2)
+        self.assertEqual(X[2, 2], 1)
+
+    def test_decode_sparse_arff_falls_back_to_liac_arff(self):
+        for arff_string in [
+            self._sparse_arff.replace('1e3', '?'),
+            self._sparse_arff.replace('2 5', '2 4'),
+            self._sparse_arff.replace('3 1e3', '3 1e3, 1 4'),
+        ]:
+            with mock.patch('arff.ArffDecoder.decode', autospec=True,
+                            side_effect=arff.ArffDecoder.decode) as decode_mock:
+                try:
+                    decoded = openml.datasets._arff.decode_sparse_arff(
+                        io.StringIO(arff_string))
+                except arff.BadNominalValue:
+                    decoded = None
+            self.assertEqual(decode_mock.call_count, 2)
+            if decoded is not None:
+                self.assertIsInstance(decoded['data'], tuple)
+
+    def test_sparse_dataset_cached_as_npz(self):
+        data_file = os.path.join(self.workdir, 'dataset.arff')
+        with open(data_file, 'w') as fh:
+            fh.write(self._sparse_arff)
+        dataset = openml.datasets.OpenMLDataset('test', 'test', data_format='sparse_arff',
+                                                data_file=data_file)
+        self.assertEqual(dataset.data_cache_file, os.path.join(self.workdir, 'dataset.npz'))
+        X, categorical, attribute_names = dataset.get_data(
+            dataset_format='array', return_categorical_indicator=True,
+            return_attribute_names=True,
+        )
+        self.assertIsInstance(X, sparse.csr_matrix)
+        np.testing.assert_array_equal(
+            X.toarray(),
+            openml.datasets._arff.decode_sparse_arff(io.StringIO(self._sparse_arff))[
+                'data'].toarray(),
+        )
+        self.assertEqual(categorical, [False, False, True, False])
+        self.assertEqual(attribute_names, ['a', 'b', 'c', 'd'])
+
+        X, y = dataset.get_data(dataset_format='array', target='c', rows=[2, 0])
+        np.testing.assert_array_equal(y, [1, 2])
+        self.assertEqual(X.shape, (2, 3))
+
+    def test_sparse_dataset_decoded_by_liac_arff(self):
+        # The last attribute is never set, but is part of the matrix
+        data_file = os.path.join(self.workdir, 'dataset.arff')
+        with open(data_file, 'w') as fh:
+            fh.write(self._sparse_arff.replace(', 3 1e3', ', 0 ?'))
+        dataset = openml.datasets.OpenMLDataset('test', 'test', data_format='sparse_arff',
+                                                data_file=data_file)
+        X = dataset.get_data(dataset_format='array')
+        self.assertEqual(X.shape, (3, 4))
+        np.testing.assert_array_equal(X[0].toarray(), [[1.5, 0, 2, 0]])
+
+    def test_decode_arff_header(self):
+        fh = io.StringIO(self._arff)
+        header = openml.datasets._arff.decode_arff_header(fh)
+        self.assertEqual(header['relation'], 'test')
+        self.assertEqual([name for name, _ in header['attributes']],
+                         ['num', 'int', 'nom', 'str'])
+        self.assertEqual(header['data'], [])
+        # The data section is not read
+        self.assertEqual(fh.readline(), '% a comment\n')
+
+    def test_retrieve_class_labels_from_gzipped_header(self):
+        data_file = os.path.join(self.workdir, 'dataset.arff.gz')
+        with gzip.open(data_file, 'wt', encoding='utf8') as fh:
+            fh.write(self._arff)
+        dataset = openml.datasets.OpenMLDataset('test', 'test')
+        dataset.data_file = data_file
+        with mock.patch.object(OpenMLDataset, '_get_arff') as get_arff_mock:
+            self.assertEqual(dataset.retrieve_class_labels('nom'), ['a', 'b', 'c d'])
+            self.assertIsNone(dataset.retrieve_class_labels('num'))
+        self.assertEqual(get_arff_mock.call_count, 0)
+
+    def test_get_data_equal_to_liac_arff(self):
+        data_file = os.path.join(self.workdir, 'dataset.arff')
+        shutil.copy(
+            os.path.join(self.static_cache_dir, 'org', 'openml', 'test', 'datasets', '2',
+                         'dataset.arff'),
+            data_file,
+        )
+        dataset = openml.datasets.OpenMLDataset('anneal', 'test', data_file=data_file)
+        data = dataset.get_data(dataset_format='dataframe')
+
+        os.remove(dataset.data_cache_file)
+        with mock.patch.object(openml.datasets._arff, '_parse_dense_data',
+                               side_effect=openml.datasets._arff._UnsupportedData):
+            dataset = openml.datasets.OpenMLDataset('anneal', 'test', data_file=data_file)
+        pd.testing.assert_frame_equal(data, dataset.get_data(dataset_format='dataframe'))
+
+    def _write_arff(self, arff_string, n_copies):
+        # Repeat the data section to get enough rows for several chunks
+        header, data = arff_string.split('@data\n')
+        data_file = os.path.join(self.workdir, 'dataset.arff')
+        with open(data_file, 'w') as fh:
+            fh.write(header + '@data\n' + data * n_copies)
+        return data_file
+
+    @mock.patch.object(openml.datasets._arff, '_MIN_CHUNK_SIZE', 64)
+    def test_decode_dense_arff_in_parallel(self):
+        data_file = self._write_arff(self._arff, 20)
+        decoded = openml.datasets._arff.decode_arff_in_parallel(data_file, False, 4)
+        with open(data_file) as fh:
+            expected = openml.datasets._arff.decode_dense_arff(fh)
+        self.assertEqual(decoded['attributes'], expected['attributes'])
+        self.assertEqual(len(decoded['data']), 60)
+        pd.testing.assert_frame_equal(decoded['data'], expected['data'])
+
+    @mock.patch.object(openml.datasets._arff, '_MIN_CHUNK_SIZE', 64)
+    def test_decode_sparse_arff_in_parallel(self):
+        data_file = self._write_arff(self._sparse_arff, 20)
+        decoded = openml.datasets._arff.decode_arff_in_parallel(data_file, True, 4)
+        with open(data_file) as fh:
+            expected = openml.datasets._arff.decode_sparse_arff(fh)
+        self.assertIsInstance(decoded['data'], sparse.csr_matrix)
+        self.assertEqual(decoded['data'].shape, (80, 4))
+        np.testing.assert_array_equal(decoded['data'].toarray(), expected['data'].toarray())
+
+    @mock.patch.object(openml.datasets._arff, '_MIN_CHUNK_SIZE', 64)
+    def test_decode_arff_in_parallel_falls_back_to_liac_arff(self):
+        data_file = self._write_arff(self._arff.replace("'x, y'", '"x, y"'), 20)
+        decoded = openml.datasets._arff.decode_arff_in_parallel(data_file, False, 4)
+        self.assertIsInstance(decoded['data'], list)
+        self.assertEqual(len(decoded['data']), 60)
+
+    @mock.patch.object(openml.datasets._arff, 'decode_arff_in_parallel')
+    def test_get_arff_uses_arff_parse_workers(self, decode_mock):
+        data_file = self._write_arff(self._arff, 1)
+        dataset = openml.datasets.OpenMLDataset('test', 'test')
+        dataset.data_file = data_file
+        decode_mock.return_value = 'decoded'
+        openml.config.arff_parse_workers = 3
+        try:
+            self.assertEqual(dataset._get_arff('arff'), 'decoded')
+        finally:
+            openml.config.arff_parse_workers = openml.config._defaults['arff_parse_workers']
+        decode_mock.assert_called_once_with(data_file, False, 3)
+
+
 class OpenMLDatasetQualityTest(TestBase):
     def test__check_qualities(self):
         qualities = [{'oml:name': 'a', 'oml:value': '0.5'}]
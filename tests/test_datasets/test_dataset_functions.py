@@ -1,5 +1,6 @@
 import os
 import random
+import shutil
 from itertools import product
 from unittest import mock
 
@@ -9,7 +10,6 @@ import pytest
 import numpy as np
 import pandas as pd
 import scipy.sparse
-from oslo_concurrency import lockutils
 
 import openml
 from openml import OpenMLDataset
@@ -45,10 +45,7 @@ class TestOpenMLDataset(TestBase):
     def _remove_pickle_files(self):
         cache_dir = self.static_cache_dir
         for did in ['-1', '2']:
-            with lockutils.external_lock(
-                    name='datasets.functions.get_dataset:%s' % did,
-                    lock_path=os.path.join(openml.config.get_cache_directory(), 'locks'),
-            ):
+            with openml.utils._lock_cache_directory(os.path.join(cache_dir, 'datasets', did)):
                 pickle_path = os.path.join(cache_dir, 'datasets', did,
                                            'dataset.pkl')
                 try:
@@ -416,6 +413,56 @@ class TestOpenMLDataset(TestBase):
         )
         self.assertEqual(len(os.listdir(datasets_cache_dir)), 0)
 
+    @mock.patch('openml._api_calls._stream_url')
+    def test_get_dataset_resumes_interrupted_download(self, stream_mock):
+        static_cache_dir = os.path.join(self.static_cache_dir, 'org', 'openml', 'test',
+                                        'datasets', '2')
+        did_cache_dir = _create_cache_directory_for_id(DATASETS_CACHE_DIR_NAME, 2)
+        with open(os.path.join(static_cache_dir, 'dataset.arff'), 'rb') as fh:
+            content = fh.read()
+
+        def interrupted(chunk_size):
+            yield content[:100]
+            raise ConnectionError()
+
+        response = mock.MagicMock()
+        response.encoding = 'utf-8'
+        response.iter_content.side_effect = interrupted
+        stream_mock.return_value = response
+        for name in ['description.xml', 'features.xml', 'qualities.xml']:
+            shutil.copy(os.path.join(static_cache_dir, name), did_cache_dir)
+        self.assertRaises(ConnectionError, openml.datasets.get_dataset, 2)
+        # The faulty cache directory is removed, except for the partial download
+        self.assertEqual(os.listdir(did_cache_dir), ['dataset.arff.part'])
+
+        response = mock.MagicMock()
+        response.encoding = 'utf-8'
+        response.status_code = 206
+        response.headers = {
+            'Content-Range': 'bytes 100-{}/{}'.format(len(content) - 1, len(content)),
+        }
+        response.iter_content.return_value = iter([content[100:]])
+        stream_mock.return_value = response
+        for name in ['description.xml', 'features.xml', 'qualities.xml']:
+            shutil.copy(os.path.join(static_cache_dir, name), did_cache_dir)
+        dataset = openml.datasets.get_dataset(2)
+        self.assertEqual(stream_mock.call_args[1]['headers']['Range'], 'bytes=100-')
+        with open(dataset.data_file, 'rb') as fh:
+            self.assertEqual(fh.read(), content)
+
+    @mock.patch('openml.datasets.functions._get_dataset_description')
+    def test_get_dataset_pins_cache_directory(self, description_mock):
+        evicted = []
+
+        def evict_cache(did_cache_dir, dataset_id):
+            # Another process garbage collects the cache
+            evicted.extend(openml.cache.gc(max_size=0))
+            raise ValueError('Boom!')
+
+        description_mock.side_effect = evict_cache
+        self.assertRaisesRegex(ValueError, 'Boom!', openml.datasets.get_dataset, 2)
+        self.assertEqual(evicted, [])
+
     def test_publish_dataset(self):
         # lazy loading not possible as we need the arff-file.
         openml.datasets.get_dataset(3)
@@ -0,0 +1,220 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from unittest import mock
+
+import openml
+import openml.testing
+
+
+class TestSession(openml.testing.TestBase):
+
+    def tearDown(self):
+        openml._api_calls._reset_session()
+        super().tearDown()
+
+    def test_session_is_shared(self):
+        session_a = openml._api_calls._get_session()
+        session_b = openml._api_calls._get_session()
+        self.assertIs(session_a, session_b)
+
+    def test_session_reset_on_server_change(self):
+        session_a = openml._api_calls._get_session()
+        openml.config.server = self.production_server
+        session_b = openml._api_calls._get_session()
+        self.assertIsNot(session_a, session_b)
+
+    def test_session_pool_size(self):
+        openml.config.connection_pool_size = 3
+        try:
+            session = openml._api_calls._get_session()
+            adapter = session.get_adapter(self.test_server)
+            self.assertEqual(adapter._pool_maxsize, 3)
+        finally:
+            openml.config.connection_pool_size = \
+                openml.config._defaults['connection_pool_size']
+
+    @mock.patch('requests.Session.get', autospec=True)
+    def test_send_request_uses_shared_session(self, get_mock):
+        get_mock.return_value = mock.Mock(status_code=200, content=b'')
+        openml._api_calls.send_request('get', self.test_server, data={})
+        openml._api_calls.send_request('get', self.test_server, data={})
+        self.assertEqual(get_mock.call_count, 2)
+        sessions = [call[0][0] for call in get_mock.call_args_list]
+        self.assertIs(sessions[0], sessions[1])
+        self.assertIs(sessions[0], openml._api_calls._get_session())
+
+
+class TestResponseFormats(openml.testing.TestBase):
+
+    def test_server_url(self):
+        self.assertEqual(openml._api_calls._get_server_url('xml'), self.test_server)
+        self.assertEqual(openml._api_calls._get_server_url('json'),
+                         'https://test.openml.org/api/v1/json')
+        self.assertRaises(ValueError, openml._api_calls._get_server_url, 'csv')
+
+    def test_parse_json_server_exception(self):
+        response = mock.Mock(
+            status_code=412,
+            text='{"error": {"code": "372", "message": "No results"}}',
+        )
+        exception = openml._api_calls._parse_server_exception(response)
+        self.assertIsInstance(exception, openml.exceptions.OpenMLServerNoResult)
+
+        response = mock.Mock(
+            status_code=412,
+            text='{"error": {"code": "111", "message": "Unknown dataset"}}',
+        )
+        exception = openml._api_calls._parse_server_exception(response)
+        self.assertEqual(exception.code, 111)
+        self.assertEqual(exception.message, 'Unknown dataset')
+
+    @mock.patch('requests.Session.get')
+    def test_conditional_api_call(self, get_mock):
+        get_mock.return_value = mock.Mock(
+            status_code=304, headers={'ETag': '"v1"'}, content=b'',
+        )
+        content, etag, last_modified = openml._api_calls._perform_conditional_api_call(
+            'data/1', etag='"v1"', last_modified='Wed, 21 Oct 2015 07:28:00 GMT',
+        )
+        self.assertIsNone(content)
+        self.assertEqual(etag, '"v1"')
+        self.assertEqual(last_modified, 'Wed, 21 Oct 2015 07:28:00 GMT')
+        self.assertEqual(get_mock.call_args[0][0], self.test_server + '/data/1')
+        self.assertEqual(get_mock.call_args[1]['headers'], {
+            'If-None-Match': '"v1"',
+            'If-Modified-Since': 'Wed, 21 Oct 2015 07:28:00 GMT',
+        })
+
+        get_mock.return_value = mock.Mock(
+            status_code=200, headers={'ETag': '"v2"'}, content=b'<a/>', text='<a/>',
+        )
+        content, etag, last_modified = openml._api_calls._perform_conditional_api_call(
+            'data/1', etag='"v1"',
+        )
+        self.assertEqual((content, etag, last_modified), ('<a/>', '"v2"', None))
+
+
+class TestRequestCoalescing(openml.testing.TestBase):
+
+    def _perform_concurrent_calls(self, read_url_mock, n_calls, request_method='get'):
+        release = threading.Event()
+        read_url_mock.side_effect = lambda *args, **kwargs: release.wait(5) and '<a/>'
+        with ThreadPoolExecutor(max_workers=n_calls) as executor:
+            futures = [
+                executor.submit(openml._api_calls._perform_api_call, 'data/1', request_method)
+                for _ in range(n_calls)
+            ]
+            # Give all threads the chance to issue their call before answering it
+            time.sleep(0.2)
+            release.set()
+        return futures
+
+    @mock.patch('openml._api_calls._read_url')
+    def test_concurrent_gets_share_one_request(self, read_url_mock):
+        futures = self._perform_concurrent_calls(read_url_mock, 5)
+        self.assertEqual([future.result() for future in futures], ['<a/>'] * 5)
+        self.assertEqual(read_url_mock.call_count, 1)
+        self.assertEqual(openml._api_calls._in_flight, {})
+
+        # Once answered, the next call performs a new request
+        openml._api_calls._perform_api_call('data/1', 'get')
+        self.assertEqual(read_url_mock.call_count, 2)
+
+    @mock.patch('openml._api_calls._read_url')
+    def test_concurrent_gets_share_exception(self, read_url_mock):
+        def read_url(*args, **kwargs):
+            time.sleep(0.2)
+            raise openml.exceptions.OpenMLServerException('Unknown dataset', code=111)
+        read_url_mock.side_effect = read_url
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(openml._api_calls._perform_api_call, 'data/1', 'get')
+                for _ in range(3)
+            ]
+        for future in futures:
+            self.assertRaises(openml.exceptions.OpenMLServerException, future.result)
+        self.assertEqual(read_url_mock.call_count, 1)
+
+    @mock.patch('openml._api_calls._read_url')
+    def test_deletes_are_not_coalesced(self, read_url_mock):
+        self._perform_concurrent_calls(read_url_mock, 3, request_method='delete')
+        self.assertEqual(read_url_mock.call_count, 3)
+
+
+class TestRetries(openml.testing.TestBase):
+
+    def tearDown(self):
+        openml._api_calls._reset_session()
+        super().tearDown()
+
+    def test_wait_time_full_jitter(self):
+        policy = openml._api_calls.RetryPolicy(backoff_factor=1.0, max_backoff=5.0)
+        for attempt, upper_bound in [(1, 1.0), (2, 2.0), (3, 4.0), (10, 5.0)]:
+            for _ in range(20):
+                wait_time = policy.get_wait_time(attempt)
+                self.assertGreaterEqual(wait_time, 0)
+                self.assertLessEqual(wait_time, upper_bound)
+
+    def test_wait_time_retry_after(self):
+        policy = openml._api_calls.RetryPolicy(max_backoff=60.0)
+        response = mock.Mock(headers={'Retry-After': '7'})
+        self.assertEqual(policy.get_wait_time(1, response), 7.0)
+        response = mock.Mock(headers={'Retry-After': '3600'})
+        self.assertEqual(policy.get_wait_time(1, response), 60.0)
+        response = mock.Mock(headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})
+        self.assertEqual(policy.get_wait_time(1, response), 0.0)
+
+    @mock.patch('time.sleep')
+    @mock.patch('requests.Session.get')
+    def test_send_request_retries_on_status_code(self, get_mock, sleep_mock):
+        unavailable = mock.Mock(status_code=503, headers={'Retry-After': '2'})
+        ok = mock.Mock(status_code=200, headers={}, content=b'')
+        get_mock.side_effect = [unavailable, unavailable, ok]
+
+        response = openml._api_calls.send_request('get', self.test_server, data={})
+
+        self.assertIs(response, ok)
+        self.assertEqual(get_mock.call_count, 3)
+        self.assertEqual(sleep_mock.call_args_list, [mock.call(2.0), mock.call(2.0)])
+        self.assertEqual(unavailable.close.call_count, 2)
+
+    @mock.patch('time.sleep')
+    @mock.patch('requests.Session.post')
+    def test_send_request_does_not_retry_post_on_status_code(self, post_mock, sleep_mock):
+        post_mock.return_value = mock.Mock(status_code=503, headers={}, content=b'')
+        response = openml._api_calls.send_request('post', self.test_server, data={})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(post_mock.call_count, 1)
+        self.assertEqual(sleep_mock.call_count, 0)
+
+    @mock.patch('time.sleep')
+    @mock.patch('requests.Session.get')
+    def test_send_request_gives_up_after_n_retries(self, get_mock, sleep_mock):
+        openml.config.connection_n_retries = 3
+        get_mock.return_value = mock.Mock(status_code=429, headers={}, content=b'')
+        response = openml._api_calls.send_request('get', self.test_server, data={})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(get_mock.call_count, 3)
+        self.assertEqual(sleep_mock.call_count, 2)
+
+    def test_token_bucket(self):
+        bucket = openml._api_calls._TokenBucket(rate=2.0)
+        with mock.patch('time.sleep') as sleep_mock:
+            bucket.acquire()
+            bucket.acquire()
+            self.assertEqual(sleep_mock.call_count, 0)
+        # The bucket is empty now and must be refilled before the next request
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreater(time.monotonic() - start, 0.2)
+
+    def test_rate_limiter_follows_config(self):
+        self.assertIsNone(openml._api_calls._get_rate_limiter())
+        openml.config.max_requests_per_second = 5
+        try:
+            rate_limiter = openml._api_calls._get_rate_limiter()
+            self.assertEqual(rate_limiter.rate, 5)
+            self.assertIs(rate_limiter, openml._api_calls._get_rate_limiter())
+        finally:
+            openml.config.max_requests_per_second = None
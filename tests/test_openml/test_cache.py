@@ -0,0 +1,393 @@
+import contextlib
+import hashlib
+import io
+import os
+import shutil
+import sqlite3
+import time
+from unittest import mock
+
+import openml
+import openml.testing
+
+
+class TestCache(openml.testing.TestBase):
+
+    def _add_entity(self, entity_type, entity_id, size, last_access, n_accesses=0):
+        path = os.path.join(openml.config.get_cache_directory(), entity_type,
+                            str(entity_id))
+        os.makedirs(path)
+        with open(os.path.join(path, 'description.xml'), 'w') as fh:
+            fh.write('x' * size)
+        for _ in range(n_accesses):
+            openml.cache._record_access(entity_type, entity_id)
+        if n_accesses == 0:
+            os.utime(path, (last_access, last_access))
+        else:
+            os.utime(os.path.join(path, '.access'), (last_access, last_access))
+        return path
+
+    def _get_cached_ids(self):
+        return [(entry.entity_type, entry.entity_id)
+                for entry in openml.cache.list_entries()]
+
+    def test_record_access(self):
+        path = self._add_entity('tasks', 1, 10, time.time())
+        openml.cache._record_access('tasks', 1)
+        openml.cache._record_access('tasks', 1)
+        with open(os.path.join(path, '.access')) as fh:
+            self.assertEqual(fh.read(), '2')
+        # Entities which are not cached are ignored
+        openml.cache._record_access('tasks', 2)
+        self.assertFalse(os.path.exists(os.path.join(os.path.dirname(path), '2')))
+
+    def test_gc_lru(self):
+        now = time.time()
+        self._add_entity('datasets', 1, 1000, now - 300, n_accesses=5)
+        self._add_entity('datasets', 2, 1000, now - 100)
+        self._add_entity('tasks', 1, 1000, now - 200, n_accesses=1)
+
+        evicted = openml.cache.gc(max_size=2100, policy='lru', dry_run=True)
+        self.assertEqual([(e.entity_type, e.entity_id) for e in evicted], [('datasets', 1)])
+        self.assertEqual(len(self._get_cached_ids()), 3)
+
+        evicted = openml.cache.gc(max_size=1500, policy='lru')
+        self.assertEqual([(e.entity_type, e.entity_id) for e in evicted],
+                         [('datasets', 1), ('tasks', 1)])
+        self.assertEqual(self._get_cached_ids(), [('datasets', 2)])
+
+    def test_gc_lfu(self):
+        now = time.time()
+        self._add_entity('datasets', 1, 1000, now - 300, n_accesses=5)
+        self._add_entity('datasets', 2, 1000, now - 100)
+        self._add_entity('tasks', 1, 1000, now - 200, n_accesses=1)
+        evicted = openml.cache.gc(max_size=1500, policy='lfu')
+        self.assertEqual([(e.entity_type, e.entity_id) for e in evicted],
+                         [('datasets', 2), ('tasks', 1)])
+        self.assertEqual(self._get_cached_ids(), [('datasets', 1)])
+
+    def test_gc_uses_config(self):
+        self._add_entity('datasets', 1, 1000, time.time())
+        self.assertEqual(openml.cache.gc(), [])
+        openml.config.cache_max_size = 0.0001
+        try:
+            self.assertEqual(len(openml.cache.gc()), 1)
+        finally:
+            openml.config.cache_max_size = openml.config._defaults['cache_max_size']
+        self.assertRaisesRegex(ValueError, 'Unknown eviction policy',
+                               openml.cache.gc, max_size=0, policy='fifo')
+
+    def test_gc_after_download(self):
+        now = time.time()
+        self._add_entity('datasets', 1, 1000, now - 300, n_accesses=5)
+        openml.cache.list_catalog('datasets')
+        path = self._add_entity('datasets', 2, 1000, now - 600)
+        openml.config.cache_max_size = 1500 / 1024 / 1024
+        openml.config.cache_eviction_policy = 'lfu'
+        try:
+            # The new entity is used least frequently, but kept as it was just downloaded
+            openml.cache._record_access('datasets', 2)
+            self.assertEqual(self._get_cached_ids(), [('datasets', 2)])
+
+            # Without new files, the cache is not garbage collected
+            self._add_entity('datasets', 3, 1000, now)
+            with mock.patch('openml.cache._enforce_max_size') as enforce_mock:
+                openml.cache._record_access('datasets', 2)
+            enforce_mock.assert_not_called()
+            with open(os.path.join(path, 'dataset.arff'), 'w') as fh:
+                fh.write('@relation test')
+            with mock.patch('openml.cache._enforce_max_size') as enforce_mock:
+                openml.cache._record_access('datasets', 2)
+            enforce_mock.assert_called_once_with('datasets', 2)
+        finally:
+            openml.config.cache_max_size = openml.config._defaults['cache_max_size']
+            openml.config.cache_eviction_policy = \
+                openml.config._defaults['cache_eviction_policy']
+
+    def test_gc_after_download_uses_catalog(self):
+        now = time.time()
+        self._add_entity('datasets', 1, 1000, now - 300)
+        openml.cache.list_catalog('datasets')
+        self._add_entity('datasets', 2, 100, now - 600)
+        openml.config.cache_max_size = 1500 / 1024 / 1024
+        try:
+            # Within the budget, only the catalog is read
+            with mock.patch('openml.cache._get_access') as access_mock:
+                openml.cache._record_access('datasets', 2)
+            access_mock.assert_not_called()
+
+            self._add_entity('datasets', 3, 1000, now - 100)
+            with mock.patch('openml.cache.list_entries',
+                            side_effect=AssertionError('cache directory scanned')):
+                openml.cache._record_access('datasets', 3)
+        finally:
+            openml.config.cache_max_size = openml.config._defaults['cache_max_size']
+        self.assertEqual(self._get_cached_ids(), [('datasets', 2), ('datasets', 3)])
+        self.assertEqual(list(openml.cache.list_catalog('datasets')), [2, 3])
+
+    def test_evict_locks_entity(self):
+        path = self._add_entity('datasets', 1, 1000, time.time())
+        lock_cache_directory = openml.utils._lock_cache_directory
+        with mock.patch('openml.cache._lock_cache_directory',
+                        side_effect=lock_cache_directory) as lock_mock:
+            self.assertEqual(len(openml.cache.gc(max_size=0)), 1)
+        lock_mock.assert_called_once_with(path)
+
+    def test_gc_keeps_pinned_entities(self):
+        now = time.time()
+        path = self._add_entity('datasets', 1, 1000, now - 300)
+        self._add_entity('datasets', 2, 1000, now - 100)
+        with openml.cache.pinned('datasets', 1):
+            evicted = openml.cache.gc(max_size=0)
+            self.assertEqual([e.entity_id for e in evicted], [2])
+            self.assertEqual(self._get_cached_ids(), [('datasets', 1)])
+        self.assertEqual(os.listdir(path), ['description.xml'])
+        self.assertEqual(len(openml.cache.gc(max_size=0)), 1)
+
+    def test_gc_keeps_entities_pinned_after_listing(self):
+        path = self._add_entity('datasets', 1, 1000, time.time())
+        entries = openml.cache.list_entries()
+        with openml.cache.pinned('datasets', 1):
+            with mock.patch('openml.cache.list_entries', return_value=entries):
+                self.assertEqual(openml.cache.gc(max_size=0), [])
+            self.assertTrue(os.path.isdir(path))
+
+    def test_pinned_locks_entity(self):
+        path = os.path.join(openml.config.get_cache_directory(), 'datasets', '1')
+        lock_cache_directory = openml.utils._lock_cache_directory
+        with mock.patch('openml.cache._lock_cache_directory',
+                        side_effect=lock_cache_directory) as lock_mock:
+            with openml.cache.pinned('datasets', 1):
+                lock_mock.assert_called_once_with(path)
+                self.assertEqual(len(os.listdir(path)), 1)
+
+    def test_pins_are_refreshed(self):
+        with openml.cache.pinned('datasets', 1) as path:
+            pin_file = os.path.join(path, os.listdir(path)[0])
+            os.utime(pin_file, (0, 0))
+            openml.cache._refresh_pins()
+            self.assertGreater(os.stat(pin_file).st_mtime, time.time() - 60)
+
+    def test_gc_removes_stale_pins(self):
+        path = self._add_entity('datasets', 1, 1000, time.time())
+        with openml.cache.pinned('datasets', 1):
+            with mock.patch('openml.cache._process_exists', return_value=False):
+                self.assertEqual(len(openml.cache.gc(max_size=0)), 1)
+        self.assertFalse(os.path.exists(path))
+
+        # Pins of other hosts are kept, unless they were not refreshed for too long
+        path = self._add_entity('datasets', 1, 1000, time.time())
+        pin_file = os.path.join(path, '.pin-other-host-1-abc')
+        with open(pin_file, 'w'):
+            pass
+        self.assertEqual(openml.cache.gc(max_size=0), [])
+        expired = time.time() - openml.cache._PIN_MAX_AGE - 60
+        os.utime(pin_file, (expired, expired))
+        self.assertEqual(len(openml.cache.gc(max_size=0)), 1)
+        self.assertFalse(os.path.exists(path))
+
+    def test_gc_removes_interrupted_evictions(self):
+        path = self._add_entity('datasets', 1, 1000, time.time())
+        os.rename(path, path + '.evicted-abc')
+        openml.cache.gc(max_size=0)
+        self.assertEqual(os.listdir(os.path.dirname(path)), [])
+
+    def test_parse_size(self):
+        self.assertEqual(openml.cache._parse_size('100'), 100)
+        self.assertEqual(openml.cache._parse_size('1.5k'), 1536)
+        self.assertEqual(openml.cache._parse_size('2TB'), 2 * 1024 ** 4)
+
+    def test_command_line(self):
+        self._add_entity('datasets', 1, 1000, time.time())
+        cache_directory = openml.config.cache_directory
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            openml.cache.main(['--cache-directory', cache_directory, 'gc',
+                               '--max-size', '0', '--dry-run'])
+        self.assertIn('Would evict 1 entities, 1000 bytes', stdout.getvalue())
+        self.assertEqual(len(self._get_cached_ids()), 1)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            openml.cache.main(['gc', '--max-size', '0'])
+        self.assertEqual(self._get_cached_ids(), [])
+
+
+class TestCacheCatalog(openml.testing.TestBase):
+
+    def _add_task(self, task_id):
+        path = os.path.join(openml.config.get_cache_directory(), 'tasks', str(task_id))
+        os.makedirs(path)
+        shutil.copy(
+            os.path.join(self.static_cache_dir, 'org', 'openml', 'test', 'tasks', '1',
+                         'task.xml'),
+            path,
+        )
+        return path
+
+    def test_catalog_built_from_cache_directory(self):
+        self._add_task(1)
+        entries = openml.cache.list_catalog('tasks')
+        self.assertEqual(list(entries), [1])
+        self.assertEqual(entries[1].fields,
+                         {'task_type_id': '1', 'data_set_id': '1', 'target_feature': 'class'})
+        # Checksums are only computed when rebuilding the catalog
+        self.assertEqual(entries[1].files['task.xml'], (1636, None))
+        self.assertEqual(openml.cache.list_catalog('datasets'), {})
+        openml.cache.rebuild_catalog()
+        self.assertEqual(openml.cache.list_catalog('tasks')[1].files['task.xml'],
+                         (1636, '71d3a623c4ff22a9831e2d3e28fa4ad2'))
+
+    def test_catalog_updated_on_access(self):
+        openml.cache.list_catalog('tasks')
+        path = self._add_task(2)
+        self.assertEqual(openml.cache.list_catalog('tasks'), {})
+        openml.cache._record_access('tasks', 2)
+        self.assertEqual(list(openml.cache.list_catalog('tasks')), [2])
+
+        # Accesses never compute checksums, but keep those of unmodified files
+        openml.cache.rebuild_catalog()
+        with open(os.path.join(path, 'datasplits.arff'), 'w') as fh:
+            fh.write('@relation splits')
+        with mock.patch('openml.cache._get_file_md5') as md5_mock:
+            openml.cache._record_access('tasks', 2)
+        md5_mock.assert_not_called()
+        files = openml.cache.list_catalog('tasks')[2].files
+        self.assertEqual(files['datasplits.arff'], (16, None))
+        self.assertEqual(files['task.xml'][1], '71d3a623c4ff22a9831e2d3e28fa4ad2')
+
+    def test_catalog_rebuild_and_gc(self):
+        openml.cache.list_catalog('tasks')
+        self._add_task(1)
+        self._add_task(2)
+        openml.cache.rebuild_catalog()
+        self.assertEqual(list(openml.cache.list_catalog('tasks')), [1, 2])
+        openml.cache.gc(max_size=0)
+        self.assertEqual(openml.cache.list_catalog('tasks'), {})
+
+    def test_catalog_falls_back_to_directory_scan(self):
+        self._add_task(1)
+        with mock.patch('openml.cache._get_catalog',
+                        side_effect=sqlite3.OperationalError('readonly database')):
+            entries = openml.cache.list_catalog('tasks')
+        self.assertEqual(list(entries), [1])
+        self.assertEqual(entries[1].files['task.xml'], (1636, None))
+        self.assertEqual(entries[1].fields['data_set_id'], '1')
+
+    def test_get_cached_tasks_uses_catalog(self):
+        self._add_task(1)
+        self._add_task(3)
+        openml.cache.list_catalog('tasks')
+        with mock.patch('os.listdir', side_effect=AssertionError('directory scanned')):
+            tasks = openml.tasks.functions._get_cached_tasks()
+        self.assertEqual(list(tasks), [1, 3])
+
+    def test_removed_entities_are_skipped(self):
+        path = self._add_task(1)
+        self._add_task(2)
+        self._add_task(3)
+        openml.cache.list_catalog('tasks')
+
+        openml.utils._remove_cache_dir_for_id('tasks', path)
+        self.assertEqual(list(openml.cache.list_catalog('tasks')), [2, 3])
+        # Directories and files removed by hand
+        shutil.rmtree(os.path.dirname(path) + os.sep + '2')
+        os.remove(os.path.join(os.path.dirname(path), '3', 'task.xml'))
+        self.assertEqual(list(openml.cache.list_catalog('tasks')), [3])
+        self.assertEqual(openml.tasks.functions._get_cached_tasks(), {})
+
+
+class TestSharedCache(openml.testing.TestBase):
+
+    def setUp(self):
+        super().setUp()
+        self.shared_cache_directory = os.path.join(self.workdir, 'shared')
+        openml.config.shared_cache_directories = [
+            os.path.join(self.workdir, 'empty'), self.shared_cache_directory,
+        ]
+        self.task_directory = os.path.join(
+            openml.config._get_shared_cache_directories()[1], 'tasks', '1')
+        os.makedirs(self.task_directory)
+        shutil.copy(
+            os.path.join(self.static_cache_dir, 'org', 'openml', 'test', 'tasks', '1',
+                         'task.xml'),
+            self.task_directory,
+        )
+
+    def tearDown(self):
+        openml.config.shared_cache_directories = []
+        super().tearDown()
+
+    @mock.patch('openml._api_calls._perform_api_call')
+    def test_xml_linked_from_shared_cache(self, api_call_mock):
+        task = openml.tasks.functions._get_task_description(1)
+        self.assertEqual(task.task_id, 1)
+        api_call_mock.assert_not_called()
+
+        path = os.path.join(openml.config.get_cache_directory(), 'tasks', '1', 'task.xml')
+        self.assertTrue(os.path.islink(path))
+        self.assertEqual(os.readlink(path), os.path.join(self.task_directory, 'task.xml'))
+        # Linked files do not count towards the size of the cache
+        entry, = openml.cache.list_entries()
+        self.assertLess(entry.size, 1000)
+
+        # Writing to the cache replaces the link instead of the shared file
+        openml.utils._write_file_atomically(path, '<oml:task/>')
+        self.assertFalse(os.path.islink(path))
+        with open(os.path.join(self.task_directory, 'task.xml')) as fh:
+            self.assertNotEqual(fh.read(), '<oml:task/>')
+
+    @mock.patch('openml._api_calls._stream_url')
+    def test_download_text_file_linked_from_shared_cache(self, stream_mock):
+        content = b'@RELATION test\n@DATA\n'
+        shared_path = os.path.join(self.task_directory, 'datasplits.arff')
+        with open(shared_path, 'wb') as fh:
+            fh.write(content)
+        md5 = hashlib.md5(content).hexdigest()
+        openml.utils._remember_checksum(shared_path, md5)
+
+        path = os.path.join(openml.config.get_cache_directory(), 'tasks', '1',
+                            'datasplits.arff')
+        with mock.patch('openml.utils._get_file_md5') as md5_mock:
+            openml.utils._download_text_file('http://example.com/datasplits.arff', path,
+                                             md5_checksum=md5)
+        stream_mock.assert_not_called()
+        # The checksum verified in the shared cache is not computed again
+        md5_mock.assert_not_called()
+        self.assertTrue(os.path.islink(path))
+        self.assertTrue(os.path.islink(openml.utils._get_checksum_file(path)))
+
+    def test_missing_files_are_not_linked(self):
+        path = os.path.join(openml.config.get_cache_directory(), 'tasks', '2', 'task.xml')
+        self.assertIsNone(openml.utils._read_cached_xml(path))
+        self.assertFalse(os.path.lexists(path))
+        # Files outside of the cache directory are never looked up
+        self.assertFalse(openml.utils._link_from_shared_cache(
+            os.path.join(self.workdir, 'task.xml')))
+
+    def test_data_cache_file_linked_from_shared_cache(self):
+        shared_directory = os.path.join(openml.config._get_shared_cache_directories()[1],
+                                        'datasets', '1')
+        os.makedirs(shared_directory)
+        with open(os.path.join(shared_directory, 'dataset.feather'), 'wb') as fh:
+            fh.write(b'ARROW1 data ARROW1')
+        path = os.path.join(openml.config.get_cache_directory(), 'datasets', '1',
+                            'dataset.feather')
+        self.assertTrue(
+            openml.datasets.dataset._is_data_cache_file_complete(path, 'feather'))
+        self.assertTrue(os.path.islink(path))
+
+    def test_relative_shared_cache_directory(self):
+        os.chdir(self.workdir)
+        openml.config.shared_cache_directories = ['shared']
+        path = os.path.join(openml.config.get_cache_directory(), 'tasks', '1', 'task.xml')
+        self.assertIsNotNone(openml.utils._read_cached_xml(path))
+        self.assertTrue(os.path.isabs(os.readlink(path)))
+
+    def test_dangling_link_is_a_miss(self):
+        path = os.path.join(openml.config.get_cache_directory(), 'tasks', '1', 'task.xml')
+        os.makedirs(os.path.dirname(path))
+        os.symlink(os.path.join(self.workdir, 'unmounted', 'task.xml'), path)
+        self.assertIsNone(openml.utils._read_cached_xml(path))
+        # A download replaces the link
+        openml.utils._write_file_atomically(path, '<oml:task/>')
+        self.assertEqual(openml.utils._read_cached_xml(path), '<oml:task/>')
@@ -0,0 +1,89 @@
+from unittest import mock
+
+import requests
+
+import openml
+import openml.testing
+
+
+class TestMetrics(openml.testing.TestBase):
+
+    def setUp(self):
+        super().setUp()
+        openml.metrics.reset()
+
+    def tearDown(self):
+        openml.metrics.reset()
+        openml._api_calls._reset_session()
+        super().tearDown()
+
+    def test_endpoint_template(self):
+        fixtures = [
+            (self.test_server + '/data/61', 'data/{id}'),
+            (self.test_server + '/data/features/61', 'data/features/{id}'),
+            ('data/list/limit/10000/offset/0', 'data/list'),
+            ('evaluation/list/function/predictive_accuracy', 'evaluation/list'),
+            ('flow/exists/weka.J48/1.0', 'flow/exists'),
+            ('run/list/task/1,2,3', 'run/list'),
+            ('https://test.openml.org/data/download/61/dataset_61_iris.arff',
+             'data/download/{id}/{name}'),
+        ]
+        for url, template in fixtures:
+            self.assertEqual(openml.metrics._get_endpoint_template(url), template)
+
+    @mock.patch('requests.Session.get')
+    def test_requests_are_recorded(self, get_mock):
+        get_mock.side_effect = [
+            mock.Mock(status_code=503, headers={}, content=b''),
+            mock.Mock(status_code=200, headers={}, content=b'<xml/>'),
+        ]
+        records = []
+        openml.metrics.register_callback(records.append)
+        try:
+            with mock.patch('time.sleep'):
+                openml._api_calls.send_request('get', self.test_server + '/task/1', data={})
+        finally:
+            openml.metrics.unregister_callback(records.append)
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0].endpoint, 'task/{id}')
+        self.assertEqual(records[0].retries, 1)
+        self.assertIsNone(records[0].cache_hit)
+
+        stats = openml.metrics.snapshot()['task/{id}']
+        self.assertEqual(stats['calls'], 1)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['retries'], 1)
+        self.assertEqual(stats['response_bytes'], 6)
+        self.assertEqual(stats['status_codes'], {200: 1})
+        self.assertEqual(sum(stats['latency']['counts']), 1)
+
+    @mock.patch('requests.Session.get')
+    def test_failed_requests_are_recorded(self, get_mock):
+        get_mock.side_effect = requests.exceptions.ConnectionError()
+        openml.config.connection_n_retries = 1
+        self.assertRaises(requests.exceptions.ConnectionError,
+                          openml._api_calls.send_request,
+                          'get', self.test_server + '/task/1', data={})
+        stats = openml.metrics.snapshot()['task/{id}']
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['status_codes'], {None: 1})
+
+    def test_cache_accesses_are_recorded(self):
+        openml.config.cache_directory = self.static_cache_dir
+        openml.tasks.functions._get_task_description(1)
+        stats = openml.metrics.snapshot()['task/{id}']
+        self.assertEqual(stats['cache_hits'], 1)
+        self.assertEqual(stats['cache_misses'], 0)
+        self.assertEqual(stats['calls'], 0)
+
+    def test_failing_callback_is_ignored(self):
+        def callback(record):
+            raise ValueError()
+
+        openml.metrics.register_callback(callback)
+        try:
+            openml.metrics._record_cache_access('task/1', hit=False)
+        finally:
+            openml.metrics.unregister_callback(callback)
+        self.assertEqual(openml.metrics.snapshot()['task/{id}']['cache_misses'], 1)
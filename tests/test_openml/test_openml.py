@@ -39,3 +39,19 @@ class TestInit(TestBase):
         self.assertEqual(task_mock.call_count, 2)
         for argument, fixture in zip(task_mock.call_args_list, [(1,), (2,)]):
             self.assertEqual(argument[0], fixture)
+
+    @mock.patch('openml.tasks.functions.get_task')
+    @mock.patch('openml.datasets.functions.get_dataset')
+    def test_populate_cache_max_workers(self, dataset_mock, task_mock):
+        openml.populate_cache(task_ids=[1, 2, 3], dataset_ids=[4, 5],
+                              max_workers=2)
+        self.assertEqual(task_mock.call_count, 3)
+        self.assertEqual(
+            sorted(argument[0] for argument in task_mock.call_args_list),
+            [(1,), (2,), (3,)],
+        )
+        self.assertEqual(dataset_mock.call_count, 2)
+        self.assertEqual(
+            sorted(argument[0] for argument in dataset_mock.call_args_list),
+            [(4,), (5,)],
+        )
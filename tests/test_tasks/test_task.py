@@ -7,6 +7,7 @@ else:
 
 from time import time
 import numpy as np
+from scipy import sparse
 
 import openml
 from openml.testing import TestBase
@@ -83,3 +84,90 @@ class OpenMLTaskTest(TestBase):
             task.get_train_test_split_indices,
             0, 10,
         )
+
+
+class OpenMLTaskPayloadCacheTest(TestBase):
+
+    def _get_task(self, task_id=1, dataset_id=2):
+        return openml.tasks.OpenMLClassificationTask(
+            task_id=task_id, task_type_id=1, task_type='Supervised Classification',
+            data_set_id=dataset_id, estimation_procedure_type='crossvalidation',
+            estimation_parameters={}, evaluation_measure=None, target_name='class',
+            data_splits_url=None,
+        )
+
+    @mock.patch.object(openml.tasks.OpenMLTask, 'get_dataset')
+    def test_get_X_and_y_loads_dataset_once(self, get_dataset_mock):
+        X = np.arange(12, dtype=np.float32).reshape(4, 3)
+        y = np.array([0, 1, 0, 1])
+        get_dataset_mock.return_value.get_data.return_value = X, y
+
+        X_train, y_train = self._get_task().get_X_and_y(rows=[3, 1])
+        np.testing.assert_array_equal(X_train, X[[3, 1]])
+        np.testing.assert_array_equal(y_train, [1, 1])
+        # Another task on the same dataset and target uses the cached arrays
+        X_all, y_all = self._get_task(task_id=2).get_X_and_y()
+        np.testing.assert_array_equal(X_all, X)
+        self.assertEqual(get_dataset_mock.call_count, 1)
+        # but receives copies which can be modified
+        self.assertIsNot(X_all, X)
+        self.assertFalse(X.flags.writeable)
+        X_all[0, 0] = -1
+        X_train[0, 0] = -1
+        self.assertEqual(self._get_task().get_X_and_y()[0][0, 0], 0)
+
+        self._get_task(dataset_id=3).get_X_and_y()
+        self.assertEqual(get_dataset_mock.call_count, 2)
+
+    @mock.patch.object(openml.tasks.OpenMLTask, 'get_dataset')
+    def test_get_X_and_y_without_payload_cache(self, get_dataset_mock):
+        get_dataset_mock.return_value.get_data.return_value = 'X', 'y'
+        openml.config.dataset_memory_cache_size = 0
+        try:
+            self.assertIsNone(openml.tasks.task._get_payload_cache())
+            self._get_task().get_X_and_y(rows=[0])
+            self._get_task().get_X_and_y(rows=[0])
+        finally:
+            openml.config.dataset_memory_cache_size = \
+                openml.config._defaults['dataset_memory_cache_size']
+        self.assertEqual(get_dataset_mock.call_count, 2)
+        get_dataset_mock.return_value.get_data.assert_called_with(
+            dataset_format='array', target='class', rows=[0],
+        )
+
+    @mock.patch.object(openml.tasks.OpenMLTask, 'get_dataset')
+    def test_get_X_and_y_sparse(self, get_dataset_mock):
+        X = sparse.csr_matrix(np.eye(4))
+        y = np.array([0, 1, 0, 1])
+        get_dataset_mock.return_value.get_data.return_value = X, y
+
+        X_all, _ = self._get_task().get_X_and_y()
+        X_all[0, 0] = -1
+        X_all, _ = self._get_task().get_X_and_y()
+        self.assertEqual(X_all[0, 0], 1)
+        self.assertEqual(get_dataset_mock.call_count, 1)
+
+    @mock.patch.object(openml.tasks.OpenMLTask, 'get_dataset')
+    def test_get_X_and_y_too_large_for_payload_cache(self, get_dataset_mock):
+        X = np.zeros((1024, 1024))
+        y = np.zeros(1024)
+        get_dataset_mock.return_value.get_data.return_value = X, y
+        openml.config.dataset_memory_cache_size = 1
+        try:
+            X_all, y_all = self._get_task().get_X_and_y()
+            self._get_task().get_X_and_y()
+        finally:
+            openml.config.dataset_memory_cache_size = \
+                openml.config._defaults['dataset_memory_cache_size']
+        # The arrays are not cached, hence not shared and remain writable
+        self.assertIs(X_all, X)
+        self.assertTrue(X.flags.writeable)
+        self.assertEqual(get_dataset_mock.call_count, 2)
+
+    def test_payload_size(self):
+        X = np.zeros((10, 10))
+        X_sparse = sparse.csr_matrix(np.eye(10))
+        self.assertEqual(openml.tasks.task._get_payload_size((X, None)), 800)
+        self.assertEqual(openml.tasks.task._get_payload_size((X_sparse, X[0])),
+                         X_sparse.data.nbytes + X_sparse.indices.nbytes
+                         + X_sparse.indptr.nbytes + 80)
@@ -1,4 +1,5 @@
 import os
+import shutil
 from unittest import mock
 
 from openml.testing import TestBase
@@ -32,6 +33,48 @@ class TestTask(TestBase):
             2,
         )
 
+    def test__get_cached_task_incomplete(self):
+        task_dir = os.path.join(openml.config.get_cache_directory(), 'tasks', '1')
+        os.makedirs(task_dir)
+        with open(os.path.join(self.static_cache_dir, 'org', 'openml', 'test', 'tasks',
+                               '1', 'task.xml')) as fh:
+            content = fh.read()
+        with open(os.path.join(task_dir, 'task.xml'), 'w') as fh:
+            fh.write(content[:len(content) // 2])
+        self.assertRaisesRegex(
+            OpenMLCacheException,
+            'Task file for tid 1 not cached',
+            openml.tasks.functions._get_cached_task,
+            1,
+        )
+        # The incomplete file is removed so that the task is downloaded again
+        self.assertFalse(os.path.exists(os.path.join(task_dir, 'task.xml')))
+
+    def test__get_task_description_cache_hit_takes_no_lock(self):
+        openml.config.cache_directory = self.static_cache_dir
+        with mock.patch('openml.utils._lock_cache_directory',
+                        side_effect=AssertionError('lock taken')):
+            task = openml.tasks.functions._get_task_description(1)
+        self.assertEqual(task.task_id, 1)
+
+    @mock.patch('openml._api_calls._perform_api_call')
+    def test__get_task_description_downloaded_meanwhile(self, api_call_mock):
+        task_xml = os.path.join(self.static_cache_dir, 'org', 'openml', 'test', 'tasks',
+                                '1', 'task.xml')
+        lock_cache_directory = openml.utils._lock_cache_directory
+
+        def download_while_waiting(cache_dir):
+            # Another process downloads the task while this one waits for the lock
+            shutil.copy(task_xml, cache_dir)
+            return lock_cache_directory(cache_dir)
+
+        with mock.patch('openml.utils._lock_cache_directory',
+                        side_effect=download_while_waiting) as lock_mock:
+            task = openml.tasks.functions._get_task_description(1)
+        self.assertEqual(task.task_id, 1)
+        self.assertEqual(lock_mock.call_count, 1)
+        api_call_mock.assert_not_called()
+
     def test__get_estimation_procedure_list(self):
         estimation_procedures = openml.tasks.functions.\
             _get_estimation_procedure_list()
@@ -192,6 +235,42 @@ class TestTask(TestBase):
             self.workdir, 'org', 'openml', 'test', "tasks", "1", "datasplits.arff"
         )))
 
+    @mock.patch('openml._api_calls._stream_url')
+    @mock.patch('openml.tasks.functions.get_dataset')
+    def test_get_task_resumes_interrupted_download(self, get_dataset_mock, stream_mock):
+        static_cache_dir = os.path.join(self.static_cache_dir, 'org', 'openml', 'test',
+                                        'tasks', '1')
+        tid_cache_dir = openml.utils._create_cache_directory_for_id('tasks', 1)
+        with open(os.path.join(static_cache_dir, 'datasplits.arff'), 'rb') as fh:
+            content = fh.read()
+
+        def interrupted(chunk_size):
+            yield content[:100]
+            raise ConnectionError()
+
+        response = mock.MagicMock()
+        response.encoding = 'utf-8'
+        response.iter_content.side_effect = interrupted
+        stream_mock.return_value = response
+        shutil.copy(os.path.join(static_cache_dir, 'task.xml'), tid_cache_dir)
+        self.assertRaises(ConnectionError, openml.tasks.get_task, 1)
+        # The faulty cache directory is removed, except for the partial download
+        self.assertEqual(os.listdir(tid_cache_dir), ['datasplits.arff.part'])
+
+        response = mock.MagicMock()
+        response.encoding = 'utf-8'
+        response.status_code = 206
+        response.headers = {
+            'Content-Range': 'bytes 100-{}/{}'.format(len(content) - 1, len(content)),
+        }
+        response.iter_content.return_value = iter([content[100:]])
+        stream_mock.return_value = response
+        shutil.copy(os.path.join(static_cache_dir, 'task.xml'), tid_cache_dir)
+        openml.tasks.get_task(1)
+        self.assertEqual(stream_mock.call_args[1]['headers']['Range'], 'bytes=100-')
+        with open(os.path.join(tid_cache_dir, 'datasplits.arff'), 'rb') as fh:
+            self.assertEqual(fh.read(), content)
+
     def test_deletion_of_cache_dir(self):
         # Simple removal
         tid_cache_dir = openml.utils._create_cache_directory_for_id(
@@ -1,4 +1,13 @@
 from openml.testing import TestBase
+import hashlib
+import json
+import os
+import threading
+import time
+import unittest
+
+import xmltodict
+
 import numpy as np
 import openml
 import sys
@@ -18,6 +27,363 @@ class OpenMLTaskTest(TestBase):
         url = openml.config.server + '/' + call
         return openml._api_calls._read_url(url, request_method=request_method)
 
+    def test_get_entities_keeps_order(self):
+        def getter(entity_id, offset):
+            return entity_id + offset
+
+        for max_workers in (None, 4):
+            results = openml.utils._get_entities(getter, [3, 1, 2], 10,
+                                                 max_workers=max_workers)
+            self.assertEqual(results, [13, 11, 12])
+
+    def test_get_entities_collects_errors(self):
+        def getter(entity_id):
+            if entity_id % 2 == 0:
+                raise ValueError(entity_id)
+            return entity_id
+
+        with self.assertRaises(openml.exceptions.OpenMLBatchError) as cm:
+            openml.utils._get_entities(getter, [1, 2, 3, 4], max_workers=2)
+        self.assertEqual(list(cm.exception.errors.keys()), [2, 4])
+        self.assertEqual(cm.exception.results, [1, None, 3, None])
+
+        # Duplicate ids are retrieved once
+        calls = []
+
+        def counting_getter(entity_id):
+            calls.append(entity_id)
+            return getter(entity_id)
+
+        with self.assertRaises(openml.exceptions.OpenMLBatchError) as cm:
+            openml.utils._get_entities(counting_getter, [1, 2, 1, 2], max_workers=2)
+        self.assertEqual(sorted(calls), [1, 2])
+        self.assertEqual(list(cm.exception.errors.keys()), [2])
+        self.assertEqual(cm.exception.results, [1, None, 1, None])
+        self.assertIn('Failed to retrieve 1 of 4', str(cm.exception))
+
+        # Without a thread pool, the first error is raised right away
+        self.assertRaisesRegex(ValueError, '2', openml.utils._get_entities,
+                               getter, [1, 2, 3, 4])
+
+    def test_lru_cache(self):
+        cache = openml.utils._LRUCache(max_size=10, get_size=len)
+        self.assertTrue(cache.put('a', 'xxxx'))
+        cache.put('b', 'xxxx')
+        self.assertEqual(cache.get('a'), 'xxxx')
+        # 'b' is the least recently used value and evicted
+        cache.put('c', 'xxxx')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((len(cache), cache.size), (2, 8))
+        # Values larger than the budget are not cached
+        self.assertFalse(cache.put('a', 'x' * 11))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((len(cache), cache.size), (1, 4))
+        cache.clear()
+        self.assertEqual((len(cache), cache.size), (0, 0))
+
+    @staticmethod
+    def _mock_streamed_response(chunks, encoding='utf-8', status_code=200,
+                                headers=None):
+        response = mock.MagicMock()
+        response.encoding = encoding
+        response.status_code = status_code
+        response.headers = {} if headers is None else headers
+        response.iter_content.return_value = iter(chunks)
+        return response
+
+    def _get_output_path(self):
+        return os.path.join(openml.utils._create_cache_directory_for_id('datasets', 1),
+                            'dataset.arff')
+
+    @mock.patch('openml._api_calls._stream_url')
+    def test_download_text_file_streams_to_disk(self, stream_mock):
+        chunks = [b'@RELATION test\n', b'@ATTRIBUTE a NUMERIC\n', b'@DATA\n1\n']
+        stream_mock.return_value = self._mock_streamed_response(chunks)
+        output_path = self._get_output_path()
+        md5 = hashlib.md5(b''.join(chunks)).hexdigest()
+
+        openml.utils._download_text_file('http://example.com/dataset.arff',
+                                         output_path, md5_checksum=md5)
+
+        with open(output_path, 'rb') as fh:
+            self.assertEqual(fh.read(), b''.join(chunks))
+        # No partial file is left behind, only the verified checksum is remembered
+        self.assertEqual(sorted(os.listdir(os.path.dirname(output_path))),
+                         ['.dataset.arff.md5', 'dataset.arff'])
+
+    @mock.patch('openml._api_calls._stream_url')
+    def test_download_text_file_checksum_mismatch(self, stream_mock):
+        stream_mock.return_value = self._mock_streamed_response([b'1,2\n'])
+        output_path = self._get_output_path()
+
+        self.assertRaises(openml.exceptions.OpenMLHashException,
+                          openml.utils._download_text_file,
+                          'http://example.com/dataset.arff',
+                          output_path, md5_checksum='abc')
+        # Neither the file nor a partial temporary file must remain in the cache
+        self.assertEqual(os.listdir(os.path.dirname(output_path)), [])
+
+    @mock.patch('openml._api_calls._stream_url')
+    def test_download_text_file_transcodes(self, stream_mock):
+        text = '@RELATION caf\xe9\n'
+        stream_mock.return_value = self._mock_streamed_response(
+            [text.encode('latin-1')], encoding='ISO-8859-1',
+        )
+        output_path = self._get_output_path()
+
+        openml.utils._download_text_file('http://example.com/dataset.arff',
+                                         output_path)
+
+        with open(output_path, encoding='utf8') as fh:
+            self.assertEqual(fh.read(), text)
+
+    @mock.patch('openml._api_calls._stream_url')
+    def test_download_text_file_resumes_partial_download(self, stream_mock):
+        content = b'@RELATION test\n@ATTRIBUTE a NUMERIC\n@DATA\n1\n'
+        output_path = self._get_output_path()
+        with open(output_path + '.part', 'wb') as fh:
+            fh.write(content[:10])
+        content_range = 'bytes 10-{}/{}'.format(len(content) - 1, len(content))
+        stream_mock.return_value = self._mock_streamed_response(
+            [content[10:]], status_code=206,
+            headers={'Content-Range': content_range},
+        )
+
+        openml.utils._download_text_file('http://example.com/dataset.arff',
+                                         output_path,
+                                         md5_checksum=hashlib.md5(content).hexdigest())
+
+        self.assertEqual(stream_mock.call_count, 1)
+        self.assertEqual(stream_mock.call_args[1]['headers']['Range'], 'bytes=10-')
+        with open(output_path, 'rb') as fh:
+            self.assertEqual(fh.read(), content)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(output_path))),
+                         ['.dataset.arff.md5', 'dataset.arff'])
+
+    @mock.patch('openml._api_calls._stream_url')
+    def test_download_text_file_range_not_supported(self, stream_mock):
+        content = b'@RELATION test\n@DATA\n'
+        output_path = self._get_output_path()
+        with open(output_path + '.part', 'wb') as fh:
+            fh.write(b'garbage')
+        # The server ignores the range header and sends the full file
+        stream_mock.side_effect = [
+            self._mock_streamed_response([content]),
+            self._mock_streamed_response([content]),
+        ]
+
+        openml.utils._download_text_file('http://example.com/dataset.arff',
+                                         output_path)
+
+        self.assertEqual(stream_mock.call_count, 2)
+        with open(output_path, 'rb') as fh:
+            self.assertEqual(fh.read(), content)
+
+    @mock.patch('openml._api_calls._stream_url')
+    def test_download_text_file_keeps_partial_download(self, stream_mock):
+        def interrupted(chunk_size):
+            yield b'@RELATION'
+            raise ConnectionError()
+
+        response = self._mock_streamed_response([])
+        response.iter_content.side_effect = interrupted
+        stream_mock.return_value = response
+        output_path = self._get_output_path()
+
+        self.assertRaises(ConnectionError, openml.utils._download_text_file,
+                          'http://example.com/dataset.arff', output_path)
+        self.assertFalse(os.path.exists(output_path))
+        with open(output_path + '.part', 'rb') as fh:
+            self.assertEqual(fh.read(), b'@RELATION')
+
+    @mock.patch('openml._api_calls._stream_url')
+    def test_download_text_file_replaces_corrupted_file(self, stream_mock):
+        content = b'@RELATION test\n@DATA\n'
+        stream_mock.side_effect = [
+            self._mock_streamed_response([content]),
+            self._mock_streamed_response([content]),
+        ]
+        output_path = self._get_output_path()
+        md5 = hashlib.md5(content).hexdigest()
+        openml.utils._download_text_file('http://example.com/dataset.arff',
+                                         output_path, md5_checksum=md5)
+
+        # A verified file is not hashed again
+        with mock.patch('openml.utils._get_file_md5') as md5_mock:
+            openml.utils._download_text_file('http://example.com/dataset.arff',
+                                             output_path, md5_checksum=md5)
+        md5_mock.assert_not_called()
+        self.assertEqual(stream_mock.call_count, 1)
+
+        with open(output_path, 'wb') as fh:
+            fh.write(content[:5])
+        openml.utils._download_text_file('http://example.com/dataset.arff',
+                                         output_path, md5_checksum=md5)
+        self.assertEqual(stream_mock.call_count, 2)
+        with open(output_path, 'rb') as fh:
+            self.assertEqual(fh.read(), content)
+
+    def test_atomic_write(self):
+        path = os.path.join(self.workdir, 'task.xml')
+        with openml.utils._atomic_write(path) as fh:
+            fh.write('<oml:task/>')
+            self.assertFalse(os.path.exists(path))
+        with open(path) as fh:
+            self.assertEqual(fh.read(), '<oml:task/>')
+
+        # An interrupted write neither touches the file nor leaves a temporary file
+        with self.assertRaises(KeyboardInterrupt):
+            with openml.utils._atomic_write(path) as fh:
+                fh.write('<oml:ta')
+                raise KeyboardInterrupt()
+        self.assertEqual(os.listdir(self.workdir), ['task.xml'])
+        with open(path) as fh:
+            self.assertEqual(fh.read(), '<oml:task/>')
+
+    def test_atomic_write_fsync(self):
+        path = os.path.join(self.workdir, 'task.pkl')
+        with mock.patch('os.fsync') as fsync_mock:
+            with openml.utils._atomic_write(path, 'wb') as fh:
+                fh.write(b'data')
+            self.assertEqual(fsync_mock.call_count, 0)
+            openml.config.cache_fsync = True
+            try:
+                with openml.utils._atomic_write(path, 'wb') as fh:
+                    fh.write(b'data')
+            finally:
+                openml.config.cache_fsync = False
+            # The file and the directory
+            self.assertEqual(fsync_mock.call_count, 2)
+
+    @unittest.skipIf(openml.utils.fcntl is None, 'requires fcntl')
+    def test_file_lock(self):
+        path = os.path.join(self.workdir, 'test.lock')
+        with openml.utils._file_lock(path):
+            # Reentrant within the same thread
+            with openml.utils._file_lock(path):
+                pass
+            # Other processes (or open files) cannot acquire the lock
+            with open(path) as fh:
+                self.assertRaises(BlockingIOError, openml.utils.fcntl.flock,
+                                  fh.fileno(), openml.utils.fcntl.LOCK_EX
+                                  | openml.utils.fcntl.LOCK_NB)
+            # Neither can other threads
+
+            def acquire():
+                with openml.utils._file_lock(path):
+                    pass
+            thread = threading.Thread(target=acquire)
+            thread.daemon = True
+            thread.start()
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        # Locks which are not used anymore are dropped
+        self.assertNotIn(path, openml.utils._thread_locks)
+
+    def test_lock_cache_directory(self):
+        cache_dir = openml.utils._create_cache_directory_for_id('tasks', 1)
+        lock_dir = os.path.join(openml.config.get_cache_directory(), 'locks')
+        with openml.utils._lock_cache_directory(cache_dir):
+            if openml.utils.fcntl is not None:
+                self.assertEqual(os.listdir(lock_dir), ['tasks-1.lock'])
+        # Lock files are removed once the lock is released
+        self.assertEqual(os.listdir(lock_dir), [])
+
+    def test_is_complete_xml(self):
+        self.assertTrue(openml.utils._is_complete_xml(
+            '<?xml version="1.0"?>\n<oml:task xmlns:oml="x">\n<a/></oml:task>\n'))
+        self.assertTrue(openml.utils._is_complete_xml('<oml:flow_exists a="1"/>'))
+        self.assertFalse(openml.utils._is_complete_xml('<oml:task>\n<a/></oml:tas'))
+        self.assertFalse(openml.utils._is_complete_xml('<oml:task/><a>'))
+        self.assertFalse(openml.utils._is_complete_xml(''))
+
+    _listing_xml = (
+        '<oml:tasks xmlns:oml="http://openml.org/openml">\n'
+        '  <oml:task>\n'
+        '    <oml:task_id>1</oml:task_id>\n'
+        '    <oml:name>anneal</oml:name>\n'
+        '    <oml:input name="estimation_procedure">1</oml:input>\n'
+        '    <oml:quality name="NumberOfClasses">6.0</oml:quality>\n'
+        '    <oml:quality name="NumberOfFeatures">39.0</oml:quality>\n'
+        '    <oml:quality name="NumberOfMissingValues"/>\n'
+        '    <oml:tag></oml:tag>\n'
+        '  </oml:task>\n'
+        '  <oml:task>\n'
+        '    <oml:task_id>2</oml:task_id>\n'
+        '    <oml:name>kr-vs-kp</oml:name>\n'
+        '    <oml:quality name="NumberOfClasses">2.0</oml:quality>\n'
+        '  </oml:task>\n'
+        '</oml:tasks>\n'
+    )
+
+    def test_iterparse_xml_listing_matches_xmltodict(self):
+        force_list = ('oml:input', 'oml:quality')
+        records = list(openml.utils._iterparse_xml_listing(
+            self._listing_xml, 'oml:tasks', 'oml:task', force_list=force_list,
+        ))
+        expected = xmltodict.parse(self._listing_xml,
+                                   force_list=('oml:task',) + force_list)
+        expected = json.loads(json.dumps(expected['oml:tasks']['oml:task']))
+        self.assertEqual(records, expected)
+
+    def test_iterparse_xml_listing_small_chunks(self):
+        with mock.patch('openml.utils._XML_PARSE_CHUNK_SIZE', 7):
+            records = list(openml.utils._iterparse_xml_listing(
+                self._listing_xml, 'oml:tasks', 'oml:task',
+            ))
+        self.assertEqual([record['oml:task_id'] for record in records], ['1', '2'])
+        # Without force_list, a single quality is not wrapped in a list
+        self.assertEqual(records[1]['oml:quality'],
+                         {'@name': 'NumberOfClasses', '#text': '2.0'})
+
+    def test_iterparse_xml_listing_checks_root(self):
+        records = openml.utils._iterparse_xml_listing(
+            self._listing_xml, 'oml:runs', 'oml:run',
+        )
+        self.assertRaisesRegex(ValueError, 'does not contain "oml:runs"', list, records)
+        records = openml.utils._iterparse_xml_listing(
+            self._listing_xml.replace('http://openml.org/openml', 'http://example.com'),
+            'oml:tasks', 'oml:task',
+        )
+        self.assertRaisesRegex(ValueError, 'namespace', list, records)
+
+    _listing_json = json.dumps({'tasks': {'task': [
+        {'task_id': 1, 'name': 'anneal',
+         'input': [{'name': 'estimation_procedure', 'value': '1'}],
+         'quality': [{'name': 'NumberOfClasses', 'value': '6.0'},
+                     {'name': 'NumberOfFeatures', 'value': '39.0'},
+                     {'name': 'NumberOfMissingValues'}],
+         'tag': None},
+        {'task_id': 2, 'name': 'kr-vs-kp',
+         'quality': {'name': 'NumberOfClasses', 'value': '2.0'}},
+    ]}})
+
+    def test_json_listing_matches_xml_listing(self):
+        force_list = ('oml:input', 'oml:quality')
+        json_records = openml.utils._json_listing_records(
+            self._listing_json, 'oml:tasks', 'oml:task', force_list=force_list,
+        )
+        xml_records = list(openml.utils._iterparse_xml_listing(
+            self._listing_xml, 'oml:tasks', 'oml:task', force_list=force_list,
+        ))
+        self.assertEqual(json_records, xml_records)
+
+    @mock.patch('openml._api_calls._read_url')
+    def test_perform_listing_call_json(self, read_url_mock):
+        read_url_mock.return_value = self._listing_json
+        openml.config.listing_format = 'json'
+        try:
+            records = list(openml.utils._perform_listing_call(
+                'task/list', 'oml:tasks', 'oml:task',
+            ))
+        finally:
+            openml.config.listing_format = 'xml'
+        self.assertEqual(read_url_mock.call_args[0][0],
+                         'https://test.openml.org/api/v1/json/task/list')
+        self.assertEqual([record['oml:task_id'] for record in records], ['1', '2'])
+
     def test_list_all(self):
         openml.utils._list_all(openml.tasks.functions._list_tasks)
 
@@ -85,3 +451,66 @@ class OpenMLTaskTest(TestBase):
 
         # might not be on test server after reset, please rerun test at least once if fails
         self.assertEqual(len(evaluations), required_size)
+
+    def _expire_cache_entry(self, cache_file):
+        with open(cache_file + '.meta') as fh:
+            meta = json.load(fh)
+        meta['fetched'] -= 7200
+        with open(cache_file + '.meta', 'w') as fh:
+            json.dump(meta, fh)
+
+    @mock.patch('openml._api_calls._perform_conditional_api_call')
+    def test_cached_api_call_revalidates_after_ttl(self, api_call_mock):
+        cache_file = os.path.join(self.workdir, 'description.xml')
+        api_call_mock.return_value = ('<a>1</a>', '"v1"', None)
+
+        self.assertEqual(openml.utils._get_cached_api_call('data/1', cache_file, 3600),
+                         '<a>1</a>')
+        self.assertEqual(openml.utils._get_cached_api_call('data/1', cache_file, 3600),
+                         '<a>1</a>')
+        self.assertEqual(api_call_mock.call_count, 1)
+
+        # An expired entry which did not change on the server is kept
+        self._expire_cache_entry(cache_file)
+        api_call_mock.return_value = (None, '"v1"', None)
+        self.assertEqual(openml.utils._get_cached_api_call('data/1', cache_file, 3600),
+                         '<a>1</a>')
+        self.assertEqual(api_call_mock.call_count, 2)
+        self.assertEqual(api_call_mock.call_args[1]['etag'], '"v1"')
+
+        # An expired entry which changed on the server is replaced
+        self._expire_cache_entry(cache_file)
+        api_call_mock.return_value = ('<a>2</a>', '"v2"', None)
+        self.assertEqual(openml.utils._get_cached_api_call('data/1', cache_file, 3600),
+                         '<a>2</a>')
+        with open(cache_file) as fh:
+            self.assertEqual(fh.read(), '<a>2</a>')
+
+        # Without a TTL, cached entries never expire
+        self._expire_cache_entry(cache_file)
+        openml.utils._get_cached_api_call('data/1', cache_file, None)
+        self.assertEqual(api_call_mock.call_count, 3)
+
+    @mock.patch('openml._api_calls._perform_conditional_api_call')
+    def test_cached_api_call_stale_while_revalidate(self, api_call_mock):
+        cache_file = os.path.join(self.workdir, 'qualities.xml')
+        api_call_mock.return_value = ('<a>1</a>', '"v1"', None)
+        openml.utils._get_cached_api_call('data/qualities/1', cache_file, 3600)
+        self._expire_cache_entry(cache_file)
+
+        api_call_mock.return_value = ('<a>2</a>', '"v2"', None)
+        openml.config.stale_while_revalidate = True
+        try:
+            content = openml.utils._get_cached_api_call('data/qualities/1', cache_file, 3600)
+        finally:
+            openml.config.stale_while_revalidate = False
+        self.assertEqual(content, '<a>1</a>')
+
+        for _ in range(100):
+            with open(cache_file) as fh:
+                if fh.read() == '<a>2</a>':
+                    break
+            time.sleep(0.05)
+        else:
+            self.fail('The expired cache entry was not revalidated in the background.')
+        self.assertEqual(api_call_mock.call_count, 2)